@@ -0,0 +1,346 @@
+"""Micro-benchmarks for the hot paths of get_social_schools_news.
+
+Development tool, like loop.sh: not part of the application or the test suite.
+Fixtures are generated in memory, so no school data is needed.
+
+Usage:
+    python benchmarks.py docx            # streaming DOCX extractor vs python-docx
+    python benchmarks.py pdf             # layout-aware PDF extraction vs plain page text
+    python benchmarks.py copilot         # per-call process start-up; Copilot CLI with and without the compile cache
+    python benchmarks.py stream          # streamed completion with early stop vs waiting for the full answer
+    python benchmarks.py json            # JSON extraction from megabyte-scale, brace-heavy answers
+    python benchmarks.py passages        # Digest prompt size and latency with and without passage selection
+    python benchmarks.py passages --live # the same against the LLM backend in config.ini
+    python benchmarks.py mapreduce       # longest LLM call for growing guides, one call vs read in parts
+    python benchmarks.py all
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import replace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from unittest import mock
+
+import get_social_schools_news as app
+
+# The application logs every extraction at INFO; that would dominate the timings.
+logging.disable(logging.CRITICAL)
+
+
+def _best_of(fn, repeat=5):
+    """Return (best wall-clock seconds, last result) over `repeat` runs."""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def _report(name, seconds, result, baseline=None):
+    line = f"  {name:<34} {seconds * 1000:9.1f} ms  {len(result):>9} chars  ~{len(result) // 4:>7} tokens"
+    if baseline:
+        line += f"  ({baseline / seconds:.2g}x)"
+    print(line)
+
+
+def _large_docx(paragraphs=6000, tables=60, rows=25, cols=5):
+    from docx import Document
+    doc = Document()
+    for i in range(paragraphs):
+        doc.add_paragraph(f"Alinea {i}: graag het formulier voor 15 aug inleveren bij de leerkracht van groep {i % 8 + 1}.")
+        if i % (paragraphs // tables) == 0:
+            table = doc.add_table(rows=rows, cols=cols)
+            for r, row in enumerate(table.rows):
+                for c, cell in enumerate(row.cells):
+                    cell.text = f"{r + 1} sep" if c == 0 else f"€{r * c},50"
+    buffer = BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def _python_docx_text(data):
+    from docx import Document
+    return "".join(paragraph.text + "\n" for paragraph in Document(BytesIO(data)).paragraphs)
+
+
+def bench_docx():
+    data = _large_docx()
+    print(f"DOCX extraction ({len(data) // 1024} KiB fixture, best of 5)")
+    base, text = _best_of(lambda: _python_docx_text(data))
+    _report("python-docx (paragraphs only)", base, text)
+    fast, text = _best_of(lambda: app.extract_text_from_docx_stream(data))
+    _report("streaming (paragraphs + tables)", fast, text, baseline=base)
+
+
+def _schedule_pdf(pages=20):
+    """Timetable-style PDF: a ruled cost table and a two-column notice on every page."""
+    import fitz
+    doc = fitz.open()
+    for p in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 60), f"Rooster en kosten, week {p + 1}")
+        for r in range(12):
+            for c, cell in enumerate((f"Groep {r % 8 + 1}", f"{r + 1} sep", f"08.{30 + r}", f"EUR {r + 3},50")):
+                rect = fitz.Rect(72 + c * 110, 80 + r * 18, 182 + c * 110, 98 + r * 18)
+                page.draw_rect(rect, color=(0, 0, 0), width=0.5)
+                page.insert_text((rect.x0 + 3, rect.y1 - 5), cell)
+        for column, x in enumerate((72, 310)):
+            page.insert_textbox(fitz.Rect(x, 320, x + 220, 760),
+                                f"Kolom {column + 1}: graag het formulier voor 15 aug inleveren. " * 12)
+    return doc.tobytes()
+
+
+def bench_pdf():
+    data = _schedule_pdf()
+    print(f"PDF extraction ({len(data) // 1024} KiB fixture, 20 pages, best of 5)")
+    base, text = _best_of(lambda: app._extract_pdf_text(data)[0])
+    _report("page.get_text()", base, text)
+    print(f"  {'':<34} {text.count(chr(10)):>9} lines (one per table cell)")
+    layout, text = _best_of(lambda: app._extract_pdf_text(data, layout=True)[0])
+    _report("layout (tables + columns)", layout, text, baseline=base)
+    print(f"  {'':<34} {text.count(chr(10)):>9} lines (one per table row)")
+
+
+def bench_copilot():
+    """Per-call process overhead of the Copilot CLI, measured with `copilot --version`.
+
+    Also times the floor every `copilot -p` call pays before the CLI's own code runs: spawning a
+    process, and starting Node. That is the most a pool of pre-started processes could save.
+    """
+    print("Process start-up floor per call (best of 5)")
+    spawned, out = _best_of(lambda: subprocess.run(["true"], capture_output=True).stdout)
+    _report("spawn a process (true)", spawned, out)
+    if shutil.which("node") is not None:
+        node, out = _best_of(lambda: subprocess.run(["node", "-e", "0"], capture_output=True).stdout)
+        _report("start Node (node -e 0)", node, out)
+    if shutil.which("copilot") is None:
+        print("Copilot CLI startup: skipped, 'copilot' is not in PATH")
+        return
+    print("Copilot CLI startup (copilot --version, best of 5)")
+
+    def spawn(env):
+        return subprocess.run(["copilot", "--version"], capture_output=True, text=True, env=env).stdout
+
+    cold_env = {k: v for k, v in os.environ.items() if k != "NODE_COMPILE_CACHE"}
+    cold_env["NODE_DISABLE_COMPILE_CACHE"] = "1"
+    cold, out = _best_of(lambda: spawn(cold_env))
+    _report("new process, no compile cache", cold, out)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        warm_env = {**cold_env, "NODE_COMPILE_CACHE": cache_dir}
+        del warm_env["NODE_DISABLE_COMPILE_CACHE"]
+        spawn(warm_env)  # first call fills the cache, as the health check does in a run
+        warm, out = _best_of(lambda: spawn(warm_env))
+        _report("new process, warm compile cache", warm, out, baseline=cold)
+
+
+class _ChattyModel(BaseHTTPRequestHandler):
+    """Local /chat/completions stub: a Digest at 50 tokens/s, then a chatty sign-off."""
+
+    protocol_version = "HTTP/1.1"
+    digest = json.dumps({"tldr": "Schoolreis vrijdag", "action_items": ["Lunchpakket meegeven"]})
+    sign_off = " Ik hoop dat dit helpt! Laat het weten als je nog vragen hebt." * 3
+    token_seconds = 0.02
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        tokens = [(self.digest + self.sign_off)[i:i + 4] for i in range(0, len(self.digest + self.sign_off), 4)]
+        self.send_response(200)
+        if not payload["stream"]:
+            time.sleep(self.token_seconds * len(tokens))
+            body = json.dumps({"choices": [{"message": {"content": "".join(tokens)}}]}).encode()
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for token in tokens:
+                time.sleep(self.token_seconds)
+                data = f"data: {json.dumps({'choices': [{'delta': {'content': token}}]})}\n\n".encode()
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def bench_stream():
+    """Digest latency from an OpenAI-compatible endpoint, streamed with early stop vs not."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ChattyModel)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}/v1"
+    print("OpenAI-compatible completion (local stub, 20 ms/token, best of 3)")
+    try:
+        whole = app.OpenAICompatibleProvider(base_url, "stub")
+        base, text = _best_of(lambda: whole.complete("prompt"), repeat=3)
+        _report("stream=false (full answer)", base, text)
+        streamed = app.OpenAICompatibleProvider(base_url, "stub", stream=True)
+        fast, text = _best_of(lambda: streamed.complete("prompt"), repeat=3)
+        _report("stream=true, stop at JSON", fast, text, baseline=base)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _extract_json_before(text):
+    """_extract_json as it was before the linear scan, kept as the baseline."""
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+    match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', text, re.DOTALL)
+    if match:
+        try:
+            return json.loads(match.group(1))
+        except json.JSONDecodeError:
+            pass
+    decoder = json.JSONDecoder()
+    idx = 0
+    while idx < len(text):
+        start = text.find('{', idx)
+        if start == -1:
+            break
+        try:
+            obj, _ = decoder.raw_decode(text, start)
+            return obj
+        except json.JSONDecodeError:
+            idx = start + 1
+    raise ValueError("No valid JSON found in response")
+
+
+# (name, prefix, repeated unit): each fixture ends with the real Digest after the noise.
+_PATHOLOGICAL_ANSWERS = [
+    ("code-heavy", "", "function f(x) { if (x) { return {a: x}; } }\n"),
+    ("repeated truncated object", "", '{"translated_title": "Trip", "tldr": "' + "x" * 60 + '", "action_items": ['),
+    ("unclosed fence", "```json\n", "{ x "),
+]
+_DIGEST_ANSWER = json.dumps({"translated_title": "Trip", "tldr": "Friday.", "action_items": [], "key_dates": []})
+
+
+def bench_json():
+    print("JSON extraction from brace-heavy answers (best of 3; old scan timed once, at 128 KiB only)")
+    for name, prefix, unit in _PATHOLOGICAL_ANSWERS:
+        for size in (128 * 1024, 1024 * 1024):
+            text = prefix + unit * (size // len(unit)) + "\n" + _DIGEST_ANSWER
+            seconds, _ = _best_of(lambda: app._extract_json(text), repeat=3)
+            line = f"  {f'{name} ({size // 1024} KiB)':<38} {seconds * 1000:9.1f} ms"
+            if size == 128 * 1024:
+                try:
+                    before, _ = _best_of(lambda: _extract_json_before(text), repeat=1)
+                    line += f"  (was {before * 1000:.1f} ms)"
+                except RecursionError:
+                    line += "  (was: RecursionError)"
+            print(line)
+
+
+def _school_guide_text(pages=60):
+    """A long school guide: mostly general prose, with a date or instruction every few pages."""
+    lines = []
+    for p in range(pages):
+        lines.append(f"{p + 1}. Hoofdstuk {p + 1}")
+        lines += [f"Op onze school werken we samen aan goed onderwijs, alinea {p * 30 + i}." for i in range(30)]
+        if p % 4 == 0:
+            lines.append(f"Graag het formulier voor {p % 28 + 1} sep inleveren bij de leerkracht.")
+    return "\n".join(lines)
+
+
+class _PrefillModel:
+    """Stand-in LLM whose answer time grows with the prompt, like a local model's prefill."""
+
+    seconds_per_token = 0.0002
+
+    def complete(self, prompt, schema=None):
+        time.sleep(app._estimate_tokens(prompt) * self.seconds_per_token)
+        return _DIGEST_ANSWER
+
+
+@contextmanager
+def _scratch_digest_cache():
+    """Keep Digests generated by a benchmark out of the real ./digest_cache.json."""
+    with tempfile.TemporaryDirectory() as cache_dir, \
+            mock.patch.object(app, "DIGEST_CACHE_FILE", os.path.join(cache_dir, "digest_cache.json")):
+        yield
+
+
+def bench_passages(live=False):
+    guide = app.Attachment(filename="schoolgids.pdf", url="", filetype="pdf", text=_school_guide_text())
+    body = "Beste ouders, in de bijlage vindt u de schoolgids voor dit jaar."
+    model = "configured backend" if live else f"stub, {_PrefillModel.seconds_per_token * 1000:.1f} ms/prompt token"
+    print(f"Digest for a 60-page guide ({len(guide.text) // 1024} KiB of text; {model})")
+    app.DIGEST_CACHE_ENABLED = False
+    base_config = app.get_config()
+    baseline = None
+    for label, threshold in (("full attachment", 0), ("passage selection", 1)):
+        app.config = replace(base_config, PASSAGE_SELECTION_CHARS=threshold, LLM_CONTEXT_TOKENS=0)
+        prompt = app._build_digest_prompt("Schoolgids", body, [guide])
+        with mock.patch.object(app, "get_provider", return_value=app.get_provider() if live else _PrefillModel()), \
+                _scratch_digest_cache():
+            seconds, _ = _best_of(lambda: app.generate_digest("Schoolgids", body, [guide]), repeat=1)
+        _report(label, seconds, prompt, baseline=baseline)
+        baseline = baseline or seconds
+    app.config = base_config
+
+
+class _TimedModel(_PrefillModel):
+    def __init__(self):
+        self.longest = 0.0
+
+    def complete(self, prompt, schema=None):
+        start = time.perf_counter()
+        answer = super().complete(prompt, schema)
+        self.longest = max(self.longest, time.perf_counter() - start)
+        return answer
+
+
+def bench_mapreduce():
+    print(f"Digest for growing guides (stub, {_PrefillModel.seconds_per_token * 1000:.1f} ms/prompt token; "
+          "longest single LLM call / whole Digest)")
+    app.DIGEST_CACHE_ENABLED = False
+    base_config = app.get_config()
+    for pages in (15, 60, 240):
+        guide = app.Attachment(filename="schoolgids.pdf", url="", filetype="pdf", text=_school_guide_text(pages))
+        line = f"  {f'{pages} pages':<12}"
+        for label, chunk_chars in (("one call", 0), ("parts of 16000 chars", 16000)):
+            app.config = replace(base_config, MAP_REDUCE_CHUNK_CHARS=chunk_chars, LLM_CONTEXT_TOKENS=0)
+            model = _TimedModel()
+            with mock.patch.object(app, "get_provider", return_value=model), _scratch_digest_cache():
+                seconds, _ = _best_of(lambda: app.generate_digest("Schoolgids", "Zie bijlage.", [guide]), repeat=1)
+            line += f"  {label}: {model.longest * 1000:6.0f} / {seconds * 1000:6.0f} ms"
+        print(line)
+    app.config = base_config
+
+
+BENCHMARKS = {
+    "docx": bench_docx,
+    "pdf": bench_pdf,
+    "copilot": bench_copilot,
+    "stream": bench_stream,
+    "json": bench_json,
+    "passages": bench_passages,
+    "mapreduce": bench_mapreduce,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("name", choices=[*BENCHMARKS, "all"])
+    parser.add_argument("--live", action="store_true", help="passages: time the LLM backend in config.ini")
+    args = parser.parse_args()
+    for name, bench in BENCHMARKS.items():
+        if args.name in (name, "all"):
+            bench(live=args.live) if name == "passages" else bench()
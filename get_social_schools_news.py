@@ -1,21 +1,39 @@
 import argparse
+import codecs
+import hashlib
+import mmap
+import multiprocessing
 import os
+import queue
 import re
 import subprocess
+import sys
+import threading
+import time
 import pycurl
 import logging
 import traceback
-from io import BytesIO
-from datetime import datetime
+from io import BytesIO, StringIO
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
 import fitz  # PyMuPDF
 import requests
 from deep_translator import GoogleTranslator
 import json
-from docx import Document
-from dataclasses import dataclass
+from collections import Counter, deque
+from dataclasses import asdict, dataclass, replace
 import configparser
+try:
+    import resource  # POSIX only; without it workers still get the timeout, not the memory cap
+except ImportError:
+    resource = None
 import tempfile
+import zipfile
+import xml.etree.ElementTree as ET
+from contextlib import nullcontext
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from urllib.parse import parse_qsl, unquote, urlencode, urlsplit, urlunsplit
 
 
 def resolve_browser_executable_path():
@@ -34,6 +52,21 @@ def resolve_browser_executable_path():
     return None
 
 
+@dataclass(frozen=True)
+class LLMBackend:
+    """A further LLM backend in the provider chain, read from a [llm:<name>] section."""
+    name: str
+    LLM_PROVIDER: str
+    LLM_BASE_URL: str = ""
+    LLM_MODEL: str = ""
+    LLM_API_KEY: str = ""
+    LLM_RATE_PER_MINUTE: int = 0
+    LLM_MAX_CONCURRENCY: int = 0
+    LLM_LATENCY_TARGET: int = 0
+    LLM_STREAM: bool = False
+    LLM_JSON_MODE: str = ""
+
+
 @dataclass
 class Config:
     SCRAPED_WEBSITE_USER: str
@@ -56,6 +89,81 @@ class Config:
     LLM_MODEL: str = ""
     LLM_API_KEY: str = ""
     LLM_TIMEOUT: int = 120
+    # Backends to fall over to, in order, when the one above fails (LLM_FALLBACKS names
+    # [llm:<name>] sections). With LLM_HEDGE_SECONDS > 0 the next backend is also started
+    # when the current one has not answered after that many seconds; the first valid
+    # answer wins. 0 = only fail over on errors.
+    LLM_FALLBACKS: tuple = ()
+    LLM_HEDGE_SECONDS: int = 0
+    # Pacing per backend (a [llm:<name>] section may set its own): at most LLM_RATE_PER_MINUTE
+    # requests a minute (0 = no limit), and with LLM_MAX_CONCURRENCY > 0 an adaptive number of
+    # requests in flight, up to that many, that shrinks on errors and on answers slower than
+    # LLM_LATENCY_TARGET seconds (0 = latency is not considered). A 429/503 Retry-After pauses
+    # the backend and the request is tried again.
+    LLM_RATE_PER_MINUTE: int = 0
+    LLM_MAX_CONCURRENCY: int = 0
+    LLM_LATENCY_TARGET: int = 0
+    # Circuit breakers for each LLM backend and for Pushbullet: after this many failures in a
+    # row (unreachable, timeout, server error) the backend is not called for
+    # CIRCUIT_BREAKER_RESET_SECONDS; Articles that need it are left for the next run. Then one
+    # probe call decides whether it is back. 0 = never stop calling.
+    CIRCUIT_BREAKER_FAILURES: int = 3
+    CIRCUIT_BREAKER_RESET_SECONDS: int = 60
+    # openai_compatible only: stream the answer and hang up as soon as one complete JSON
+    # object has arrived, instead of waiting for whatever the model writes after it.
+    LLM_STREAM: bool = False
+    # openai_compatible only: have the server constrain the answer to the Digest JSON shape.
+    # "" (off), "json_object", "json_schema" (OpenAI response_format) or "ollama" (format).
+    LLM_JSON_MODE: str = ""
+    # The model's context window in tokens. The Digest prompt is cut down to fit it, leaving
+    # room for the answer: message body and pre-scan hints first, attachments share the rest.
+    # 0 = no limit.
+    LLM_CONTEXT_TOKENS: int = 16384
+    # How many Articles' Digests may be generated at the same time. Articles are still read
+    # from the page and notified one by one, in post order. 1 = strictly one after another.
+    LLM_CONCURRENCY: int = 1
+    # Up to this many short new Articles share one Digest call (a JSON array of Digests) when a
+    # backlog has built up. Long Articles, and any whose batched Digest is invalid, get their
+    # own call. 1 = one call per Article.
+    DIGEST_BATCH_SIZE: int = 1
+    # Attachments up to this many bytes are extracted straight from memory; larger
+    # ones are spilled to a temp file first. 0 keeps every attachment in memory.
+    ATTACHMENT_SPILL_BYTES: int = 16 * 1024 * 1024
+    # Hard cap on a single attachment download. Larger or wrong-type files are
+    # aborted and recorded as failed attachments instead of exhausting memory.
+    ATTACHMENT_MAX_BYTES: int = 25 * 1024 * 1024
+    # Character budgets for attachment text sent to the LLM (roughly 4 characters per
+    # token). PDF extraction stops at the first page past the budget. 0 = unlimited.
+    ATTACHMENT_MAX_CHARS: int = 20000
+    ARTICLE_ATTACHMENT_MAX_CHARS: int = 40000
+    # Attachments with more extracted text than this reach the Digest prompt only as the
+    # passages around dates, times and instructions (with their section headings); the
+    # message body is always sent whole. 0 = always send the full text.
+    PASSAGE_SELECTION_CHARS: int = 0
+    # Attachments with more text than this are read in parts of this size, each by its own
+    # LLM call (several at once) that lists the part's action items and dates; the Digest
+    # is then written from the message and those lists. 0 = one call with the whole text.
+    MAP_REDUCE_CHUNK_CHARS: int = 0
+    # Also extract Word headers and footers (letterheads, contact blocks). Off by default
+    # because they rarely carry anything a parent must act on.
+    DOCX_HEADERS_FOOTERS: bool = False
+    # Extracted attachment text longer than this many characters is kept in a temp file
+    # rather than in memory until the prompt is assembled. 0 keeps all text in memory.
+    # Above ATTACHMENT_MAX_CHARS it never applies: with the default caps nothing is spilled.
+    ATTACHMENT_TEXT_SPILL_CHARS: int = 64 * 1024
+    # Layout-aware PDF extraction: tables become tab-separated rows and two-column pages are
+    # read column by column. Off by default: it is much slower than PyMuPDF's plain page text.
+    PDF_LAYOUT: bool = False
+    # Validated Digests are cached by prompt, provider, model and language, so --force runs
+    # and retries after a failed delivery don't pay for the LLM again. 0 disables the limit.
+    DIGEST_CACHE_TTL_DAYS: int = 30
+    DIGEST_CACHE_MAX_ENTRIES: int = 500
+    # Extractors with off_main_thread (PDF, DOCX, XLSX, PPTX, ODT) run in supervised worker processes.
+    # A worker that takes longer than EXTRACTION_TIMEOUT seconds or needs more than EXTRACTION_MEMORY_MB of address
+    # space is killed and replaced, and its attachment is reported as unreadable.
+    EXTRACTION_SANDBOX: bool = True
+    EXTRACTION_TIMEOUT: int = 60
+    EXTRACTION_MEMORY_MB: int = 1024
 
 
 @dataclass
@@ -66,13 +174,24 @@ class Digest:
     key_dates: list
 
 
-@dataclass
+@dataclass(slots=True)
 class Attachment:
     filename: str
     url: str
-    filetype: str   # "pdf" or "docx"
-    text: str
+    filetype: str   # the extractor's filetype, e.g. "pdf", "docx", "xlsx"
+    text: str       # or a SpilledText above ATTACHMENT_TEXT_SPILL_CHARS
     failed: bool = False
+    # Set when the text budget cut extraction short; pages_skipped counts PDF pages never read.
+    truncated: bool = False
+    pages_skipped: int = 0
+    failure_reason: str = ""
+    # What normalisation stripped (repeated headers/footers, boilerplate, whitespace).
+    chars_removed: int = 0
+    tokens_removed: int = 0
+    # Set when only the passages around hints were kept (PASSAGE_SELECTION_CHARS).
+    lines_omitted: int = 0
+    # Set when the text is the items found by reading the attachment in parts (MAP_REDUCE_CHUNK_CHARS).
+    parts_read: int = 0
 
 
 def load_config() -> Config:
@@ -92,11 +211,84 @@ def load_config() -> Config:
         LLM_MODEL=config['DEFAULT'].get('LLM_MODEL', '').strip(),
         LLM_API_KEY=config['DEFAULT'].get('LLM_API_KEY', '').strip(),
         LLM_TIMEOUT=int(config['DEFAULT'].get('LLM_TIMEOUT', '120').strip() or '120'),
+        LLM_FALLBACKS=_llm_fallbacks(config),
+        LLM_HEDGE_SECONDS=_config_int(config['DEFAULT'], 'LLM_HEDGE_SECONDS', 0),
+        LLM_RATE_PER_MINUTE=_config_int(config['DEFAULT'], 'LLM_RATE_PER_MINUTE', 0),
+        LLM_MAX_CONCURRENCY=_config_int(config['DEFAULT'], 'LLM_MAX_CONCURRENCY', 0),
+        LLM_LATENCY_TARGET=_config_int(config['DEFAULT'], 'LLM_LATENCY_TARGET', 0),
+        CIRCUIT_BREAKER_FAILURES=_config_int(config['DEFAULT'], 'CIRCUIT_BREAKER_FAILURES', 3),
+        CIRCUIT_BREAKER_RESET_SECONDS=_config_int(config['DEFAULT'], 'CIRCUIT_BREAKER_RESET_SECONDS', 60),
+        LLM_STREAM=config['DEFAULT'].get('LLM_STREAM', 'false').strip().lower() == 'true',
+        LLM_JSON_MODE=config['DEFAULT'].get('LLM_JSON_MODE', '').strip().lower(),
+        LLM_CONTEXT_TOKENS=_config_int(config['DEFAULT'], 'LLM_CONTEXT_TOKENS', 16384),
+        LLM_CONCURRENCY=_config_int(config['DEFAULT'], 'LLM_CONCURRENCY', 1),
+        DIGEST_BATCH_SIZE=_config_int(config['DEFAULT'], 'DIGEST_BATCH_SIZE', 1),
+        ATTACHMENT_SPILL_BYTES=_config_int(config['DEFAULT'], 'ATTACHMENT_SPILL_BYTES', 16 * 1024 * 1024),
+        ATTACHMENT_MAX_BYTES=_config_int(config['DEFAULT'], 'ATTACHMENT_MAX_BYTES', 25 * 1024 * 1024),
+        ATTACHMENT_MAX_CHARS=_config_int(config['DEFAULT'], 'ATTACHMENT_MAX_CHARS', 20000),
+        ARTICLE_ATTACHMENT_MAX_CHARS=_config_int(config['DEFAULT'], 'ARTICLE_ATTACHMENT_MAX_CHARS', 40000),
+        PASSAGE_SELECTION_CHARS=_config_int(config['DEFAULT'], 'PASSAGE_SELECTION_CHARS', 0),
+        MAP_REDUCE_CHUNK_CHARS=_config_int(config['DEFAULT'], 'MAP_REDUCE_CHUNK_CHARS', 0),
+        DOCX_HEADERS_FOOTERS=config['DEFAULT'].get('DOCX_HEADERS_FOOTERS', 'false').strip().lower() == 'true',
+        ATTACHMENT_TEXT_SPILL_CHARS=_config_int(config['DEFAULT'], 'ATTACHMENT_TEXT_SPILL_CHARS', 64 * 1024),
+        PDF_LAYOUT=config['DEFAULT'].get('PDF_LAYOUT', 'false').strip().lower() == 'true',
+        DIGEST_CACHE_TTL_DAYS=_config_int(config['DEFAULT'], 'DIGEST_CACHE_TTL_DAYS', 30),
+        DIGEST_CACHE_MAX_ENTRIES=_config_int(config['DEFAULT'], 'DIGEST_CACHE_MAX_ENTRIES', 500),
+        EXTRACTION_SANDBOX=config['DEFAULT'].get('EXTRACTION_SANDBOX', 'true').strip().lower() == 'true',
+        EXTRACTION_TIMEOUT=_config_int(config['DEFAULT'], 'EXTRACTION_TIMEOUT', 60),
+        EXTRACTION_MEMORY_MB=_config_int(config['DEFAULT'], 'EXTRACTION_MEMORY_MB', 1024),
     )
 
 
+def _llm_fallbacks(config):
+    """Read the [llm:<name>] sections listed in LLM_FALLBACKS, in order.
+
+    Options a section leaves out come from [DEFAULT]. 'copilot' needs no section.
+    """
+    fallbacks = []
+    for name in config['DEFAULT'].get('LLM_FALLBACKS', '').split(','):
+        name = name.strip()
+        if not name:
+            continue
+        if not config.has_section(f"llm:{name}"):
+            if name != "copilot":
+                raise RuntimeError(f"LLM_FALLBACKS lists {name!r} but config has no [llm:{name}] section")
+            fallbacks.append(LLMBackend(
+                name=name,
+                LLM_PROVIDER="copilot",
+                LLM_RATE_PER_MINUTE=_config_int(config['DEFAULT'], 'LLM_RATE_PER_MINUTE', 0),
+                LLM_MAX_CONCURRENCY=_config_int(config['DEFAULT'], 'LLM_MAX_CONCURRENCY', 0),
+                LLM_LATENCY_TARGET=_config_int(config['DEFAULT'], 'LLM_LATENCY_TARGET', 0),
+            ))
+            continue
+        section = config[f"llm:{name}"]
+        fallbacks.append(LLMBackend(
+            name=name,
+            LLM_PROVIDER=section.get('LLM_PROVIDER', 'copilot').strip().lower(),
+            LLM_BASE_URL=section.get('LLM_BASE_URL', '').strip(),
+            LLM_MODEL=section.get('LLM_MODEL', '').strip(),
+            LLM_API_KEY=section.get('LLM_API_KEY', '').strip(),
+            LLM_RATE_PER_MINUTE=_config_int(section, 'LLM_RATE_PER_MINUTE', 0),
+            LLM_MAX_CONCURRENCY=_config_int(section, 'LLM_MAX_CONCURRENCY', 0),
+            LLM_LATENCY_TARGET=_config_int(section, 'LLM_LATENCY_TARGET', 0),
+            LLM_STREAM=section.get('LLM_STREAM', 'false').strip().lower() == 'true',
+            LLM_JSON_MODE=section.get('LLM_JSON_MODE', '').strip().lower(),
+        ))
+    return tuple(fallbacks)
+
+
+def _config_int(section, key, default):
+    """Read an integer option, treating a missing or blank value as the default."""
+    raw = section.get(key, str(default))
+    return int(str(raw).strip() or default)
+
+
 config = None
 FORCE_REPROCESS = False
+DIGEST_CACHE_ENABLED = True  # --no-cache: always ask the LLM (the fresh Digest still refreshes the cache)
+# Per-run counters for the summary written at the end of run(); update under _RUN_STATS_LOCK.
+RUN_STATS = Counter()
+_RUN_STATS_LOCK = threading.Lock()
 
 
 def get_config() -> Config:
@@ -106,23 +298,22 @@ def get_config() -> Config:
     return config
 
 
-logging.basicConfig(
-    level=logging.DEBUG,  # Changed to DEBUG for more detailed logging
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler("run_report.txt", mode='w', encoding='utf-8'),
-        logging.StreamHandler()
-    ],
-)
+# Extraction workers re-import this module; only the main process owns (and truncates) the report.
+if multiprocessing.parent_process() is None:
+    logging.basicConfig(
+        level=logging.DEBUG,  # Changed to DEBUG for more detailed logging
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        handlers=[
+            logging.FileHandler("run_report.txt", mode='w', encoding='utf-8'),
+            logging.StreamHandler()
+        ],
+    )
 logger = logging.getLogger(__name__)
 
 PROCESSED_ARTICLES_FILE = "processed_articles.json"
+DIGEST_CACHE_FILE = "digest_cache.json"
 
-DIGEST_PROMPT_TEMPLATE = (
-    "You are writing a brief for a busy parent. Turn the Dutch school message "
-    "below into a structured JSON object.\n\n"
-    "Respond with ONLY a valid JSON object. No markdown fences, no explanation.\n\n"
-    "Required structure:\n"
+_DIGEST_STRUCTURE = (
     "{{\n"
     "  \"translated_title\": \"<article title in {language}>\",\n"
     "  \"tldr\": \"<1-3 sentence summary in {language}, empty string if "
@@ -130,6 +321,9 @@ DIGEST_PROMPT_TEMPLATE = (
     "  \"action_items\": [\"<deadline first - what parent must do>\"],\n"
     "  \"key_dates\": [\"<date - event or closure>\"]\n"
     "}}\n\n"
+)
+
+_DIGEST_RULES = (
     "Rules:\n"
     "- action_items and key_dates are empty arrays [] if none exist.\n"
     "- action_items: things the parent must actively do. Format: 'DD Mon - what to do'\n"
@@ -142,7 +336,16 @@ DIGEST_PROMPT_TEMPLATE = (
     "article body itself, append the source attachment's filename in parentheses at the end, e.g. "
     "'DD Mon - what to do (see filename.pdf)'.\n"
     "- All text values in {language}.\n"
-    "- Output ONLY the JSON object, nothing else.\n\n"
+)
+
+DIGEST_PROMPT_TEMPLATE = (
+    "You are writing a brief for a busy parent. Turn the Dutch school message "
+    "below into a structured JSON object.\n\n"
+    "Respond with ONLY a valid JSON object. No markdown fences, no explanation.\n\n"
+    "Required structure:\n"
+    + _DIGEST_STRUCTURE
+    + _DIGEST_RULES
+    + "- Output ONLY the JSON object, nothing else.\n\n"
     "--- MESSAGE START ---\n"
     "Title: {title}\n\n"
     "{body}{attachments}\n"
@@ -150,7 +353,74 @@ DIGEST_PROMPT_TEMPLATE = (
     "{hints}"
 )
 
+# Several short messages in one call (DIGEST_BATCH_SIZE); {messages} holds numbered message blocks.
+DIGEST_BATCH_PROMPT_TEMPLATE = (
+    "You are writing briefs for a busy parent. Turn each of the {count} Dutch school messages "
+    "below into a structured JSON object.\n\n"
+    "Respond with ONLY a valid JSON object {{\"digests\": [...]}} whose array holds exactly {count} "
+    "objects, one per message, in message order. No markdown fences, no explanation.\n\n"
+    "Required structure of each object:\n"
+    + _DIGEST_STRUCTURE
+    + _DIGEST_RULES
+    + "- Each object covers only its own message; never mix items from different messages.\n"
+    "- Output ONLY the JSON object, nothing else.\n"
+    "{messages}"
+)
+
+# One part of a long attachment (MAP_REDUCE_CHUNK_CHARS): only its candidate items are asked for.
+ATTACHMENT_PART_PROMPT_TEMPLATE = (
+    "You are helping write a brief for a busy parent. Below is part {part} of {parts} of the "
+    "attachment '{filename}' of a Dutch school message titled '{title}'. List what a parent "
+    "needs from this part.\n\n"
+    "Respond with ONLY a valid JSON object. No markdown fences, no explanation.\n\n"
+    "Required structure:\n"
+    "{{\n"
+    "  \"action_items\": [\"<deadline first - what parent must do>\"],\n"
+    "  \"key_dates\": [\"<date - event or closure>\"]\n"
+    "}}\n\n"
+    "Rules:\n"
+    "- Both are empty arrays [] if this part has none.\n"
+    "- action_items: things the parent must actively do. Format: 'DD Mon - what to do'\n"
+    "- key_dates: informational events or closures the parent does not need to act on. Format: 'DD Mon - event'\n"
+    "- Never invent an item that isn't actually in this part.\n"
+    "- All text values in {language}.\n\n"
+    "--- PART START ---\n"
+    "{text}\n"
+    "--- PART END ---"
+)
+
+_HINTS_INTRO = (
+    "\n\nPre-scan hints (candidate dates/times/instructions detected automatically; "
+    "verify each against the message above \u2014 don't invent an item just because it's "
+    "listed here):"
+)
+
 REQUIRED_DIGEST_FIELDS = {"translated_title", "tldr", "action_items", "key_dates"}
+_DIGEST_LIST_FIELDS = ("action_items", "key_dates")
+
+# What _dict_to_digest accepts, as a JSON Schema for backends that can constrain their output
+# (LLM_JSON_MODE). Strict json_schema mode needs every property required and no extras.
+DIGEST_JSON_SCHEMA = {
+    "type": "object",
+    "properties": {
+        field: {"type": "array", "items": {"type": "string"}} if field in _DIGEST_LIST_FIELDS else {"type": "string"}
+        for field in sorted(REQUIRED_DIGEST_FIELDS)
+    },
+    "required": sorted(REQUIRED_DIGEST_FIELDS),
+    "additionalProperties": False,
+}
+ATTACHMENT_PART_JSON_SCHEMA = {
+    "type": "object",
+    "properties": {field: {"type": "array", "items": {"type": "string"}} for field in _DIGEST_LIST_FIELDS},
+    "required": list(_DIGEST_LIST_FIELDS),
+    "additionalProperties": False,
+}
+DIGEST_BATCH_JSON_SCHEMA = {
+    "type": "object",
+    "properties": {"digests": {"type": "array", "items": DIGEST_JSON_SCHEMA}},
+    "required": ["digests"],
+    "additionalProperties": False,
+}
 
 _DATE_HINT_RE = re.compile(
     r'\b\d{1,2}\s*(?:jan|feb|mrt|maart|apr|mei|jun(?:i)?|jul(?:i)?|aug|sep|okt|nov|dec)[a-z]*\.?',
@@ -215,54 +485,259 @@ def download_pdf(url, output_path):
     logger.info(f"PDF downloaded and saved to {output_path}")
 
 
-def _download_pdf(url, output_path, browser_context=None):
-    """Download a PDF. Uses the authenticated Playwright session when available."""
-    if browser_context is not None:
-        logger.info(f"Downloading PDF from {url} (authenticated session)")
-        resp = browser_context.request.get(url)
-        if not resp.ok:
-            raise IOError(f"Authenticated PDF download failed ({resp.status}): {url}")
-        with open(output_path, "wb") as f:
-            f.write(resp.body())
-        logger.info(f"PDF downloaded to {output_path}")
-        return
-    logger.info(f"Downloading PDF from {url}")
-    response = requests.get(url, timeout=30, stream=True)
-    response.raise_for_status()
-    with open(output_path, "wb") as f:
-        for chunk in response.iter_content(chunk_size=8192):
-            f.write(chunk)
-    logger.info(f"PDF downloaded to {output_path}")
+# Storage backends often serve documents as a generic binary type, so these are
+# accepted next to the registered extractors' own content types. Anything else
+# (video, images, an HTML login page) is refused before the body is read.
+_GENERIC_CONTENT_TYPES = {"", "application/octet-stream", "binary/octet-stream", "application/download",
+                          "application/force-download"}
+_DOWNLOAD_CHUNK_BYTES = 64 * 1024
 
 
-def _download_docx(url, output_path, browser_context=None):
-    """Download a DOCX. Uses the authenticated Playwright session when available."""
+def _check_attachment_headers(headers, url, content_types=None, max_bytes=None):
+    """Pre-flight check of an attachment response's Content-Type and Content-Length.
+
+    Raises IOError with a human-readable reason when the file is of the wrong type or
+    is announced as larger than max_bytes, so the caller can abort before reading it.
+    content_types defaults to everything a registered extractor can read.
+    """
+    if content_types is None:
+        content_types = _registered_content_types()
+    headers = {k.lower(): v for k, v in (headers or {}).items()}
+    content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type not in set(content_types) | _GENERIC_CONTENT_TYPES:
+        raise IOError(f"wrong content type {content_type!r} for an attachment: {url}")
+    length = headers.get("content-length", "").strip()
+    if max_bytes and length.isdigit() and int(length) > max_bytes:
+        raise IOError(f"too large ({int(length)} bytes, limit is {max_bytes}): {url}")
+
+
+def _download_attachment(url, browser_context=None, content_types=None, max_bytes=None):
+    """Return an attachment's raw bytes, refusing wrong-type files and anything above max_bytes.
+
+    Uses the authenticated browser session when available (ADR 0003): its cookies are
+    copied into a requests session, because Playwright's APIResponse has no streaming body.
+    Either way the download streams and aborts as soon as the cap is crossed, whatever
+    the headers claimed (a chunked response announces no length at all).
+    """
+    if max_bytes is None:
+        max_bytes = get_config().ATTACHMENT_MAX_BYTES
     if browser_context is not None:
-        logger.info(f"Downloading DOCX from {url} (authenticated session)")
-        resp = browser_context.request.get(url)
-        if not resp.ok:
-            raise IOError(f"Authenticated DOCX download failed ({resp.status}): {url}")
-        with open(output_path, "wb") as f:
-            f.write(resp.body())
-        logger.info(f"DOCX downloaded to {output_path}")
-        return
-    logger.info(f"Downloading DOCX from {url}")
-    response = requests.get(url, timeout=30, stream=True)
-    response.raise_for_status()
-    with open(output_path, "wb") as f:
-        for chunk in response.iter_content(chunk_size=8192):
-            f.write(chunk)
-    logger.info(f"DOCX downloaded to {output_path}")
+        logger.info(f"Downloading attachment from {url} (authenticated session)")
+        http = _authenticated_session(browser_context, url)
+    else:
+        logger.info(f"Downloading attachment from {url}")
+        http = nullcontext(requests)
+    with http as client, client.get(url, timeout=30, stream=True) as response:
+        response.raise_for_status()
+        _check_attachment_headers(response.headers, url, content_types, max_bytes)
+        chunks = []
+        received = 0
+        for chunk in response.iter_content(chunk_size=_DOWNLOAD_CHUNK_BYTES):
+            received += len(chunk)
+            if max_bytes and received > max_bytes:
+                raise IOError(f"too large (more than {max_bytes} bytes, download aborted): {url}")
+            chunks.append(chunk)
+    data = b"".join(chunks)
+    logger.info(f"Attachment downloaded ({len(data)} bytes)")
+    return data
+
+
+def _authenticated_session(browser_context, url):
+    """A requests session carrying the browser context's cookies for url (the CloudFront session).
+
+    The caller closes it (use it as a context manager), so its connection pool is not leaked.
+    """
+    session = requests.Session()
+    for cookie in browser_context.cookies(url):
+        session.cookies.set(cookie["name"], cookie["value"], domain=cookie["domain"], path=cookie["path"])
+    return session
+
+
+def _extract_from_buffer(data, extractor, filename):
+    """Run extractor on an in-memory attachment, spilling it to disk only above ATTACHMENT_SPILL_BYTES.
+
+    PyMuPDF and python-docx both read straight from a buffer, so small attachments never touch
+    the filesystem. Very large ones are written to a temp file so the library can page them
+    from disk instead of holding a second parsed copy next to the raw bytes.
+    """
+    threshold = get_config().ATTACHMENT_SPILL_BYTES
+    if threshold <= 0 or len(data) <= threshold:
+        return extractor(data)
+    logger.info(f"Attachment '{filename}' is {len(data)} bytes, spilling to disk for extraction")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, filename)
+        with open(path, "wb") as f:
+            f.write(data)
+        return extractor(path)
+
+
+def _source_label(source):
+    return source if isinstance(source, str) else f"<{len(source)}-byte buffer>"
 
 
-def extract_text(pdf_path):
-    logger.info(f"Extracting text from PDF {pdf_path}")
-    doc = fitz.open(pdf_path)
-    text = ""
+# Separates pages in extracted text, so normalisation can find lines repeated on every page.
+_PAGE_BREAK = "\f"
+
+
+def _extract_pdf_text(source, char_budget=None, layout=False):
+    """Extract a PDF page by page, stopping once char_budget characters have been collected.
+
+    Returns (text, pages_skipped), pages separated by _PAGE_BREAK. Pages after the one that
+    exhausts the budget are never rendered, so a 60-page guide costs only as much as the part
+    of it that reaches the prompt. With layout=True pages go through _layout_page_text.
+    """
+    label = _source_label(source)
+    logger.info(f"Extracting text from PDF {label}")
+    if isinstance(source, str):
+        doc = fitz.open(source)
+    else:
+        doc = fitz.open(stream=source, filetype="pdf")
+    parts = []
+    used = 0
+    pages_read = 0
+    pages_skipped = 0
     for page in doc:
-        text += page.get_text()
-    logger.info(f"Text extraction complete for {pdf_path}")
-    return text
+        page_text = _layout_page_text(page) if layout else page.get_text()
+        if parts:
+            page_text = _PAGE_BREAK + page_text
+        pages_read += 1
+        if char_budget is not None and used + len(page_text) >= char_budget:
+            parts.append(page_text[:char_budget - used])
+            pages_skipped = doc.page_count - pages_read
+            logger.info(
+                f"Text budget of {char_budget} chars reached on page {pages_read}; "
+                f"skipping {pages_skipped} remaining page(s) of {label}"
+            )
+            break
+        parts.append(page_text)
+        used += len(page_text)
+    logger.info(f"Text extraction complete for {label}")
+    return "".join(parts), pages_skipped
+
+
+_FULL_WIDTH_SHARE = 0.6  # blocks at least this share of the page wide span both columns
+_COLUMN_LINE_SHARE = 0.25  # a line of running text in a column is at least this share of the page wide
+_MIN_COLUMN_LINES = 3       # lines of running text each side of the gutter before a band counts as columns
+
+
+def _layout_page_text(page):
+    """Page text in reading order, with each detected table as tab-separated rows.
+
+    page.get_text() emits a table one cell per line, which loses the rows the model needs to
+    match a date to a group or a price. Tables found by PyMuPDF become one line per row; the
+    text lines outside them are put in reading order by _reading_order.
+    """
+    items = []  # (rect, text)
+    table_rects = []
+    for table in _find_ruled_tables(page):
+        rect = fitz.Rect(table.bbox)
+        table_rects.append(rect)
+        rows = ["\t".join(" ".join((cell or "").split()) for cell in row) for row in table.extract()]
+        items.append((rect, "\n".join(rows) + "\n"))
+    # Lines, not blocks: MuPDF merges lines of two columns that share a baseline into one block.
+    for block in page.get_text("dict", flags=fitz.TEXTFLAGS_TEXT)["blocks"]:
+        for line in block["lines"]:
+            rect = fitz.Rect(line["bbox"])
+            if any(table_rect.contains((rect.tl + rect.br) / 2) for table_rect in table_rects):
+                continue  # already emitted as a table cell
+            items.append((rect, "".join(span["text"] for span in line["spans"]) + "\n"))
+    return "".join(text for _, text in _reading_order(items, page.rect))
+
+
+def _find_ruled_tables(page):
+    """Tables drawn with lines, searched for only where the page has vector drawings.
+
+    find_tables() costs about 100 ms for a text-heavy page, most of it indexing every character.
+    Pages without drawings cannot hold a ruled table and are skipped; on the others the search
+    is clipped to the area the drawings cover.
+    """
+    drawn = fitz.Rect()
+    for drawing in page.get_cdrawings():
+        drawn |= drawing["rect"]
+    if drawn.is_empty:
+        return []
+    return page.find_tables(clip=drawn).tables
+
+
+def _reading_order(items, page_rect):
+    """Order (rect, text) items top to bottom, reading a two-column layout column by column.
+
+    Full-width items (wide lines, tables) split the page into bands. A band is read column by
+    column only when it has a real gutter (see _has_columns); otherwise it is read row by row,
+    so a date and the event next to it ("Ma 3 maart   Gymles") stay together.
+    """
+    ordered = []
+    band = []
+    for item in sorted(items, key=lambda item: item[0].y0) + [None]:
+        if item is None or item[0].width >= page_rect.width * _FULL_WIDTH_SHARE:
+            ordered.extend(_columns_in_order(band, page_rect) if _has_columns(band, page_rect) else _rows_in_order(band))
+            band = []
+            if item is not None:
+                ordered.append(item)
+        else:
+            band.append(item)
+    return ordered
+
+
+def _has_columns(band, page_rect):
+    """Whether nothing crosses the middle of the page and both halves hold lines of running text."""
+    middle = (page_rect.x0 + page_rect.x1) / 2
+    if any(rect.x0 < middle < rect.x1 for rect, _ in band):
+        return False
+    wide = [rect for rect, _ in band if rect.width >= page_rect.width * _COLUMN_LINE_SHARE]
+    left = sum(rect.x1 <= middle for rect in wide)
+    return left >= _MIN_COLUMN_LINES and len(wide) - left >= _MIN_COLUMN_LINES
+
+
+def _columns_in_order(band, page_rect):
+    middle = (page_rect.x0 + page_rect.x1) / 2
+    return sorted(band, key=lambda item: ((item[0].x0 + item[0].x1) / 2 >= middle, item[0].y0))
+
+
+def _rows_in_order(band):
+    """Items grouped into rows of vertically overlapping lines, each row read left to right."""
+    rows = []
+    for item in band:  # already sorted by y0
+        if rows and item[0].y0 < rows[-1][0][0].y1 - item[0].height / 2:
+            rows[-1].append(item)
+        else:
+            rows.append([item])
+    return [item for row in rows for item in sorted(row, key=lambda item: item[0].x0)]
+
+
+class _AttachmentTextBudget:
+    """Tracks how much attachment text one Article may still send to the LLM.
+
+    Each attachment gets at most ATTACHMENT_MAX_CHARS, and all attachments of an Article
+    together at most ARTICLE_ATTACHMENT_MAX_CHARS. A limit of 0 means unlimited.
+    """
+
+    def __init__(self, per_attachment=None, per_article=None):
+        cfg = get_config()
+        if per_attachment is None:
+            per_attachment = cfg.ATTACHMENT_MAX_CHARS
+        if per_article is None:
+            per_article = cfg.ARTICLE_ATTACHMENT_MAX_CHARS
+        self.per_attachment = per_attachment or None
+        self.remaining = per_article or None
+
+    @property
+    def exhausted(self):
+        return self.remaining is not None and self.remaining <= 0
+
+    def consume(self, text):
+        if self.remaining is not None:
+            self.remaining -= len(text)
+
+    def apply(self, attachment):
+        """Clip an extracted attachment to what is left of the article budget, then charge it.
+
+        A clipped attachment is a copy: the original may be shared with other Articles in the run.
+        """
+        if self.remaining is not None and len(attachment.text) > self.remaining:
+            attachment = replace(attachment, text=attachment.text[:max(self.remaining, 0)], truncated=True)
+        self.consume(attachment.text)
+        return attachment
 
 
 def translate(text, src="nl", dest=None, chunk_size=4900):
@@ -298,6 +773,95 @@ def _parse_api_keys(raw):
     return parsed
 
 
+class CircuitOpenError(RuntimeError):
+    """A backend's circuit breaker is open: the call was skipped instead of waiting for a timeout."""
+
+
+class _CircuitBreaker:
+    """Stops calling a backend that keeps failing, for the rest of the reset period.
+
+    Closed: calls go through; `failures` consecutive failed calls open the breaker. Open: calls
+    raise CircuitOpenError at once until reset_seconds have passed. Half-open: a single probe
+    call goes through (others are still refused); it closes the breaker on success and opens it
+    again on failure. `is_failure(exc)` decides which exceptions mean the backend is down; any
+    other outcome counts as the backend answering. failures = 0 never opens.
+    """
+
+    def __init__(self, name, failures=0, reset_seconds=60, is_failure=lambda e: isinstance(e, RuntimeError)):
+        self.name = name
+        self.failures = failures
+        self.reset_seconds = reset_seconds
+        self.is_failure = is_failure
+        self.state = "closed"
+        self._consecutive = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self._move_to("half-open")
+            if self.state == "closed":
+                return self
+            if self.state == "half-open" and not self._probing:
+                self._probing = True
+                return self
+            retry_in = max(0.0, self.reset_seconds - (time.monotonic() - self._opened_at))
+            with _RUN_STATS_LOCK:
+                RUN_STATS[("circuit_skipped", self.name)] += 1
+        raise CircuitOpenError(f"{self.name} is failing; circuit breaker open, not calling it for {retry_in:.0f}s")
+
+    def __exit__(self, exc_type, exc, tb):
+        failed = exc is not None and self.is_failure(exc)
+        with self._lock:
+            self._probing = False
+            if not failed:
+                self._consecutive = 0
+                if self.state != "closed":
+                    self._move_to("closed")
+            else:
+                self._consecutive += 1
+                if self.state == "half-open" or (self.failures > 0 and self._consecutive >= self.failures):
+                    self._opened_at = time.monotonic()
+                    if self.state != "open":
+                        self._move_to("open")
+        return False
+
+    def _move_to(self, state):
+        logger.warning(f"Circuit breaker for {self.name}: {self.state} -> {state}"
+                       + (f" after {self._consecutive} failure(s) in a row" if state == "open" else ""))
+        with _RUN_STATS_LOCK:
+            RUN_STATS[("circuit", self.name, f"{self.state} -> {state}")] += 1
+        self.state = state
+
+
+_CIRCUIT_BREAKERS = {}
+_CIRCUIT_BREAKERS_LOCK = threading.Lock()
+
+
+def _circuit_breaker(name, is_failure=lambda e: isinstance(e, RuntimeError)):
+    """The run-wide circuit breaker for one backend, set up from the current config."""
+    cfg = get_config()
+    settings = (cfg.CIRCUIT_BREAKER_FAILURES, cfg.CIRCUIT_BREAKER_RESET_SECONDS)
+    with _CIRCUIT_BREAKERS_LOCK:
+        if name not in _CIRCUIT_BREAKERS or _CIRCUIT_BREAKERS[name][0] != settings:
+            _CIRCUIT_BREAKERS[name] = (settings, _CircuitBreaker(name, *settings, is_failure=is_failure))
+        return _CIRCUIT_BREAKERS[name][1]
+
+
+def _pushbullet_outage(error):
+    """Network errors and 5xx/429 mean Pushbullet is down; a 4xx is one recipient's bad token."""
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    response = getattr(error, "response", None)
+    return isinstance(error, requests.HTTPError) and response is not None and (
+        response.status_code >= 500 or response.status_code == 429)
+
+
+_PUSHBULLET_TIMEOUT = 30  # seconds per push; without it a hung connection stalls the whole run
+
+
 def send_notification(title, body, api_keys=None):
     if api_keys is None:
         api_keys = _parse_api_keys(get_config().PUSHBULLET_API_KEYS)
@@ -306,33 +870,62 @@ def send_notification(title, body, api_keys=None):
     logger.info(f"Sending Pushbullet notification with title: {title}")
     logger.debug(f"Notification body:\n{body}")
     params = {"type": "note", "title": title, "body": body}
-    for name, key in api_keys.items():
-        logger.debug(f"Pushing notification to recipient '{name}'")
-        response = requests.post(
-            "https://api.pushbullet.com/v2/pushes",
-            data=json.dumps(params),
-            headers={
-                "Authorization": "Bearer " + key,
-                "Content-Type": "application/json",
-            },
-        )
-        response.raise_for_status()
+    with _circuit_breaker("Pushbullet", is_failure=_pushbullet_outage):
+        for name, key in api_keys.items():
+            logger.debug(f"Pushing notification to recipient '{name}'")
+            response = requests.post(
+                "https://api.pushbullet.com/v2/pushes",
+                data=json.dumps(params),
+                headers={
+                    "Authorization": "Bearer " + key,
+                    "Content-Type": "application/json",
+                },
+                timeout=_PUSHBULLET_TIMEOUT,
+            )
+            response.raise_for_status()
     logger.info("Pushbullet notification sent")
 
 
+# Node (22.1+) keeps the compiled JavaScript of the Copilot CLI here between calls and runs, so
+# each `copilot -p` process skips re-compiling the CLI bundle at startup. A NODE_COMPILE_CACHE
+# already set in the environment wins.
+_COPILOT_COMPILE_CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "social-schools-news", "node-compile-cache",
+)
+
+_copilot_verified = False  # set once `copilot --version` has succeeded in this process
+
+
+def _copilot_env():
+    """Environment for Copilot CLI processes: the caller's, plus the persistent compile cache."""
+    env = dict(os.environ)
+    env.setdefault("NODE_COMPILE_CACHE", _COPILOT_COMPILE_CACHE_DIR)
+    return env
+
+
 def _check_copilot_available():
-    """Fail fast if the Copilot CLI is not reachable before processing any Article."""
+    """Fail fast if the Copilot CLI is not reachable before processing any Article.
+
+    Runs `copilot --version` once per process; it also fills the compile cache, so the first
+    Digest call already starts warm.
+    """
+    global _copilot_verified
+    if _copilot_verified:
+        return
     try:
         result = subprocess.run(
             ["copilot", "--version"],
             capture_output=True,
             text=True,
             timeout=10,
+            env=_copilot_env(),
         )
     except FileNotFoundError:
         raise RuntimeError("Copilot CLI not found. Ensure 'copilot' is in PATH.")
     if result.returncode != 0:
         raise RuntimeError(f"Copilot CLI health check failed (code {result.returncode})")
+    _copilot_verified = True
 
 
 # Per ADR 0001: non-interactive invocation via -p flag.
@@ -345,17 +938,41 @@ assert not any("--tool" in arg for arg in _COPILOT_TOOL_FREE_ARGS), (
 )
 
 
+# Linux rejects any single argv element over MAX_ARG_STRLEN (128 KiB) with E2BIG, and the CLI
+# takes its -p prompt only from argv: nothing shows it passes piped stdin to the model in -p mode.
+# Longer prompts are refused with a clear error instead of failing in the kernel.
+_COPILOT_ARGV_PROMPT_LIMIT = 96 * 1024  # UTF-8 bytes, leaving headroom below the kernel limit
+
+
+def _copilot_command(prompt):
+    """Return the argv for one non-interactive call; RuntimeError if the prompt is too long for argv."""
+    size = len(prompt.encode("utf-8"))
+    if size > _COPILOT_ARGV_PROMPT_LIMIT:
+        raise RuntimeError(
+            f"Prompt of {size} bytes is too long for the Copilot CLI (limit {_COPILOT_ARGV_PROMPT_LIMIT}); "
+            "lower LLM_CONTEXT_TOKENS or set MAP_REDUCE_CHUNK_CHARS"
+        )
+    return [*_COPILOT_TOOL_FREE_ARGS, "-p", prompt]
+
+
 def _run_copilot(prompt):
+    argv = _copilot_command(prompt)
+    timeout = get_config().LLM_TIMEOUT
     try:
         result = subprocess.run(
-            [*_COPILOT_TOOL_FREE_ARGS, "-p", prompt],
+            argv,
             # Note: --no-color already in _COPILOT_TOOL_FREE_ARGS; -p disables tool access (ADR 0002)
+            input="",  # never inherit the caller's stdin
             capture_output=True,
             text=True,
-            timeout=120,
+            encoding="utf-8",
+            timeout=timeout,
+            env=_copilot_env(),
         )
     except FileNotFoundError:
         raise RuntimeError("Copilot CLI not found. Ensure 'copilot' is in PATH.")
+    except subprocess.TimeoutExpired:
+        raise RuntimeError(f"Copilot CLI did not answer within {timeout}s (LLM_TIMEOUT)")
     if result.returncode != 0:
         logger.error(f"Copilot CLI stderr:\n{result.stderr}")
         raise RuntimeError(f"Copilot CLI returned code {result.returncode}")
@@ -377,23 +994,135 @@ def _run_copilot(prompt):
 class LLMProvider:
     """Interface for turning a prompt into completion text."""
 
+    backend_name = None  # the LLMBackend it was built for; set by _build_provider
+
     def health_check(self) -> None:
         """Fail fast (raise RuntimeError) if the backend is not reachable."""
         raise NotImplementedError
 
-    def complete(self, prompt: str) -> str:
-        """Return the model's completion text for the given prompt."""
+    def complete(self, prompt: str, schema=None) -> str:
+        """Return the model's completion text for the given prompt.
+
+        `schema` is the JSON Schema the answer should follow. Backends that cannot
+        enforce it ignore it; the prompt asks for the same structure anyway.
+        """
         raise NotImplementedError
 
 
+class _BackendLimiter:
+    """Paces the requests to one LLM backend; shared by every provider object built for it.
+
+    A token bucket lets through rate_per_minute requests a minute (0 = no limit) and holds
+    everything back while a server's Retry-After is in force (pause). With max_concurrency
+    > 0, an AIMD controller decides how many requests may be in flight: starting at one, it
+    grows by one per round of successful answers (within latency_target seconds, when set)
+    up to max_concurrency, and halves after an error or a slow answer.
+    """
+
+    def __init__(self, rate_per_minute=0, max_concurrency=0, latency_target=0):
+        self.rate = rate_per_minute / 60
+        self.max_concurrency = max_concurrency
+        self.latency_target = latency_target
+        self.limit = 1.0 if max_concurrency > 0 else float("inf")
+        self.in_flight = 0
+        self._tokens = 1.0
+        self._refilled = time.monotonic()
+        self._paused_until = 0.0
+        self._changed = threading.Condition()
+
+    def acquire(self):
+        """Block until the bucket has a token and a concurrency slot is free, then take both."""
+        with self._changed:
+            while True:
+                now = time.monotonic()
+                delay = self._paused_until - now
+                if delay <= 0 and self.rate > 0:
+                    self._tokens = min(1.0, self._tokens + (now - self._refilled) * self.rate)
+                    self._refilled = now
+                    delay = (1 - self._tokens) / self.rate
+                if delay <= 0 and self.in_flight + 1 <= self.limit:
+                    if self.rate > 0:
+                        self._tokens -= 1
+                    self.in_flight += 1
+                    return
+                self._changed.wait(delay if delay > 0 else None)
+
+    def release(self, latency, ok):
+        """Give the slot back and adapt the concurrency limit to how the request went."""
+        with self._changed:
+            self.in_flight -= 1
+            if self.max_concurrency > 0:
+                if ok and not (self.latency_target > 0 and latency > self.latency_target):
+                    self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+                else:
+                    self.limit = max(1.0, self.limit / 2)
+                    logger.info(f"LLM backend {'slow' if ok else 'failing'} ({latency:.1f}s); "
+                                f"now at most {int(self.limit)} request(s) at a time")
+            self._changed.notify_all()
+
+    def pause(self, seconds):
+        """Let no request through for `seconds` (a server's Retry-After)."""
+        with self._changed:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._changed.notify_all()
+
+
+_BACKEND_LIMITERS = {}
+_BACKEND_LIMITERS_LOCK = threading.Lock()
+
+
+def _backend_limiter(backend):
+    """The run-wide limiter for one backend, so every get_provider() call shares its pacing."""
+    key = (backend.LLM_PROVIDER, backend.LLM_BASE_URL, backend.LLM_MODEL)
+    settings = (backend.LLM_RATE_PER_MINUTE, backend.LLM_MAX_CONCURRENCY, backend.LLM_LATENCY_TARGET)
+    with _BACKEND_LIMITERS_LOCK:
+        if key not in _BACKEND_LIMITERS or _BACKEND_LIMITERS[key][0] != settings:
+            _BACKEND_LIMITERS[key] = (settings, _BackendLimiter(*settings))
+        return _BACKEND_LIMITERS[key][1]
+
+
+def _retry_after_seconds(value, default):
+    """Seconds to wait from a Retry-After header (delta-seconds or an HTTP date)."""
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return default
+
+
 class CopilotCliProvider(LLMProvider):
     """Default backend: the GitHub Copilot CLI in non-interactive, tool-free mode (ADR 0001/0002)."""
 
+    def __init__(self, limiter=None, breaker=None):
+        self.limiter = limiter or _BackendLimiter()
+        self.breaker = breaker or _CircuitBreaker("Copilot CLI")
+
     def health_check(self) -> None:
         _check_copilot_available()
 
-    def complete(self, prompt: str) -> str:
-        return _run_copilot(prompt)
+    def complete(self, prompt: str, schema=None) -> str:
+        with self.breaker:
+            self.limiter.acquire()
+            start = time.monotonic()
+            ok = False
+            try:
+                answer = _run_copilot(prompt)
+                ok = True
+                return answer
+            finally:
+                self.limiter.release(time.monotonic() - start, ok)
+
+
+_LLM_RATE_LIMIT_RETRIES = 3  # 429/503 answers waited out (Retry-After) before giving up
+
+# LLM_JSON_MODE values: "" sends nothing extra; "json_object" and "json_schema" set OpenAI's
+# response_format; "ollama" sets Ollama's own 'format' to the schema.
+_JSON_MODES = ("", "json_object", "json_schema", "ollama")
 
 
 class OpenAICompatibleProvider(LLMProvider):
@@ -401,9 +1130,15 @@ class OpenAICompatibleProvider(LLMProvider):
 
     One adapter covers local/LAN Ollama (http://host:11434/v1), OpenRouter,
     and most cloud providers. No 'tools'/'functions' are ever sent (ADR 0002).
+    json_mode asks the server to constrain the answer (see _JSON_MODES).
     """
 
-    def __init__(self, base_url, model, api_key="", timeout=120):
+    def __init__(self, base_url, model, api_key="", timeout=120, stream=False, json_mode="", limiter=None,
+                 breaker=None):
+        if json_mode not in _JSON_MODES:
+            raise RuntimeError(
+                f"Unknown LLM_JSON_MODE {json_mode!r}; expected one of {', '.join(repr(m) for m in _JSON_MODES)}"
+            )
         if not base_url:
             raise RuntimeError("LLM_BASE_URL is required for the 'openai_compatible' provider")
         if not model:
@@ -412,6 +1147,10 @@ class OpenAICompatibleProvider(LLMProvider):
         self.model = model
         self.api_key = api_key
         self.timeout = timeout
+        self.stream = stream
+        self.json_mode = json_mode
+        self.limiter = limiter or _BackendLimiter()
+        self.breaker = breaker or _CircuitBreaker(f"LLM endpoint {self.base_url}")
 
     def _headers(self):
         headers = {"Content-Type": "application/json"}
@@ -431,79 +1170,491 @@ class OpenAICompatibleProvider(LLMProvider):
                 f"LLM endpoint health check failed ({resp.status_code}) at {self.base_url}"
             )
 
-    def complete(self, prompt: str) -> str:
+    def complete(self, prompt: str, schema=None) -> str:
         # ADR 0002: deliberately no 'tools'/'functions' key — pure text transformer only.
         payload = {
             "model": self.model,
             "messages": [{"role": "user", "content": prompt}],
-            "stream": False,
+            "stream": self.stream,
         }
+        if schema is not None:
+            payload.update(self._json_mode_fields(schema))
+        with self.breaker:
+            return self._complete_paced(payload)
+
+    def _complete_paced(self, payload):
+        for attempt in range(_LLM_RATE_LIMIT_RETRIES + 1):
+            self.limiter.acquire()
+            start = time.monotonic()
+            ok = False
+            try:
+                resp = self._post(payload)
+                if resp.status_code in (429, 503) and attempt < _LLM_RATE_LIMIT_RETRIES:
+                    delay = _retry_after_seconds(resp.headers.get("Retry-After"), default=2 ** attempt)
+                    if delay <= self.timeout:
+                        logger.warning(f"LLM endpoint returned status {resp.status_code}; "
+                                       f"trying again in {delay:.0f}s")
+                        resp.close()
+                        self.limiter.pause(delay)
+                        continue
+                answer = self._answer(resp)
+                ok = True
+                return answer
+            finally:
+                self.limiter.release(time.monotonic() - start, ok)
+
+    def _post(self, payload):
         try:
-            resp = requests.post(
+            return requests.post(
                 f"{self.base_url}/chat/completions",
                 headers=self._headers(),
                 data=json.dumps(payload),
                 timeout=self.timeout,
+                stream=self.stream,
             )
         except requests.RequestException as e:
             raise RuntimeError(f"LLM request to {self.base_url} failed: {e}")
+
+    def _answer(self, resp):
         if resp.status_code != 200:
             logger.error(f"LLM endpoint error body:\n{resp.text}")
             raise RuntimeError(f"LLM endpoint returned status {resp.status_code}")
+        if self.stream:
+            try:
+                return self._read_stream(resp)
+            finally:
+                # Hanging up mid-stream is the point: the server stops generating.
+                resp.close()
         try:
             data = resp.json()
             return data["choices"][0]["message"]["content"].strip()
         except (ValueError, KeyError, IndexError, TypeError) as e:
             raise RuntimeError(f"Unexpected LLM response shape: {e}")
 
+    def _json_mode_fields(self, schema):
+        if self.json_mode == "json_object":
+            return {"response_format": {"type": "json_object"}}
+        if self.json_mode == "json_schema":
+            return {"response_format": {"type": "json_schema",
+                                        "json_schema": {"name": "digest", "schema": schema, "strict": True}}}
+        if self.json_mode == "ollama":
+            return {"format": schema}
+        return {}
+
+    def _read_stream(self, resp) -> str:
+        """Collect server-sent content deltas until the first complete JSON object.
+
+        Returns just that object's text; the caller then closes the connection, so the
+        server stops generating the prose models like to add after the JSON. A stream
+        that never yields an object is returned whole.
+        """
+        resp.encoding = "utf-8"  # text/event-stream carries no charset; requests would assume latin-1
+        scanner = _JsonSpanScanner()
+        content = []
+        try:
+            # chunk_size=None hands over each event as it arrives instead of waiting for 512 bytes.
+            for line in resp.iter_lines(chunk_size=None, decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                try:
+                    delta = json.loads(data)["choices"][0].get("delta", {}).get("content") or ""
+                except (ValueError, KeyError, IndexError, TypeError, AttributeError) as e:
+                    raise RuntimeError(f"Unexpected LLM stream chunk: {e}")
+                content.append(delta)
+                found = scanner.feed(delta)
+                if found is not None:
+                    logger.debug("Complete JSON object received; closing the LLM stream early")
+                    return found
+        except requests.RequestException as e:
+            raise RuntimeError(f"LLM stream from {self.base_url} failed: {e}")
+        return "".join(content).strip()
+
+
+_JSON_DECODER = json.JSONDecoder()
+
+
+class _JsonSpanScanner:
+    """Find the first complete, valid JSON object (or array) in text fed whole or piece by piece.
+
+    One left-to-right pass: a regex jumps straight to the next bracket, quote or backslash,
+    so nothing is scanned twice and brackets inside strings are skipped. Balanced spans are
+    recorded; when an outermost one closes, it and then the spans nested in it are tried in
+    order of their start, each with one raw_decode that stops at the first invalid character,
+    so a failed try costs at most the length of the outermost span around it.
+    Prose such as "{see below}" is thus passed over without losing an object nested in it.
+    finish() also tries the spans inside a bracket that never closed.
+    """
+
+    def __init__(self, brackets="{}"):
+        self.value = None
+        self.start = None
+        self._opener, self._closer = brackets
+        self._special = re.compile(f'[{re.escape(brackets)}"\\\\]')
+        self._pieces = []
+        self._length = 0
+        self._open = []    # start offsets of brackets not closed yet
+        self._closed = []  # (start, end) of balanced spans not tried yet
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, text):
+        """Consume the next piece of text; return the found value's text, else None."""
+        base = self._length
+        self._pieces.append(text)
+        self._length += len(text)
+        i = 0
+        if self._escaped and text:
+            self._escaped = False
+            i = 1
+        while (match := self._special.search(text, i)) is not None:
+            i = match.end()
+            ch = match.group()
+            if self._in_string:
+                i = self._string_char(ch, text, i)
+            elif ch == self._opener:
+                self._open.append(base + match.start())
+            elif not self._open:
+                continue  # quotes and stray closers in the surrounding prose
+            elif ch == '"':
+                self._in_string = True
+            elif ch == self._closer:
+                self._closed.append((self._open.pop(), base + i))
+                if not self._open:
+                    found = self._try_closed()
+                    if found is not None:
+                        return found
+        return None
+
+    def _string_char(self, ch, text, i):
+        """Take in a bracket, quote or backslash inside a string; return where the scan goes on."""
+        if ch == '"':
+            self._in_string = False
+        elif ch == "\\":
+            if i < len(text):
+                return i + 1  # skip the escaped character
+            self._escaped = True  # it starts the next piece
+        return i
+
+    def finish(self):
+        """After the last piece: try the spans nested in a bracket that never closed."""
+        self._open = []
+        return self._try_closed()
+
+    def _try_closed(self):
+        text = "".join(self._pieces)
+        self._pieces = [text]
+        candidates, self._closed = sorted(self._closed), []
+        outer_start, outer_end, outer = 0, -1, ""
+        for start, end in candidates:
+            if end > outer_end:
+                # Decode within a copy of the outermost span: a failed raw_decode counts the lines
+                # before the error, which over the whole text would make each failure O(n).
+                outer_start, outer_end, outer = start, end, text[start:end]
+            try:
+                self.value, stop = _JSON_DECODER.raw_decode(outer, start - outer_start)
+            except (json.JSONDecodeError, RecursionError):
+                continue
+            self.start = start
+            return outer[start - outer_start:stop]
+        return None
+
 
 def get_provider() -> LLMProvider:
-    """Build the configured LLM provider. Lazy — called only from the Digest path."""
+    """Build the configured LLM provider. Lazy — called only from the Digest path.
+
+    With LLM_FALLBACKS this is a ProviderChain over the main backend and the fallbacks.
+    """
+    cfg = get_config()
+    main = LLMBackend(
+        name=(cfg.LLM_PROVIDER or "copilot").strip().lower(),
+        LLM_PROVIDER=cfg.LLM_PROVIDER,
+        LLM_BASE_URL=cfg.LLM_BASE_URL,
+        LLM_MODEL=cfg.LLM_MODEL,
+        LLM_API_KEY=cfg.LLM_API_KEY,
+        LLM_RATE_PER_MINUTE=cfg.LLM_RATE_PER_MINUTE,
+        LLM_MAX_CONCURRENCY=cfg.LLM_MAX_CONCURRENCY,
+        LLM_LATENCY_TARGET=cfg.LLM_LATENCY_TARGET,
+        LLM_STREAM=cfg.LLM_STREAM,
+        LLM_JSON_MODE=cfg.LLM_JSON_MODE,
+    )
+    if not cfg.LLM_FALLBACKS:
+        return _build_provider(main)
+    chain = [(backend.name, _build_provider(backend)) for backend in (main, *cfg.LLM_FALLBACKS)]
+    return ProviderChain(chain, hedge_seconds=cfg.LLM_HEDGE_SECONDS)
+
+
+def _build_provider(backend) -> LLMProvider:
     cfg = get_config()
-    provider = (cfg.LLM_PROVIDER or "copilot").strip().lower()
-    if provider == "copilot":
-        return CopilotCliProvider()
-    if provider == "openai_compatible":
-        return OpenAICompatibleProvider(
-            base_url=cfg.LLM_BASE_URL,
-            model=cfg.LLM_MODEL,
-            api_key=cfg.LLM_API_KEY,
+    provider_type = (backend.LLM_PROVIDER or "copilot").strip().lower()
+    if provider_type == "copilot":
+        provider = CopilotCliProvider(limiter=_backend_limiter(backend),
+                                      breaker=_circuit_breaker(f"LLM backend '{backend.name}'"))
+    elif provider_type == "openai_compatible":
+        provider = OpenAICompatibleProvider(
+            base_url=backend.LLM_BASE_URL,
+            model=backend.LLM_MODEL,
+            api_key=backend.LLM_API_KEY,
             timeout=cfg.LLM_TIMEOUT,
+            stream=backend.LLM_STREAM,
+            json_mode=backend.LLM_JSON_MODE,
+            limiter=_backend_limiter(backend),
+            breaker=_circuit_breaker(f"LLM backend '{backend.name}'"),
         )
-    raise RuntimeError(
-        f"Unknown LLM_PROVIDER {provider!r}; expected 'copilot' or 'openai_compatible'"
-    )
+    else:
+        raise RuntimeError(
+            f"Unknown LLM_PROVIDER {provider_type!r}; expected 'copilot' or 'openai_compatible'"
+        )
+    provider.backend_name = backend.name
+    return provider
+
+
+class ProviderChain(LLMProvider):
+    """Several providers tried in order: the next one takes over when one fails.
+
+    With hedge_seconds > 0 the next provider is also started while the current one is
+    still working once that much time has passed, and the first usable answer wins.
+    Every member is built by _build_provider, so each keeps the no-tools guarantee
+    (ADR 0002); the chain itself only decides who is asked. A slow provider that loses
+    a hedge is left to finish in the background and its answer is dropped.
+    """
+
+    def __init__(self, providers, hedge_seconds=0):
+        self.providers = providers  # [(name, LLMProvider)] in order of preference
+        self.hedge_seconds = hedge_seconds
+
+    def health_check(self) -> None:
+        failures = []
+        for name, provider in self.providers:
+            try:
+                provider.health_check()
+            except RuntimeError as e:
+                logger.warning(f"LLM provider '{name}' is not available: {e}")
+                failures.append(f"{name}: {e}")
+        if len(failures) == len(self.providers):
+            raise RuntimeError("No LLM provider is available (" + "; ".join(failures) + ")")
+
+    def complete(self, prompt: str, schema=None) -> str:
+        if self.hedge_seconds > 0:
+            return self._complete_hedged(prompt, schema)
+        errors = []
+        for name, provider in self.providers:
+            if errors:
+                _count_failover(name, errors[-1])
+            try:
+                answer = provider.complete(prompt, schema=schema)
+            except RuntimeError as e:
+                errors.append(e)
+                continue
+            _answering_backend.name = name
+            return answer
+        raise _all_failed(errors)
+
+    def _complete_hedged(self, prompt, schema):
+        waiting = list(self.providers)
+        running = {}  # Future -> provider name
+        invalid = None  # first answer that failed validation, returned if nothing better comes
+        errors = []
+        pool = ThreadPoolExecutor(max_workers=len(self.providers))
+        try:
+            while True:
+                if waiting and not running:
+                    if errors:
+                        _count_failover(waiting[0][0], errors[-1])
+                    name, provider = waiting.pop(0)
+                    running[pool.submit(provider.complete, prompt, schema=schema)] = name
+                done, _ = wait(running, timeout=self.hedge_seconds if waiting else None, return_when=FIRST_COMPLETED)
+                if not done:
+                    name, provider = waiting.pop(0)
+                    logger.info(f"No LLM answer after {self.hedge_seconds}s; also asking '{name}'")
+                    with _RUN_STATS_LOCK:
+                        RUN_STATS["llm_hedges"] += 1
+                    running[pool.submit(provider.complete, prompt, schema=schema)] = name
+                    continue
+                for name, answer in _finished_answers(done, running, errors):
+                    if _usable_answer(answer, schema):
+                        _answering_backend.name = name
+                        return answer
+                    logger.warning(f"LLM provider '{name}' gave an unusable answer")
+                    invalid = (name, answer) if invalid is None else invalid
+                if not running and not waiting:
+                    if invalid is not None:
+                        _answering_backend.name, answer = invalid
+                        return answer
+                    raise _all_failed(errors)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _finished_answers(done, running, errors):
+    """(name, answer) of each finished hedged call, taken out of running; failures go to errors."""
+    for future in done:
+        name = running.pop(future)
+        try:
+            answer = future.result()
+        except RuntimeError as e:
+            logger.warning(f"LLM provider '{name}' failed: {e}")
+            errors.append(e)
+            continue
+        yield name, answer
+
+
+def _all_failed(errors):
+    """The error for a chain where no provider answered; CircuitOpenError if none was even called."""
+    error_type = CircuitOpenError if all(isinstance(e, CircuitOpenError) for e in errors) else RuntimeError
+    return error_type(f"All LLM providers failed; last error: {errors[-1]}")
+
+
+def _count_failover(name, error):
+    logger.warning(f"LLM provider failed ({error}); failing over to '{name}'")
+    with _RUN_STATS_LOCK:
+        RUN_STATS["llm_failovers"] += 1
+
+
+def _usable_answer(raw, schema):
+    """Whether an answer would pass validation for the schema it was asked with."""
+    if schema is DIGEST_BATCH_JSON_SCHEMA:
+        try:
+            _extract_json_array(raw)
+            return True
+        except ValueError:
+            return False
+    if schema is DIGEST_JSON_SCHEMA:
+        try:
+            _dict_to_digest(_extract_json(raw))
+            return True
+        except (ValueError, AttributeError, TypeError):
+            return _repaired_digest(raw) is not None
+    return True
 
 
 def _extract_json(text):
-    # 1. Clean parse
+    # 1. Clean parse (absurdly deep nesting raises RecursionError rather than JSONDecodeError)
     try:
         return json.loads(text)
-    except json.JSONDecodeError:
+    except (json.JSONDecodeError, RecursionError):
         pass
-    # 2. Markdown-fenced JSON block
-    match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', text, re.DOTALL)
-    if match:
-        try:
-            return json.loads(match.group(1))
-        except json.JSONDecodeError:
-            pass
-    # 3. Scan forward and use raw_decode to find the first VALID JSON object
-    #    (avoids greedy-regex failures when Copilot wraps JSON in prose)
-    decoder = json.JSONDecoder()
-    idx = 0
-    while idx < len(text):
-        start = text.find('{', idx)
-        if start == -1:
-            break
-        try:
-            obj, _ = decoder.raw_decode(text, start)
-            return obj
-        except json.JSONDecodeError:
-            idx = start + 1
+    # 2. Markdown-fenced JSON block (split on the fences; a lazy DOTALL regex backtracks badly)
+    for block in text.split("```")[1::2]:
+        block = block.strip()
+        if block.startswith("json"):
+            block = block[len("json"):].lstrip()
+        if block.startswith("{"):
+            try:
+                return json.loads(block)
+            except (json.JSONDecodeError, RecursionError):
+                pass
+    # 3. First VALID object anywhere, in one linear pass (Copilot wraps JSON in prose; trying
+    #    raw_decode at every '{' was quadratic on long, brace-heavy answers)
+    scanner = _JsonSpanScanner()
+    if scanner.feed(text) is not None or scanner.finish() is not None:
+        return scanner.value
     raise ValueError("No valid JSON found in response")
 
 
+_DOUBLE_QUOTES = '"\u201c\u201d\u201e'
+_SINGLE_QUOTES = "'\u2018\u2019"
+_JSON_WORDS = {"true": "true", "false": "false", "null": "null", "True": "true", "False": "false", "None": "null"}
+_BARE_WORD_RE = re.compile(r'[^\W\d]\w*')  # any script's letters, so 'één' is one word
+_STRING_CONTROL_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}
+
+
+def _drop_trailing_comma(out):
+    i = len(out) - 1
+    while i >= 0 and out[i].isspace():
+        i -= 1
+    if i >= 0 and out[i] == ",":
+        del out[i]
+
+
+def _repair_json(text):
+    """Rewrite an almost-valid JSON object into a valid one; returns the dict or raises ValueError.
+
+    Deterministic fixes for what models get wrong: prose around the object, smart or single
+    quotes, unquoted keys, Python's True/False/None, raw line breaks inside strings, trailing
+    commas, and a string or brackets left open at the end of the answer.
+    """
+    i = text.find("{")
+    if i == -1:
+        raise ValueError("No JSON object to repair")
+    out = []
+    closers = []
+    quote = None  # characters that end the string being read
+    while i < len(text):
+        ch = text[i]
+        i += 1
+        if quote is not None:
+            i, quote = _repair_string_char(text, i, ch, quote, out)
+        elif opened := _string_quotes(ch):
+            quote = opened
+            out.append('"')
+        elif ch in "{}[]":
+            _repair_bracket(ch, out, closers)
+            if not closers:
+                break  # the object is complete; anything after it is prose
+        elif bare := _BARE_WORD_RE.match(text, i - 1):
+            word = bare.group()
+            i += len(word) - 1
+            out.append(_JSON_WORDS.get(word) or json.dumps(word))
+        else:
+            out.append(ch)
+    if quote is not None:
+        out.append('"')
+    _close_brackets(out, closers)
+    data = json.loads("".join(out))
+    if not isinstance(data, dict):
+        raise ValueError("Repaired JSON is not an object")
+    return data
+
+
+def _string_quotes(ch):
+    """The characters that end a string opened by ch, or None when ch opens no string."""
+    if ch in _DOUBLE_QUOTES:
+        return '"' if ch == '"' else _DOUBLE_QUOTES
+    if ch in _SINGLE_QUOTES:
+        return "'\u2019"
+    return None
+
+
+def _repair_string_char(text, i, ch, quote, out):
+    """Copy one character of a string into out; returns (next index, quote or None once it closed)."""
+    if ch == "\\" and i < len(text):
+        out.append("'" if text[i] == "'" else ch + text[i])
+        return i + 1, quote
+    if ch in quote:
+        out.append('"')
+        return i, None
+    out.append('\\"' if ch == '"' else _STRING_CONTROL_ESCAPES.get(ch, ch))
+    return i, quote
+
+
+def _repair_bracket(ch, out, closers):
+    if ch in "{[":
+        closers.append("}" if ch == "{" else "]")
+        out.append(ch)
+    else:
+        _close_brackets(out, closers, until=ch)
+
+
+def _close_brackets(out, closers, until=None):
+    """Close open brackets, dropping trailing commas: through the innermost `until`, or all of them."""
+    while closers:
+        _drop_trailing_comma(out)
+        out.append(closers.pop())
+        if out[-1] == until:
+            return
+
+
+def _repaired_digest(raw):
+    """The Digest in an almost-valid answer, or None when local repair cannot save it."""
+    try:
+        return _dict_to_digest(_repair_json(raw))
+    except (ValueError, RecursionError):
+        return None
+
+
 def _dict_to_digest(data: dict) -> Digest:
     """Validate a raw JSON dict's semantics (not just its shape) and convert it to a typed Digest.
 
@@ -511,6 +1662,8 @@ def _dict_to_digest(data: dict) -> Digest:
     no actual content (empty tldr with no action items or key dates) so callers can retry instead of
     silently accepting an incomplete brief.
     """
+    if not isinstance(data, dict):
+        raise ValueError(f"Expected a JSON object, got {type(data).__name__}")
     missing = REQUIRED_DIGEST_FIELDS - set(data.keys())
     if missing:
         raise ValueError(f"Missing required fields: {missing}")
@@ -518,7 +1671,7 @@ def _dict_to_digest(data: dict) -> Digest:
         raise ValueError("'translated_title' must be a non-empty string")
     if not isinstance(data.get("tldr"), str):
         raise ValueError("'tldr' must be a string")
-    for field in ("action_items", "key_dates"):
+    for field in _DIGEST_LIST_FIELDS:
         items = data[field]
         if not isinstance(items, list):
             raise ValueError(f"Field '{field}' must be a list")
@@ -539,24 +1692,27 @@ def _dict_to_digest(data: dict) -> Digest:
     )
 
 
-def _extract_action_hints(text):
+def _extract_action_hints(*texts):
     """Pull candidate dates, times, and imperative phrases out of raw text as hints for the Digest prompt.
 
     This is a lightweight heuristic pre-pass, not a substitute for the model's judgment: it just
     surfaces likely obligations/dates in the source text so the prompt can point the model at them
-    instead of relying purely on it to notice them unaided.
+    instead of relying purely on it to notice them unaided. Several texts (the body and each
+    attachment) are scanned one at a time rather than joined into one more copy.
     """
-    hints = []
-    for match in _DATE_HINT_RE.finditer(text):
-        hints.append(f"date: {match.group(0).strip()}")
-    for match in _TIME_HINT_RE.finditer(text):
-        hints.append(f"time: {match.group(0)}")
-    for match in _IMPERATIVE_HINT_RE.finditer(text):
-        start = max(0, match.start() - 20)
-        end = min(len(text), match.end() + 40)
-        snippet = " ".join(text[start:end].split())
-        hints.append(f"instruction: \u2026{snippet}\u2026")
-    return hints
+    dates, times, instructions = [], [], []
+    for text in texts:
+        text = str(text)
+        for match in _DATE_HINT_RE.finditer(text):
+            dates.append(f"date: {match.group(0).strip()}")
+        for match in _TIME_HINT_RE.finditer(text):
+            times.append(f"time: {match.group(0)}")
+        for match in _IMPERATIVE_HINT_RE.finditer(text):
+            start = max(0, match.start() - 20)
+            end = min(len(text), match.end() + 40)
+            snippet = " ".join(text[start:end].split())
+            instructions.append(f"instruction: \u2026{snippet}\u2026")
+    return dates + times + instructions
 
 
 def _get_article_id(article):
@@ -629,112 +1785,1518 @@ def render_digest_notification(data: Digest, failed_attachments=None, original_t
     return "\n\n".join(sections)
 
 
-def generate_digest(title, body, attachments):
-    language = get_config().TRANSLATION_LANGUAGE
-    attachment_text = ""
-    if attachments:
-        parts = [f"\n\n[Attachment: {a.filename}]\n{a.text}" for a in attachments if not a.failed]
-        failed_parts = [f"\n\n[Attachment: {a.filename} \u2014 could not be extracted]" for a in attachments if a.failed]
-        attachment_text = "".join(parts + failed_parts)
-
-    hint_source = "\n".join([body] + [a.text for a in attachments if not a.failed])
-    hints = _extract_action_hints(hint_source)
-    hints_text = ""
-    if hints:
-        hints_text = (
-            "\n\nPre-scan hints (candidate dates/times/instructions detected automatically; "
-            "verify each against the message above \u2014 don't invent an item just because it's "
-            "listed here):\n" + "\n".join(f"- {h}" for h in hints)
-        )
+def _attachment_heading(attachment):
+    """Name an attachment in the prompt, telling the model when it is cut short or stood in for."""
+    if attachment.parts_read:
+        return (f"{attachment.filename} \u2014 too long to include, read in {attachment.parts_read} parts; "
+                "the action items and dates found in it")
+    if not attachment.truncated:
+        if attachment.lines_omitted:
+            return (f"{attachment.filename} \u2014 excerpts around dates and instructions only, "
+                    f"{attachment.lines_omitted} line(s) left out")
+        return attachment.filename
+    if not attachment.text:
+        return f"{attachment.filename} \u2014 not included, the text budget for this message was already used"
+    if attachment.pages_skipped:
+        return (f"{attachment.filename} \u2014 truncated, the last {attachment.pages_skipped} page(s) "
+                "were not included")
+    return f"{attachment.filename} \u2014 truncated to fit the text budget"
+
+
+def _digest_cache_key(prompt):
+    """Hash of everything that decides the Digest: the final prompt, the backend and the language."""
+    cfg = get_config()
+    identity = [cfg.LLM_PROVIDER.strip().lower(), cfg.LLM_BASE_URL, cfg.LLM_MODEL, cfg.TRANSLATION_LANGUAGE, prompt]
+    return hashlib.sha256(json.dumps(identity).encode("utf-8")).hexdigest()
 
-    prompt = DIGEST_PROMPT_TEMPLATE.format(
-        language=language,
-        title=title,
-        body=body,
-        attachments=attachment_text,
-        hints=hints_text,
-    )
 
-    provider = get_provider()
-    logger.info(f"Generating Digest via {type(provider).__name__}")
-    raw = provider.complete(prompt)
-    logger.debug(f"LLM raw response:\n{raw}")
+def _load_digest_cache():
+    try:
+        if os.path.exists(DIGEST_CACHE_FILE):
+            with open(DIGEST_CACHE_FILE, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {}
+    except Exception as e:
+        logger.error(f"Error loading digest cache: {e}")
+        return {}
 
+
+def _cached_digest(key):
+    """Return the cached Digest for key, or None if absent, expired or no longer valid."""
+    entry = _load_digest_cache().get(key)
+    if entry is None:
+        return None
+    ttl_days = get_config().DIGEST_CACHE_TTL_DAYS
+    if ttl_days > 0 and time.time() - entry.get("created", 0) > ttl_days * 86400:
+        return None
     try:
-        digest = _dict_to_digest(_extract_json(raw))
-    except (ValueError, json.JSONDecodeError) as e:
-        logger.warning(f"Digest response invalid ({e}), retrying once")
-        retry_prompt = (
-            "The previous response was not valid JSON, was missing required fields, or had no "
-            f"actual content. Respond with ONLY this JSON structure (no markdown, no explanation), "
-            f"with every text value written in {language}:\n"
-            '{\n  "translated_title": "...",\n  "tldr": "...",\n'
-            '  "action_items": [...],\n  "key_dates": [...]\n}\n\n'
-            f"Previous invalid response:\n{raw}\n\n"
-            f"Original prompt:\n{prompt}"
-        )
-        raw = provider.complete(retry_prompt)
-        try:
-            digest = _dict_to_digest(_extract_json(raw))
-        except (ValueError, json.JSONDecodeError) as e2:
-            logger.warning(f"Digest retry also invalid ({e2}), using safe fallback")
-            digest = Digest(
-                translated_title=title,
-                tldr="(Could not generate summary \u2014 open the original post for details)",
-                action_items=[],
-                key_dates=[],
-            )
+        return _dict_to_digest(entry["digest"])
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return None
 
-    logger.info("Digest validated successfully")
 
-    return digest
+_DIGEST_CACHE_LOCK = threading.Lock()  # Digests may be generated concurrently (LLM_CONCURRENCY)
 
 
-def process_pdf_links(playwright, browser, context, pdf_links):
-    attachments = []
-    with tempfile.TemporaryDirectory() as temp_dir:
-        for link in pdf_links:
-            pdf_url = link.get_attribute("href")
-            pdf_filename = pdf_url.split("/")[-1].split("?")[0]
-            pdf_path = os.path.join(temp_dir, pdf_filename)
-            try:
-                _download_pdf(pdf_url, pdf_path, browser_context=context)
-                text = extract_text(pdf_path)
-                attachments.append(Attachment(filename=pdf_filename, url=pdf_url, filetype="pdf", text=text))
-            except Exception as e:
-                logger.error(f"Failed to process PDF '{pdf_filename}': {e}")
-                attachments.append(Attachment(filename=pdf_filename, url=pdf_url, filetype="pdf", text="", failed=True))
-    return attachments
+def _store_digest(key, digest):
+    """Save a validated Digest, dropping expired entries and then the oldest beyond the size limit."""
+    with _DIGEST_CACHE_LOCK:
+        _write_digest_cache_entry(key, digest)
 
 
-def extract_text_from_docx(docx_path):
-    logger.info(f"Extracting text from Word document {docx_path}")
-    doc = Document(docx_path)
-    text = ""
-    for paragraph in doc.paragraphs:
-        text += paragraph.text + "\n"
-    logger.info(f"Text extraction complete for {docx_path}")
-    return text
+def _write_digest_cache_entry(key, digest):
+    cfg = get_config()
+    try:
+        cache = _load_digest_cache()
+        now = time.time()
+        cache[key] = {"created": now, "digest": asdict(digest)}
+        if cfg.DIGEST_CACHE_TTL_DAYS > 0:
+            cache = {k: v for k, v in cache.items() if now - v.get("created", 0) <= cfg.DIGEST_CACHE_TTL_DAYS * 86400}
+        if cfg.DIGEST_CACHE_MAX_ENTRIES > 0 and len(cache) > cfg.DIGEST_CACHE_MAX_ENTRIES:
+            newest = sorted(cache.items(), key=lambda item: item[1].get("created", 0))[-cfg.DIGEST_CACHE_MAX_ENTRIES:]
+            cache = dict(newest)
+        temp_path = f"{DIGEST_CACHE_FILE}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f)
+        os.replace(temp_path, DIGEST_CACHE_FILE)
+    except Exception as e:
+        logger.error(f"Error saving digest cache: {e}")
 
 
-def process_docx_links(playwright, browser, context, docx_links):
-    attachments = []
-    with tempfile.TemporaryDirectory() as temp_dir:
-        for link in docx_links:
-            docx_url = link.get_attribute("href")
-            docx_filename = docx_url.split("/")[-1].split("?")[0]
-            docx_path = os.path.join(temp_dir, docx_filename)
+# Per thread: the ProviderChain member that gave the last answer _complete returned.
+_answering_backend = threading.local()
+
+
+def _complete(provider, prompt, schema=None):
+    """provider.complete, timed into RUN_STATS so the run summary shows real LLM time."""
+    _answering_backend.name = None
+    start = time.monotonic()
+    try:
+        return provider.complete(prompt, schema=schema)
+    finally:
+        with _RUN_STATS_LOCK:
+            RUN_STATS["llm_calls"] += 1
+            RUN_STATS["llm_seconds"] += time.monotonic() - start
+
+
+def _answered_by(provider):
+    """Name of the backend behind this thread's last _complete answer, for the per-backend stats."""
+    name = _answering_backend.name or getattr(provider, "backend_name", None)
+    return name if isinstance(name, str) else type(provider).__name__
+
+
+def _cache_fresh_digest(key, digest):
+    """Store a Digest just generated, unless a fallback backend answered for the main one."""
+    if _answered_by_fallback():
+        logger.info(f"Digest answered by fallback backend '{_answering_backend.name}', not caching it")
+        return
+    _store_digest(key, digest)
+
+
+def _answered_by_fallback():
+    """Whether this thread's last _complete answer came from an LLM_FALLBACKS backend.
+
+    The Digest cache key names the main backend, so such answers are not cached under it.
+    """
+    return _answering_backend.name in {backend.name for backend in get_config().LLM_FALLBACKS}
+
+
+# Stands in for the attachments while the rest of the prompt template is formatted.
+_ATTACHMENTS_SLOT = "\x00attachments\x00"
+
+
+def _write_attachment_parts(out, attachments):
+    for a in attachments:
+        if not a.failed:
+            out.write(f"\n\n[Attachment: {_attachment_heading(a)}]\n")
+            _write_text(out, a.text)
+    for a in attachments:
+        if a.failed:
+            out.write(f"\n\n[Attachment: {a.filename} \u2014 could not be extracted]")
+
+
+_DIGEST_ANSWER_TOKENS = 1024  # part of LLM_CONTEXT_TOKENS kept free for the JSON answer
+_BODY_SHORTENED_MARK = "\n[\u2026 message shortened to fit the model's context]"
+
+
+def _share_out(sizes, budget):
+    """Split `budget` over items of the given sizes.
+
+    Items that need less than an even share get everything they need; what they leave
+    over is divided among the larger ones in proportion to their size.
+    """
+    shares = [0] * len(sizes)
+    pending = sorted(range(len(sizes)), key=lambda i: sizes[i])
+    while pending and sizes[pending[0]] * len(pending) <= budget:
+        i = pending.pop(0)
+        shares[i] = sizes[i]
+        budget -= sizes[i]
+    total = sum(sizes[i] for i in pending)
+    for i in pending:
+        shares[i] = budget * sizes[i] // total
+    return shares
+
+
+def _fit_prompt_to_context(title, body, hints, attachments, fixed_chars):
+    """Cut body, hints and attachments down so the Digest prompt fits LLM_CONTEXT_TOKENS.
+
+    The body and the pre-scan hints come first: hints may use up to half of the room
+    left after the template, the body whatever it needs of the rest. Attachments then
+    share what remains (see _share_out); a shortened one is marked truncated so its
+    prompt heading says so. Returns (body, hints, attachments) and logs what was cut.
+    """
+    context_tokens = get_config().LLM_CONTEXT_TOKENS
+    if context_tokens <= 0:
+        return body, hints, attachments
+    extracted = [a for a in attachments if not a.failed]
+    headings = sum(len(f"\n\n[Attachment: {a.filename} \u2014 truncated to fit the text budget]\n")
+                   for a in attachments)
+    room = (context_tokens - _DIGEST_ANSWER_TOKENS) * 4 - fixed_chars - headings
+    cuts = []
+
+    kept_hints = []
+    hint_room = max(room, 0) // 2
+    for hint in hints:
+        hint_room -= len(hint) + 3
+        if hint_room < 0:
+            break
+        kept_hints.append(hint)
+    if len(kept_hints) < len(hints):
+        cuts.append(f"{len(hints) - len(kept_hints)} of {len(hints)} hints dropped")
+    room -= sum(len(hint) + 3 for hint in kept_hints)
+
+    if len(body) > max(room, 0):
+        keep = max(room - len(_BODY_SHORTENED_MARK), 0)
+        cuts.append(f"body ~{_estimate_tokens(body)} -> ~{_estimate_tokens(body[:keep])} tokens")
+        body = body[:keep] + _BODY_SHORTENED_MARK
+    room -= len(body)
+
+    shares = iter(_share_out([len(a.text) for a in extracted], max(room, 0)))
+    fitted = []
+    for a in attachments:
+        share = None if a.failed else next(shares)
+        if share is not None and share < len(a.text):
+            cuts.append(f"'{a.filename}' ~{_estimate_tokens(a.text)} -> ~{(share + 3) // 4} tokens")
+            a = replace(a, text=a.text[:share], truncated=True, pages_skipped=0)
+        fitted.append(a)
+    if cuts:
+        logger.info(f"Digest prompt for '{title}' cut to fit LLM_CONTEXT_TOKENS={context_tokens}: "
+                    + "; ".join(cuts))
+    return body, kept_hints, fitted
+
+
+_PASSAGE_CONTEXT_LINES = 2  # lines kept on either side of a line with a hint match
+_HEADING_RE = re.compile(r'^\s*(?:\d+(?:\.\d+)*\.?\s+)?[A-Z\u00c0-\u00de][^\t.!?;,]{0,60}$')
+
+
+def _has_hint(line):
+    return bool(_DATE_HINT_RE.search(line) or _TIME_HINT_RE.search(line) or _IMPERATIVE_HINT_RE.search(line))
+
+
+def _select_passages(text):
+    """Cut text down to the lines around hint matches, plus the heading of each passage's section.
+
+    Each left-out stretch becomes one marker line. Returns (excerpt, lines left out), or
+    (text, 0) when nothing matched, so an attachment without hints is still sent whole.
+    Spilled text is read twice from its file rather than held in memory.
+    """
+    keep = _passage_lines(text)
+    if not any(keep):
+        return text, 0
+    out, gap = [], 0
+    for line, kept in zip(_text_lines(text), keep):
+        if not kept:
+            gap += 1
+            continue
+        if gap:
+            out.append(f"[\u2026 {gap} line(s) left out \u2026]")
+            gap = 0
+        out.append(line)
+    if gap:
+        out.append(f"[\u2026 {gap} line(s) left out \u2026]")
+    return "\n".join(out), keep.count(False)
+
+
+def _passage_lines(text):
+    """Per line of text, whether _select_passages keeps it."""
+    hits, headings = [], []
+    for line in _text_lines(text):
+        hits.append(_has_hint(line))
+        headings.append(bool(line.strip() and _HEADING_RE.match(line)))
+    keep = [False] * len(hits)
+    for i in (i for i, hit in enumerate(hits) if hit):
+        for j in range(max(0, i - _PASSAGE_CONTEXT_LINES), min(len(hits), i + _PASSAGE_CONTEXT_LINES + 1)):
+            keep[j] = True
+    heading = None
+    for i in range(len(keep)):
+        if keep[i] and (i == 0 or not keep[i - 1]) and heading is not None:
+            keep[heading] = True
+        if headings[i]:
+            heading = i
+    return keep
+
+
+def _select_attachment_passages(title, attachments):
+    """Apply _select_passages to every attachment longer than PASSAGE_SELECTION_CHARS."""
+    threshold = get_config().PASSAGE_SELECTION_CHARS
+    if threshold <= 0:
+        return attachments
+    selected = []
+    for a in attachments:
+        if not a.failed and len(a.text) > threshold:
+            excerpt, omitted = _select_passages(a.text)
+            if omitted:
+                logger.info(f"Passage selection for '{a.filename}' in '{title}': ~{_estimate_tokens(a.text)} -> "
+                            f"~{_estimate_tokens(excerpt)} tokens, {omitted} line(s) left out")
+                a = replace(a, text=excerpt, lines_omitted=omitted)
+        selected.append(a)
+    return selected
+
+
+def _hints_text(hints):
+    return _HINTS_INTRO + "\n" + "\n".join(f"- {h}" for h in hints) if hints else ""
+
+
+def _build_digest_prompt(title, body, attachments):
+    """Format DIGEST_PROMPT_TEMPLATE, streaming attachment text (spilled or not) into one buffer.
+
+    The attachment text is written straight into the prompt rather than first joined into a
+    separate string, so the prompt is the only full copy built here. Hints are taken from the
+    full texts, before long attachments are cut down to the passages around them
+    (PASSAGE_SELECTION_CHARS) and before anything is cut to fit the model's context window.
+    """
+    language = get_config().TRANSLATION_LANGUAGE
+    hints = _extract_action_hints(body, *(a.text for a in attachments if not a.failed))
+    attachments = _select_attachment_passages(title, attachments)
+    fixed_chars = len(DIGEST_PROMPT_TEMPLATE.format(
+        language=language, title=title, body="", attachments="", hints=_HINTS_INTRO))
+    body, hints, attachments = _fit_prompt_to_context(title, body, hints, attachments, fixed_chars)
+    hints_text = _hints_text(hints)
+
+    head, tail = DIGEST_PROMPT_TEMPLATE.format(
+        language=language,
+        title=title,
+        body=body,
+        attachments=_ATTACHMENTS_SLOT,
+        hints=hints_text,
+    ).split(_ATTACHMENTS_SLOT, 1)
+    out = StringIO()
+    out.write(head)
+    _write_attachment_parts(out, attachments)
+    out.write(tail)
+    prompt = out.getvalue()
+    logger.info(f"Digest prompt for '{title}': ~{_estimate_tokens(prompt)} tokens")
+    return prompt
+
+
+_MAP_REDUCE_WORKERS = 4  # attachment parts read at the same time (LLM_MAX_CONCURRENCY may allow fewer)
+
+
+def _text_chunks(text, size):
+    """Split a str or SpilledText into pieces of at most `size` characters, at line ends where possible."""
+    chunk, length = [], 0
+    for line in _text_lines(text):
+        while len(line) > size:
+            if chunk:
+                yield "\n".join(chunk)
+                chunk, length = [], 0
+            yield line[:size]
+            line = line[size:]
+        if chunk and length + 1 + len(line) > size:
+            yield "\n".join(chunk)
+            chunk, length = [], 0
+        length += len(line) + (1 if chunk else 0)
+        chunk.append(line)
+    if chunk:
+        yield "\n".join(chunk)
+
+
+def _part_items(raw):
+    """(action_items, key_dates) from the answer for one attachment part; ValueError if unusable."""
+    try:
+        data = _extract_json(raw)
+    except (ValueError, json.JSONDecodeError):
+        data = _repair_json(raw)
+    if not isinstance(data, dict):
+        raise ValueError("Answer is not a JSON object")
+    items = []
+    for field in _DIGEST_LIST_FIELDS:
+        if not isinstance(data.get(field), list):
+            raise ValueError(f"Field '{field}' must be a list")
+        items.append([item.strip() for item in data[field] if isinstance(item, str) and item.strip()])
+    return items
+
+
+def _read_attachment_part(provider, title, attachment, part, parts, text):
+    """Ask for the items in one part of an attachment. Returns (items or None, seconds taken)."""
+    prompt = ATTACHMENT_PART_PROMPT_TEMPLATE.format(
+        language=get_config().TRANSLATION_LANGUAGE, title=title, filename=attachment.filename,
+        part=part, parts=parts, text=text,
+    )
+    start = time.monotonic()
+    raw = _complete(provider, prompt, schema=ATTACHMENT_PART_JSON_SCHEMA)
+    seconds = time.monotonic() - start
+    try:
+        return _part_items(raw), seconds
+    except (ValueError, RecursionError) as e:
+        logger.warning(f"Part {part}/{parts} of '{attachment.filename}' gave an invalid answer ({e}); left out")
+        return None, seconds
+
+
+def _found_items_text(answers):
+    """The text standing in for an attachment that was read in parts: its items, without duplicates."""
+    actions, dates, unread = {}, {}, []
+    for part, (items, _) in enumerate(answers, 1):
+        if items is None:
+            unread.append(str(part))
+            continue
+        actions.update(dict.fromkeys(items[0]))
+        dates.update(dict.fromkeys(items[1]))
+    lines = ["Action items found:", *(f"- {item}" for item in actions or ["(none)"]),
+             "Dates found:", *(f"- {item}" for item in dates or ["(none)"])]
+    if unread:
+        lines.append(f"(Part(s) {', '.join(unread)} of {len(answers)} could not be read.)")
+    return "\n".join(lines)
+
+
+def _map_long_attachments(provider, title, attachments):
+    """Replace each attachment longer than MAP_REDUCE_CHUNK_CHARS by the items found in its parts.
+
+    Every part gets its own small LLM call, up to _MAP_REDUCE_WORKERS at once, so no call has
+    to read more than one part however long the attachment is. The Digest is then written
+    from the message and these item lists (see _found_items_text). Provider errors propagate,
+    and parts not yet started are cancelled.
+    """
+    size = get_config().MAP_REDUCE_CHUNK_CHARS
+    long_ones = [i for i, a in enumerate(attachments) if size > 0 and not a.failed and len(a.text) > size]
+    if not long_ones:
+        return attachments
+    mapped = list(attachments)
+    start = time.monotonic()
+    pool = ThreadPoolExecutor(max_workers=_MAP_REDUCE_WORKERS)
+    try:
+        futures = {}
+        for i in long_ones:
+            parts = [chunk for chunk in _text_chunks(attachments[i].text, size) if chunk.strip()]
+            futures[i] = [pool.submit(_read_attachment_part, provider, title, attachments[i], number, len(parts), part)
+                          for number, part in enumerate(parts, 1)]
+        for i, part_futures in futures.items():
+            answers = [future.result() for future in part_futures]
+            mapped[i] = replace(attachments[i], text=_found_items_text(answers), parts_read=len(answers))
+            logger.info(f"Read '{attachments[i].filename}' in {len(answers)} parts "
+                        f"(longest call {max(seconds for _, seconds in answers):.1f}s, "
+                        f"{time.monotonic() - start:.1f}s in all)")
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+    return mapped
+
+
+def generate_digest(title, body, attachments):
+    language = get_config().TRANSLATION_LANGUAGE
+    prompt = _build_digest_prompt(title, body, attachments)
+
+    cache_key = _digest_cache_key(prompt)
+    if DIGEST_CACHE_ENABLED:
+        cached = _cached_digest(cache_key)
+        if cached is not None:
+            with _RUN_STATS_LOCK:
+                RUN_STATS["digest_cache_hits"] += 1
+            logger.info("Digest found in cache, not calling the LLM")
+            return cached
+
+    provider = get_provider()
+    mapped = _map_long_attachments(provider, title, attachments)
+    if mapped is not attachments:
+        prompt = _build_digest_prompt(title, body, mapped)  # cached under the full prompt's key
+    logger.info(f"Generating Digest via {type(provider).__name__}")
+    raw = _complete(provider, prompt, schema=DIGEST_JSON_SCHEMA)
+    provider_name = _answered_by(provider)
+    with _RUN_STATS_LOCK:
+        RUN_STATS[("digests", provider_name)] += 1
+    logger.debug(f"LLM raw response:\n{raw}")
+
+    try:
+        digest = _dict_to_digest(_extract_json(raw))
+    except (ValueError, json.JSONDecodeError) as e:
+        digest = _repaired_digest(raw)
+        if digest is not None:
+            logger.info(f"Digest response invalid ({e}), repaired locally instead of retrying")
+            with _RUN_STATS_LOCK:
+                RUN_STATS[("digest_repairs", provider_name)] += 1
+        else:
+            logger.warning(f"Digest response invalid ({e}), retrying once")
+            with _RUN_STATS_LOCK:
+                RUN_STATS[("digest_retries", provider_name)] += 1
+            retry_prompt = (
+                "The previous response was not valid JSON, was missing required fields, or had no "
+                f"actual content. Respond with ONLY this JSON structure (no markdown, no explanation), "
+                f"with every text value written in {language}:\n"
+                '{\n  "translated_title": "...",\n  "tldr": "...",\n'
+                '  "action_items": [...],\n  "key_dates": [...]\n}\n\n'
+                f"Previous invalid response:\n{raw}\n\n"
+                f"Original prompt:\n{prompt}"
+            )
+            raw = _complete(provider, retry_prompt, schema=DIGEST_JSON_SCHEMA)
             try:
-                _download_docx(docx_url, docx_path, browser_context=context)
-                text = extract_text_from_docx(docx_path)
-                attachments.append(Attachment(filename=docx_filename, url=docx_url, filetype="docx", text=text))
-            except Exception as e:
-                logger.error(f"Failed to process DOCX '{docx_filename}': {e}")
-                attachments.append(Attachment(filename=docx_filename, url=docx_url, filetype="docx", text="", failed=True))
-    return attachments
+                digest = _dict_to_digest(_extract_json(raw))
+            except (ValueError, json.JSONDecodeError) as e2:
+                digest = _repaired_digest(raw)
+                if digest is None:
+                    logger.warning(f"Digest retry also invalid ({e2}), using safe fallback")
+                    # Not cached: the next run should ask the model again.
+                    return Digest(
+                        translated_title=title,
+                        tldr="(Could not generate summary \u2014 open the original post for details)",
+                        action_items=[],
+                        key_dates=[],
+                    )
+
+    logger.info("Digest validated successfully")
+    _cache_fresh_digest(cache_key, digest)
+
+    return digest
+
+
+def _build_batch_digest_prompt(articles):
+    """One prompt asking for the Digests of several PreparedArticles, as a JSON array in order."""
+    out = StringIO()
+    for number, article in enumerate(articles, 1):
+        extracted = [a.text for a in article.attachments if not a.failed]
+        out.write(f"\n--- MESSAGE {number} START ---\nTitle: {article.title}\n\n{article.body}")
+        _write_attachment_parts(out, article.attachments)
+        out.write(f"\n--- MESSAGE {number} END ---")
+        out.write(_hints_text(_extract_action_hints(article.body, *extracted)))
+    return DIGEST_BATCH_PROMPT_TEMPLATE.format(
+        language=get_config().TRANSLATION_LANGUAGE, count=len(articles), messages=out.getvalue())
+
+
+def _extract_json_array(text):
+    """Find the list of Digest objects in a batched answer.
+
+    Accepts the requested {"digests": [...]} object, or any object whose only list
+    value is the array, or a bare array; each may be wrapped in prose or fences.
+    Whichever valid object or array starts first is the answer.
+    """
+    found = []
+    for brackets in ("{}", "[]"):
+        scanner = _JsonSpanScanner(brackets)
+        if scanner.feed(text) is not None or scanner.finish() is not None:
+            found.append((scanner.start, scanner.value))
+    data = min(found, key=lambda item: item[0])[1] if found else None
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict):
+        lists = [value for value in data.values() if isinstance(value, list)]
+        if len(lists) == 1 and all(isinstance(item, dict) for item in lists[0]):
+            return lists[0]
+    raise ValueError("No JSON array found in response")
+
+
+def generate_digest_batch(articles):
+    """Digests for several PreparedArticles, in order, from as few LLM calls as possible.
+
+    Cached Digests are reused; the remaining Articles share one call that returns a JSON
+    array. Every element is validated like a single Digest, and only the Articles whose
+    element is missing or invalid fall back to their own generate_digest call. Valid
+    batched Digests are cached under the single-Article key, so a retry finds them.
+    """
+    keys = [_digest_cache_key(_build_digest_prompt(a.title, a.body, a.attachments)) for a in articles]
+    digests = [_cached_digest(key) if DIGEST_CACHE_ENABLED else None for key in keys]
+    todo = [i for i, digest in enumerate(digests) if digest is None]
+    with _RUN_STATS_LOCK:
+        RUN_STATS["digest_cache_hits"] += len(articles) - len(todo)
+    if len(todo) == 1:
+        article = articles[todo[0]]
+        digests[todo[0]] = generate_digest(article.title, article.body, article.attachments)
+    if len(todo) < 2:
+        return digests
+
+    provider = get_provider()
+    logger.info(f"Generating {len(todo)} Digests in one call via {type(provider).__name__}")
+    start = time.monotonic()
+    raw = _complete(provider, _build_batch_digest_prompt([articles[i] for i in todo]), schema=DIGEST_BATCH_JSON_SCHEMA)
+    elapsed = time.monotonic() - start
+    logger.debug(f"LLM raw batch response:\n{raw}")
+    cacheable = not _answered_by_fallback()
+    try:
+        items = _extract_json_array(raw)
+    except ValueError as e:
+        logger.warning(f"Batched Digest response invalid ({e})")
+        items = []
+
+    fallbacks = 0
+    for position, i in enumerate(todo):
+        try:
+            digests[i] = _dict_to_digest(items[position])
+            if cacheable:
+                _store_digest(keys[i], digests[i])
+        except (IndexError, ValueError, AttributeError, TypeError) as e:
+            logger.warning(f"Batched Digest for '{articles[i].title}' invalid ({e}), generating it on its own")
+            fallbacks += 1
+            digests[i] = generate_digest(articles[i].title, articles[i].body, articles[i].attachments)
+    saved = len(todo) - 1 - fallbacks
+    with _RUN_STATS_LOCK:
+        RUN_STATS["llm_calls_saved"] += max(saved, 0)
+    logger.info(f"Batched Digest call: {len(todo)} articles in {elapsed:.1f}s "
+                f"({elapsed / len(todo):.1f}s per article), {fallbacks} fallback call(s), "
+                f"{max(saved, 0)} call(s) saved")
+    return digests
+
+
+_W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_MC_FALLBACK = "{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback"
+# Subtrees with no document text: the legacy copy of a text box, and paragraph properties,
+# whose w:tabs/w:tab elements define tab stops rather than typed tabs.
+_DOCX_SKIPPED_TAGS = {_MC_FALLBACK, _W_NS + "pPr"}
+_DOCX_HEADER_FOOTER_RE = re.compile(r'^word/(header|footer)\d*\.xml$')
+
+
+def _iter_docx_part_lines(stream):
+    """Yield the text lines of one WordprocessingML part, streamed with an incremental parser.
+
+    Paragraphs outside tables become one line each (empty ones included, matching
+    python-docx's doc.paragraphs). Each table row becomes one compact line of
+    tab-separated cell texts, so schedules and price lists keep their row structure.
+    Text-box paragraphs nested inside a paragraph come out as their own lines, and the
+    legacy mc:Fallback copy of a text box is skipped so nothing is emitted twice, as are
+    the tab stops defined in paragraph properties. Elements are cleared as soon as they
+    are consumed, so memory stays flat on large files.
+    """
+    reader = _DocxPartReader()
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+        if event == "start":
+            reader.start(elem.tag)
+            continue
+        line = reader.end(elem)
+        if line is not None:
+            yield line
+
+
+# What a break or tab inside a run stands for: (in a paragraph, in a table cell).
+_DOCX_RUN_BREAKS = {_W_NS + "tab": ("\t", " "), _W_NS + "br": ("\n", " "), _W_NS + "cr": ("\n", " ")}
+
+
+class _DocxPartReader:
+    """The open paragraphs and table row of one _iter_docx_part_lines pass, fed element by element."""
+
+    def __init__(self):
+        self.table_depth = 0
+        self.skip_depth = 0
+        self.paragraphs = []  # text pieces of each open paragraph; text boxes nest a paragraph in one
+        self.cell = []
+        self.row = []
+
+    def start(self, tag):
+        if tag in _DOCX_SKIPPED_TAGS:
+            self.skip_depth += 1
+        elif self.skip_depth:
+            return
+        elif tag == _W_NS + "tbl":
+            self.table_depth += 1
+        elif tag == _W_NS + "p":
+            self.paragraphs.append([])
+
+    def end(self, elem):
+        """Take in a closed element; return the line it completes, if any."""
+        tag = elem.tag
+        if tag in _DOCX_SKIPPED_TAGS:
+            self.skip_depth -= 1
+            elem.clear()
+        elif self.skip_depth:
+            return None
+        elif tag == _W_NS + "t" and self.paragraphs:
+            self.paragraphs[-1].append(elem.text or "")
+        elif tag in _DOCX_RUN_BREAKS and self.paragraphs:
+            self.paragraphs[-1].append(_DOCX_RUN_BREAKS[tag][bool(self.table_depth)])
+        elif tag == _W_NS + "p" and self.paragraphs:
+            elem.clear()
+            return self._end_paragraph()
+        elif tag in (_W_NS + "tc", _W_NS + "tr") and self.table_depth == 1:
+            return self._end_cell_or_row(elem)
+        elif tag == _W_NS + "tbl":
+            self.table_depth -= 1
+            if not self.table_depth:
+                elem.clear()
+        return None
+
+    def _end_paragraph(self):
+        text = "".join(self.paragraphs.pop())
+        if not self.table_depth:
+            return text
+        if text.strip():
+            self.cell.append(text.strip())
+        return None
+
+    def _end_cell_or_row(self, elem):
+        if elem.tag == _W_NS + "tc":
+            self.row.append(" ".join(self.cell))
+            self.cell = []
+            return None
+        row, self.row = self.row, []
+        elem.clear()
+        return "\t".join(row).rstrip("\t") if any(row) else None
+
+
+def extract_text_from_docx_stream(source, include_headers_footers=False, char_budget=None):
+    """Extract a Word document's paragraphs and table rows straight from the zipped XML.
+
+    Faster than building python-docx's object model, and unlike its doc.paragraphs it
+    keeps tables (as tab-separated rows). Headers and footers are added on request. Parsing
+    stops once char_budget characters have been collected.
+    """
+    label = _source_label(source)
+    logger.info(f"Extracting text from Word document {label} (streaming)")
+    with zipfile.ZipFile(source if isinstance(source, str) else BytesIO(source)) as archive:
+        parts = ["word/document.xml"]
+        if include_headers_footers:
+            extra = sorted(name for name in archive.namelist() if _DOCX_HEADER_FOOTER_RE.match(name))
+            parts = [n for n in extra if "/header" in n] + parts + [n for n in extra if "/footer" in n]
+        lines = []
+        used = 0
+        for part in parts:
+            with archive.open(part) as stream:
+                for line in _iter_docx_part_lines(stream):
+                    lines.append(line + "\n")
+                    used += len(line) + 1
+                    if char_budget is not None and used >= char_budget:
+                        logger.info(f"Text budget of {char_budget} chars reached, stopping extraction of {label}")
+                        return "".join(lines)[:char_budget]
+    logger.info(f"Text extraction complete for {label}")
+    return "".join(lines)
+
+
+def _xml_local_name(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def _cap_text(text, char_budget):
+    return text if char_budget is None else text[:char_budget]
+
+
+def _joined_length(lines):
+    """Length of the text the lines join into, one newline each."""
+    return sum(len(line) + 1 for line in lines)
+
+
+def _zip_names(data):
+    try:
+        with zipfile.ZipFile(BytesIO(data)) as archive:
+            return set(archive.namelist())
+    except zipfile.BadZipFile:
+        return set()
+
+
+def _open_zip(source):
+    return zipfile.ZipFile(source if isinstance(source, str) else BytesIO(source))
+
+
+# --- Attachment extractor registry -------------------------------------------
+# Every supported attachment format is one AttachmentExtractor subclass,
+# registered with @register_extractor under the MIME type its magic bytes
+# identify. Link discovery, download, sniffing and budget handling are shared,
+# so adding a format means adding one small class here and nothing else.
+#
+# Extractors receive a file path or an in-memory buffer (see _extract_from_buffer)
+# and must return (text, pages_skipped), stopping early once char_budget
+# characters are collected where the format allows it.
+
+
+class AttachmentExtractor:
+    """Turns one attachment format into plain text for the Digest prompt."""
+
+    filetype = ""           # short name stored on Attachment.filetype
+    mime_type = ""          # registry key: the MIME type sniff() recognises
+    content_types = ()      # extra Content-Type headers a server may send for it
+    extensions = ()         # link extensions that mark an <a href> as this kind of attachment
+    off_main_thread = False  # slow extractors run in the extraction thread pool
+    fallback = False        # content-agnostic sniffers (plain text) are tried after every other format
+
+    def sniff(self, data) -> bool:
+        """Return True if data's leading (magic) bytes identify this format."""
+        raise NotImplementedError
+
+    def extract(self, source, char_budget=None):
+        """Return (text, pages_skipped) for a file path or in-memory buffer."""
+        raise NotImplementedError
+
+
+_EXTRACTORS = {}  # mime_type -> AttachmentExtractor, in registration order
+
+
+def register_extractor(cls):
+    """Class decorator adding an AttachmentExtractor to the registry."""
+    _EXTRACTORS[cls.mime_type] = cls()
+    return cls
+
+
+def _registered_content_types():
+    types = set()
+    for extractor in _EXTRACTORS.values():
+        types.add(extractor.mime_type)
+        types.update(extractor.content_types)
+    return types
+
+
+def _registered_extensions():
+    return {ext for extractor in _EXTRACTORS.values() for ext in extractor.extensions}
+
+
+def _sniff_extractor(data):
+    """Pick the extractor whose magic-byte check matches data, or None if no format matches."""
+    for extractor in sorted(_EXTRACTORS.values(), key=lambda e: e.fallback):
+        if extractor.sniff(data):
+            return extractor
+    return None
+
+
+@register_extractor
+class PdfExtractor(AttachmentExtractor):
+    filetype = "pdf"
+    mime_type = "application/pdf"
+    content_types = ("application/x-pdf",)
+    extensions = (".pdf",)
+    off_main_thread = True
+
+    def sniff(self, data):
+        # The header may legally appear anywhere in the first 1024 bytes.
+        return b"%PDF-" in bytes(data[:1024])
+
+    def extract(self, source, char_budget=None):
+        return _extract_pdf_text(source, char_budget=char_budget, layout=get_config().PDF_LAYOUT)
+
+
+class _OoxmlExtractor(AttachmentExtractor):
+    """Office Open XML formats: a zip whose main part name gives the format away."""
+
+    main_part = ""
+    off_main_thread = True
+
+    def sniff(self, data):
+        return bytes(data[:4]) == b"PK\x03\x04" and self.main_part in _zip_names(data)
+
+
+@register_extractor
+class DocxExtractor(_OoxmlExtractor):
+    filetype = "docx"
+    mime_type = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+    content_types = ("application/zip",)
+    extensions = (".docx",)
+    main_part = "word/document.xml"
+
+    def extract(self, source, char_budget=None):
+        text = extract_text_from_docx_stream(
+            source, include_headers_footers=get_config().DOCX_HEADERS_FOOTERS, char_budget=char_budget,
+        )
+        return text, 0
+
+
+def _xlsx_column_index(ref):
+    letters = "".join(ch for ch in ref if ch.isalpha())
+    index = 0
+    for ch in letters.upper():
+        index = index * 26 + ord(ch) - ord("A") + 1
+    return index - 1
+
+
+@register_extractor
+class XlsxExtractor(_OoxmlExtractor):
+    filetype = "xlsx"
+    mime_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    extensions = (".xlsx",)
+    main_part = "xl/workbook.xml"
+
+    def extract(self, source, char_budget=None):
+        with _open_zip(source) as archive:
+            names = archive.namelist()
+            shared = []
+            if "xl/sharedStrings.xml" in names:
+                with archive.open("xl/sharedStrings.xml") as stream:
+                    for _, elem in ET.iterparse(stream):
+                        if _xml_local_name(elem.tag) == "si":
+                            shared.append("".join(elem.itertext()))
+                            elem.clear()
+            sheets = sorted(
+                (n for n in names if re.match(r'^xl/worksheets/sheet\d+\.xml$', n)),
+                key=lambda n: int(re.search(r'(\d+)\.xml$', n).group(1)),
+            )
+            lines = []
+            for number, sheet in enumerate(sheets, start=1):
+                lines.append(f"[Sheet {number}]")
+                with archive.open(sheet) as stream:
+                    lines.extend(self._sheet_rows(stream, shared))
+                if char_budget is not None and _joined_length(lines) >= char_budget:
+                    break
+        return _cap_text("".join(line + "\n" for line in lines), char_budget), 0
+
+    @staticmethod
+    def _sheet_rows(stream, shared):
+        row = {}
+        for _, elem in ET.iterparse(stream):
+            name = _xml_local_name(elem.tag)
+            if name == "c":
+                kind = elem.get("t")
+                if kind == "inlineStr":
+                    value = "".join(elem.itertext())
+                else:
+                    v = next((child.text for child in elem if _xml_local_name(child.tag) == "v"), None) or ""
+                    value = shared[int(v)] if kind == "s" and v.isdigit() and int(v) < len(shared) else v
+                if value.strip():
+                    row[_xlsx_column_index(elem.get("r", "A"))] = " ".join(value.split())
+                elem.clear()
+            elif name == "row":
+                if row:
+                    yield "\t".join(row.get(i, "") for i in range(max(row) + 1))
+                row = {}
+                elem.clear()
+
+
+@register_extractor
+class PptxExtractor(_OoxmlExtractor):
+    filetype = "pptx"
+    mime_type = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+    extensions = (".pptx",)
+    main_part = "ppt/presentation.xml"
+
+    def extract(self, source, char_budget=None):
+        lines = []
+        with _open_zip(source) as archive:
+            slides = sorted(
+                (n for n in archive.namelist() if re.match(r'^ppt/slides/slide\d+\.xml$', n)),
+                key=lambda n: int(re.search(r'(\d+)\.xml$', n).group(1)),
+            )
+            for number, slide in enumerate(slides, start=1):
+                lines.append(f"[Slide {number}]")
+                with archive.open(slide) as stream:
+                    for _, elem in ET.iterparse(stream):
+                        if _xml_local_name(elem.tag) == "p":
+                            text = "".join(elem.itertext()).strip()
+                            if text:
+                                lines.append(text)
+                            elem.clear()
+                if char_budget is not None and _joined_length(lines) >= char_budget:
+                    break
+        return _cap_text("".join(line + "\n" for line in lines), char_budget), 0
+
+
+@register_extractor
+class OdtExtractor(AttachmentExtractor):
+    filetype = "odt"
+    mime_type = "application/vnd.oasis.opendocument.text"
+    extensions = (".odt",)
+    off_main_thread = True
+
+    def sniff(self, data):
+        # ODF stores an uncompressed 'mimetype' entry first, so the type sits at a fixed offset.
+        return bytes(data[:4]) == b"PK\x03\x04" and bytes(data[30:38 + len(self.mime_type)]) == (
+            b"mimetype" + self.mime_type.encode("ascii")
+        )
+
+    def extract(self, source, char_budget=None):
+        lines = []
+        with _open_zip(source) as archive, archive.open("content.xml") as stream:
+            for line in _iter_odt_lines(stream):
+                lines.append(line)
+                if char_budget is not None and _joined_length(lines) >= char_budget:
+                    break
+        return _cap_text("".join(line + "\n" for line in lines), char_budget), 0
+
+
+def _iter_odt_lines(stream):
+    """Yield the paragraphs and headings of an ODF content.xml, and each table row as tab-separated cells."""
+    cells = []
+    row = []
+    table_depth = 0
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+        name = _xml_local_name(elem.tag)
+        if name == "table":
+            table_depth += 1 if event == "start" else -1
+        if event == "start":
+            continue
+        if name in ("p", "h"):
+            text = " ".join("".join(elem.itertext()).split())
+            elem.clear()
+            if not table_depth:
+                yield text
+            elif text:
+                cells.append(text)
+        elif name == "table-cell" and table_depth == 1:
+            row.append(" ".join(cells))
+            cells = []
+        elif name == "table-row" and table_depth == 1:
+            if any(row):
+                yield "\t".join(row).rstrip("\t")
+            row = []
+
+
+@register_extractor
+class PlainTextExtractor(AttachmentExtractor):
+    """Plain text (.txt, .csv). A fallback: it only claims data no binary format recognised."""
+
+    filetype = "txt"
+    mime_type = "text/plain"
+    content_types = ("text/csv",)
+    extensions = (".txt", ".csv")
+    fallback = True
+
+    def sniff(self, data):
+        head = bytes(data[:4096])
+        if b"\x00" in head or head.lstrip().lower().startswith((b"<!doctype html", b"<html")):
+            return False
+        try:
+            head.decode("utf-8")
+        except UnicodeDecodeError as e:
+            # A multi-byte character cut off at the 4 KiB boundary is still UTF-8.
+            return e.start >= len(head) - 3
+        return True
+
+    def extract(self, source, char_budget=None):
+        if isinstance(source, str):
+            with open(source, "rb") as f:
+                source = f.read()
+        return _cap_text(bytes(source).decode("utf-8", errors="replace"), char_budget), 0
+
+
+# --- Spilled attachment text ---------------------------------------------------
+
+class SpilledText:
+    """Attachment text kept in an anonymous temp file instead of a str, read back through mmap.
+
+    Supports what the pipeline does with Attachment.text (len, truth, prefix slices, str()),
+    and streams its contents with chunks() and lines() so a prompt can be assembled without
+    holding another copy of every attachment. The file is removed when the object is freed.
+    """
+
+    __slots__ = ("_file", "_length")
+
+    def __init__(self, text):
+        self._file = tempfile.TemporaryFile()
+        self._file.write(text.encode("utf-8"))
+        self._file.flush()
+        self._length = len(text)
+
+    def __len__(self):
+        return self._length
+
+    def __str__(self):
+        return "".join(self.chunks())
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice) or key.start not in (None, 0) or key.step not in (None, 1):
+            raise TypeError("SpilledText only supports prefix slices")
+        stop = self._length if key.stop is None else max(0, min(key.stop, self._length))
+        parts = []
+        size = 0
+        for chunk in self.chunks():
+            if size >= stop:
+                break
+            parts.append(chunk)
+            size += len(chunk)
+        return "".join(parts)[:stop]
+
+    def chunks(self, size=_DOWNLOAD_CHUNK_BYTES):
+        """Yield the text in pieces decoded straight from the memory-mapped file."""
+        if not self._length:
+            return
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        with mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            for start in range(0, len(view), size):
+                yield decoder.decode(view[start:start + size])
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail
+
+    def lines(self):
+        """Yield the text line by line, like str.split("\\n")."""
+        pending = ""
+        for chunk in self.chunks():
+            *complete, pending = (pending + chunk).split("\n")
+            yield from complete
+        yield pending
+
+
+def _spill_text(text):
+    """Move long text out of memory into a SpilledText; short text is returned unchanged."""
+    threshold = get_config().ATTACHMENT_TEXT_SPILL_CHARS
+    if isinstance(text, SpilledText) or threshold <= 0 or len(text) <= threshold:
+        return text
+    return SpilledText(text)
+
+
+def _text_lines(text):
+    return text.lines() if isinstance(text, SpilledText) else iter(text.split("\n"))
+
+
+def _write_text(out, text):
+    """Copy a str or SpilledText into a text stream, a chunk at a time for spilled text."""
+    if isinstance(text, SpilledText):
+        for chunk in text.chunks():
+            out.write(chunk)
+    else:
+        out.write(text)
+
+
+# --- Extracted text normalisation ---------------------------------------------
+
+# "Pagina 3 van 5", "page 3", "3/5", "- 3 -" or a bare "3"; group 1 is the page number.
+_PAGE_NUMBER_RE = re.compile(
+    r'^[-\u2013\u2014\s]*(?:(?:pagina|page|blz\.?|p\.)\s*)?(\d{1,3})(?:\s*(?:/|van|of)\s*\d{1,3})?[-\u2013\u2014\s]*$',
+    re.IGNORECASE,
+)
+_HYPHEN_BREAK_RE = re.compile(r'(?<=[a-z\u00df-\u00ff])-\n(?=[a-z\u00df-\u00ff])')
+_RUN_OF_SPACES_RE = re.compile(r'[ \u00a0]{2,}')
+_TRAILING_SPACE_RE = re.compile(r'[ \t\u00a0]+$', re.MULTILINE)
+_BLANK_LINES_RE = re.compile(r'\n{3,}')
+_PAGE_EDGE_LINES = 2          # lines at the top and bottom of a page that may be header/footer
+_MIN_PAGE_LINES = 8           # shorter pages (a timetable week, a slide) have no header/footer
+_MIN_SHARED_LINE_CHARS = 20   # shorter lines may repeat across documents by coincidence
+
+
+def _estimate_tokens(text):
+    """Rough LLM token count: about four characters per token for Dutch and English prose."""
+    return (len(text) + 3) // 4
+
+
+def _line_key(line):
+    """Compare lines ignoring case and spacing; numbers count, so '3 maart' never matches '10 maart'."""
+    return " ".join(line.split()).lower()
+
+
+def _page_edge_indexes(lines):
+    filled = [i for i, line in enumerate(lines) if line.strip()]
+    if len(filled) < _MIN_PAGE_LINES:
+        return set()
+    return set(filled[:_PAGE_EDGE_LINES] + filled[-_PAGE_EDGE_LINES:])
+
+
+def _is_page_number(line, page_number):
+    """Whether a line is this page's number, like 'Pagina 3 van 5', '3/5' or a bare '3'."""
+    match = _PAGE_NUMBER_RE.match(line)
+    return bool(match) and int(match.group(1)) == page_number
+
+
+def _strip_repeated_page_lines(pages):
+    """Drop header/footer lines that recur on at least half the pages, keeping the first copy.
+
+    A page's own number is dropped when it is the first or last line of the page. Only the
+    top and bottom lines of pages long enough to have a header and footer are considered, so
+    repeated lines in the body of a letter and short timetable pages are left alone.
+    """
+    if len(pages) < 2:
+        return pages
+    split_pages = [page.split("\n") for page in pages]
+    counts = Counter()
+    for lines in split_pages:
+        counts.update({_line_key(lines[i]) for i in _page_edge_indexes(lines)})
+    repeated = {key for key, count in counts.items() if count >= 2 and count * 2 >= len(pages)}
+    kept = set()
+    result = []
+    for page_number, lines in enumerate(split_pages, 1):
+        edges = _page_edge_indexes(lines)
+        filled = [i for i, line in enumerate(lines) if line.strip()]
+        ends = {filled[0], filled[-1]} if filled else set()
+        out = []
+        for i, line in enumerate(lines):
+            if i in ends and _is_page_number(line, page_number):
+                continue
+            if i in edges:
+                key = _line_key(line)
+                if key in repeated:
+                    if key in kept:
+                        continue
+                    kept.add(key)
+            out.append(line)
+        result.append("\n".join(out))
+    return result
+
+
+def _normalise_extracted_text(text):
+    """Strip repeated page headers/footers, repair hyphenated line breaks and collapse whitespace."""
+    text = "\n".join(_strip_repeated_page_lines(text.split(_PAGE_BREAK)))
+    text = _HYPHEN_BREAK_RE.sub("", text)
+    text = _RUN_OF_SPACES_RE.sub(" ", text)
+    text = _TRAILING_SPACE_RE.sub("", text)
+    return _BLANK_LINES_RE.sub("\n\n", text).strip()
+
+
+def _drop_shared_lines(text, seen_keys):
+    """Remove lines already sent in an earlier attachment of the Article (letterhead, sign-off).
+
+    Returns the remaining text, or None when nothing was removed.
+    """
+    out = []
+    dropped = False
+    for line in _text_lines(text):
+        key = _line_key(line)
+        if len(key) >= _MIN_SHARED_LINE_CHARS and key in seen_keys:
+            dropped = True
+            continue
+        out.append(line)
+    seen_keys.update(key for key in map(_line_key, out) if len(key) >= _MIN_SHARED_LINE_CHARS)
+    return _BLANK_LINES_RE.sub("\n\n", "\n".join(out)).strip() if dropped else None
+
+
+def _with_normalised_text(attachment, text):
+    """Copy of attachment carrying text, adding what was removed to its normalisation tally."""
+    return replace(
+        attachment,
+        text=text,
+        chars_removed=attachment.chars_removed + len(attachment.text) - len(text),
+        tokens_removed=attachment.tokens_removed + _estimate_tokens(attachment.text) - _estimate_tokens(text),
+    )
+
+
+# --- Attachment discovery and pipeline ----------------------------------------
+
+@dataclass(slots=True)
+class AttachmentLink:
+    url: str
+    filename: str
+
+    def unread(self, **fields):
+        """An Attachment for this link that was never extracted (failed, or left out by the budget)."""
+        filetype = os.path.splitext(self.filename)[1].lstrip(".").lower()
+        return Attachment(filename=self.filename, url=self.url, filetype=filetype, text="", **fields)
+
+
+_EXTRACTION_THREADS = 2
+
+
+def _discover_attachment_links(links):
+    """Single pass over an Article's <a href> elements, keeping those that point at a supported format.
+
+    The extension is taken from the URL path, or from the query string when the path hides
+    it (e.g. '/download?file=brief.pdf' or a signed URL's response-content-disposition).
+    """
+    extensions = _registered_extensions()
+    query_name_re = re.compile(
+        r'([^/\\=&;"\']+(?:' + "|".join(re.escape(ext) for ext in sorted(extensions)) + r'))\b',
+        re.IGNORECASE,
+    )
+    found = []
+    for link in links:
+        url = link.get_attribute("href")
+        if not url:
+            continue
+        parts = urlsplit(url)
+        path_name = unquote(parts.path).rsplit("/", 1)[-1]
+        if os.path.splitext(path_name)[1].lower() in extensions:
+            found.append(AttachmentLink(url=url, filename=path_name))
+            continue
+        match = query_name_re.search(unquote(parts.query))
+        if match:
+            found.append(AttachmentLink(url=url, filename=match.group(1).strip()))
+    return found
+
+
+def _download_and_sniff(link, context):
+    """Download one attachment and pick its extractor from the bytes, not from the link's extension."""
+    data = _download_attachment(link.url, browser_context=context)
+    extractor = _sniff_extractor(data)
+    if extractor is None:
+        raise IOError(f"unsupported file format: {link.url}")
+    return data, extractor
+
+
+def _extraction_worker_main(conn, run_config, memory_limit_bytes):
+    """Entry point of a sandboxed extraction process: cap its memory, then serve jobs until told to stop."""
+    global config
+    config = run_config
+    if memory_limit_bytes and resource is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit_bytes, memory_limit_bytes))
+    conn.send("ready")
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        extractor, data, char_budget, filename = job
+        try:
+            result = _extract_from_buffer(data, lambda source: extractor.extract(source, char_budget=char_budget), filename)
+        except MemoryError:
+            conn.send((False, f"out of memory (limit {memory_limit_bytes // (1024 * 1024)} MiB)", True))
+            return
+        except Exception as e:
+            conn.send((False, str(e), False))
+        else:
+            conn.send((True, result, False))
+
+
+class _ExtractionSandbox:
+    """Supervised worker processes that run extractors under a wall-clock timeout and memory cap.
+
+    A hung or runaway extraction (a pathological PDF can loop inside MuPDF or allocate gigabytes)
+    is killed together with its worker, which is replaced before the next job. Each job costs at
+    most `timeout` seconds, which bounds the time an Article can spend on its attachments.
+    Extractors are sent to the workers by reference, so they must be module-level classes.
+    """
+
+    _STARTUP_TIMEOUT = 60  # seconds for a fresh worker to import the application
+
+    def __init__(self, workers, timeout, memory_mb):
+        self.timeout = timeout
+        self.memory_limit_bytes = memory_mb * 1024 * 1024 if memory_mb > 0 else 0
+        # "spawn" rather than fork: the parent runs Playwright and extraction threads.
+        self._context = multiprocessing.get_context("spawn")
+        self._idle = queue.Queue()
+        self._workers = []
+        for _ in range(workers):
+            self._idle.put(self._start_worker())
+
+    def _start_worker(self):
+        conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_extraction_worker_main, args=(child_conn, get_config(), self.memory_limit_bytes), daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        worker = {"process": process, "conn": conn, "ready": False}
+        self._workers.append(worker)
+        return worker
+
+    def _retire(self, worker):
+        worker["process"].kill()
+        worker["process"].join()
+        worker["conn"].close()
+        self._workers.remove(worker)
+
+    def _wait_ready(self, worker):
+        if not worker["ready"]:
+            if not worker["conn"].poll(self._STARTUP_TIMEOUT):
+                raise TimeoutError("extraction worker did not start")
+            worker["conn"].recv()
+            worker["ready"] = True
+
+    def extract(self, extractor, data, char_budget, filename):
+        """Return (text, pages_skipped) from a worker, or raise if the worker failed, hung or died."""
+        worker = self._idle.get()
+        replace_worker = True
+        try:
+            self._wait_ready(worker)
+            worker["conn"].send((extractor, bytes(data), char_budget, filename))
+            if not worker["conn"].poll(self.timeout):
+                raise TimeoutError(f"extraction took longer than {self.timeout}s, worker killed")
+            try:
+                ok, result, replace_worker = worker["conn"].recv()
+            except EOFError:
+                worker["process"].join(timeout=1)
+                raise RuntimeError(f"extraction worker died (exit code {worker['process'].exitcode})")
+        finally:
+            if replace_worker:
+                self._retire(worker)
+                worker = self._start_worker()
+            self._idle.put(worker)
+        if not ok:
+            raise RuntimeError(result)
+        return result
+
+    def close(self):
+        for worker in list(self._workers):
+            try:
+                worker["conn"].send(None)
+            except OSError:
+                pass
+            worker["process"].join(timeout=5)
+            self._retire(worker)
+
+
+_extraction_sandbox = None
+
+
+def _get_extraction_sandbox():
+    """The run's extraction workers, started on first use; None when EXTRACTION_SANDBOX is off."""
+    global _extraction_sandbox
+    cfg = get_config()
+    if not cfg.EXTRACTION_SANDBOX:
+        return None
+    if _extraction_sandbox is None:
+        _extraction_sandbox = _ExtractionSandbox(_EXTRACTION_THREADS, cfg.EXTRACTION_TIMEOUT, cfg.EXTRACTION_MEMORY_MB)
+    return _extraction_sandbox
+
+
+def _close_extraction_sandbox():
+    global _extraction_sandbox
+    if _extraction_sandbox is not None:
+        _extraction_sandbox.close()
+        _extraction_sandbox = None
+
+
+def _extract_attachment(link, data, extractor, char_budget, sandbox=None):
+    """Run one extractor over downloaded bytes and wrap the outcome in an Attachment (fail-closed).
+
+    With a sandbox the extractor runs in one of its worker processes; a timeout, memory blow-up
+    or crashed worker becomes a failed Attachment like any other extraction error.
+    """
+    try:
+        if sandbox is not None:
+            text, pages_skipped = sandbox.extract(extractor, data, char_budget, link.filename)
+        else:
+            text, pages_skipped = _extract_from_buffer(
+                data, lambda source: extractor.extract(source, char_budget=char_budget), link.filename
+            )
+    except Exception as e:
+        logger.error(f"Failed to extract {extractor.filetype} attachment '{link.filename}': {e}")
+        return Attachment(filename=link.filename, url=link.url, filetype=extractor.filetype, text="",
+                          failed=True, failure_reason=f"extraction failed: {e}")
+    attachment = Attachment(
+        filename=link.filename, url=link.url, filetype=extractor.filetype, text=text,
+        truncated=char_budget is not None and len(text) >= char_budget,
+        pages_skipped=pages_skipped,
+    )
+    attachment = _with_normalised_text(attachment, _normalise_extracted_text(text))
+    attachment.text = _spill_text(attachment.text)
+    return attachment
+
+
+# Short-lived signing parameters (CloudFront, S3) that differ between two links to the same file.
+_SIGNING_QUERY_PARAMS = {"expires", "signature", "key-pair-id", "policy"}
+
+
+def _normalise_attachment_url(url):
+    """Key two links to the same file alike: ignores host case, fragment, parameter order and signatures."""
+    parts = urlsplit(url)
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in _SIGNING_QUERY_PARAMS and not key.lower().startswith("x-amz-")
+    )
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, urlencode(query), ""))
+
+
+class _AttachmentCache:
+    """Run-scoped single-flight store, so each distinct attachment is downloaded and extracted once.
+
+    Entries are keyed by normalised URL and by the sha256 of the downloaded bytes: a preview link
+    and a download link for one file, or the same file posted in several Articles, share an entry.
+    An entry is the Attachment, or the Future still extracting it.
+    """
+
+    def __init__(self):
+        self.by_url = {}
+        self.by_digest = {}
+
+    def clear(self):
+        self.by_url.clear()
+        self.by_digest.clear()
+
+
+_run_attachments = _AttachmentCache()
+
+
+def _fetch_attachment(link, context, cache, pool, char_budget):
+    """Return the cache entry for link, downloading and extracting it only if the run has not seen it.
+
+    The entry is extracted up to the per-attachment cap only, never to what one Article has left:
+    other Articles reuse it, and each clips its own copy with _AttachmentTextBudget.apply.
+    Failures are not reused: a download that failed is never cached, and a failed extraction is
+    tried again by the next Article that links the file.
+    """
+    url_key = _normalise_attachment_url(link.url)
+    entry = cache.by_url.get(url_key)
+    if entry is not None and not _failed_entry(entry):
+        return entry
+    try:
+        data, extractor = _download_and_sniff(link, context)
+    except Exception as e:
+        logger.error(f"Failed to download attachment '{link.filename}': {e}")
+        cache.by_url.pop(url_key, None)
+        return link.unread(failed=True, failure_reason=str(e))
+    digest = hashlib.sha256(data).hexdigest()
+    entry = cache.by_digest.get(digest)
+    if entry is not None and not _failed_entry(entry):
+        logger.info(f"Attachment '{link.filename}' has the same content as one already fetched this run")
+    else:
+        if extractor.off_main_thread:
+            entry = pool.submit(_extract_attachment, link, data, extractor, char_budget, _get_extraction_sandbox())
+        else:
+            entry = _extract_attachment(link, data, extractor, char_budget)
+        cache.by_digest[digest] = entry
+    cache.by_url[url_key] = entry
+    return entry
+
+
+def _failed_entry(entry):
+    """Whether a cache entry ended as a failed Attachment; one still extracting has not failed yet."""
+    if isinstance(entry, Future):
+        return entry.done() and entry.result().failed
+    return entry.failed
+
+
+def _settle_attachments(results, settled, seen_lines, budget, block):
+    """Finish results in order from index settled, stopping at an extraction still running unless block.
+
+    Returns the index of the first result not finished yet.
+    """
+    while settled < len(results):
+        item = results[settled]
+        if isinstance(item, Future):
+            if not block and not item.done():
+                break
+            item = item.result()
+        results[settled] = _finish_attachment(item, seen_lines, budget)
+        settled += 1
+    return settled
+
+
+def _finish_attachment(attachment, seen_lines, budget):
+    """Drop the lines earlier attachments of the Article already sent, then charge the Article budget.
+
+    Both steps build a new str; long text goes back to a SpilledText so the run does not keep it.
+    """
+    if attachment.text:
+        text = _drop_shared_lines(attachment.text, seen_lines)
+        if text is not None:
+            attachment = _with_normalised_text(attachment, text)
+        logger.info(f"Normalised '{attachment.filename}': removed {attachment.chars_removed} chars "
+                    f"(~{attachment.tokens_removed} tokens)")
+    attachment = budget.apply(attachment)
+    text = _spill_text(attachment.text)
+    return attachment if text is attachment.text else replace(attachment, text=text)
+
+
+def process_attachment_links(playwright, browser, context, links, budget=None, cache=None):
+    """Download and extract every discovered attachment through one shared pipeline.
+
+    Downloads run on the calling thread because Playwright's sync API is not thread-safe.
+    The format is sniffed from the downloaded bytes, and slow extractors run in a small
+    thread pool so extracting one attachment overlaps downloading the next. Attachments
+    come back in link order with the article text budget applied; failures are kept as
+    failed Attachments (ADR 0003). A document already fetched this run is reused, and
+    duplicate links within the Article are listed once.
+    """
+    if budget is None:
+        budget = _AttachmentTextBudget()
+    if cache is None:
+        cache = _run_attachments
+    results = []
+    included = set()  # ids of the cache entries already in results
+    seen_lines = set()  # line keys sent by earlier attachments of this Article
+    settled = 0  # results before this index are finished Attachments
+    with ThreadPoolExecutor(max_workers=_EXTRACTION_THREADS) as pool:
+        for link in links:
+            settled = _settle_attachments(results, settled, seen_lines, budget, block=False)
+            known = cache.by_url.get(_normalise_attachment_url(link.url))
+            if known is not None and id(known) in included:
+                logger.debug(f"Skipping duplicate link to '{link.filename}'")
+                continue
+            if budget.exhausted:
+                logger.info(f"Article text budget used up, not extracting '{link.filename}'")
+                results.append(link.unread(truncated=True))
+                continue
+            entry = _fetch_attachment(link, context, cache, pool, budget.per_attachment)
+            if id(entry) in included:
+                logger.debug(f"Skipping '{link.filename}': same document as an earlier link")
+                continue
+            included.add(id(entry))
+            results.append(entry)
+        _settle_attachments(results, settled, seen_lines, budget, block=True)
+    return results
 
 
 def run(playwright):
+    _run_attachments.clear()
+    RUN_STATS.clear()
+    _CIRCUIT_BREAKERS.clear()
     try:
         launch_options = {"headless": True}
         executable_path = resolve_browser_executable_path()
@@ -762,6 +3324,47 @@ def run(playwright):
         logger.error(f"Error in main run function: {str(e)}")
         logger.error(f"Stack trace: {traceback.format_exc()}")
         raise
+    finally:
+        _close_extraction_sandbox()
+        _log_llm_usage()
+        _log_circuit_breakers()
+        _log_peak_memory()
+
+
+def _log_llm_usage():
+    """Write LLM calls and time to the run report; cached Digests cost no LLM time."""
+    logger.info(f"LLM usage: {RUN_STATS['llm_calls']} call(s), {RUN_STATS['llm_seconds']:.1f}s, "
+                f"{RUN_STATS['digest_cache_hits']} Digest(s) served from cache, "
+                f"{RUN_STATS['llm_calls_saved']} call(s) saved by batching")
+    for key, digests in sorted((k, v) for k, v in RUN_STATS.items() if isinstance(k, tuple) and k[0] == "digests"):
+        retries = RUN_STATS[("digest_retries", key[1])]
+        repairs = RUN_STATS[("digest_repairs", key[1])]
+        logger.info(f"Digest retry rate for {key[1]}: {retries}/{digests} ({retries / digests:.0%}), "
+                    f"{repairs} invalid answer(s) repaired locally instead")
+    if RUN_STATS["llm_failovers"] or RUN_STATS["llm_hedges"]:
+        logger.info(f"LLM provider chain: {RUN_STATS['llm_failovers']} failover(s), "
+                    f"{RUN_STATS['llm_hedges']} hedged request(s)")
+
+
+def _log_circuit_breakers():
+    """Write each circuit breaker's state changes and skipped calls to the run report."""
+    names = sorted({k[1] for k in RUN_STATS if isinstance(k, tuple) and k[0] in ("circuit", "circuit_skipped")})
+    for name in names:
+        changes = ", ".join(f"{k[2]} x{n}" for k, n in RUN_STATS.items()
+                            if isinstance(k, tuple) and k[:2] == ("circuit", name))
+        logger.info(f"Circuit breaker for {name}: {changes or 'no state changes'}; "
+                    f"{RUN_STATS[('circuit_skipped', name)]} call(s) skipped while open")
+
+
+def _log_peak_memory():
+    """Write the run's peak resident memory to the run report (POSIX only)."""
+    if resource is None:
+        return
+    unit = 1 if sys.platform == "darwin" else 1024  # ru_maxrss is bytes on macOS, KiB on Linux
+    main = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * unit
+    logger.info(f"Peak memory (RSS): {main / 2**20:.0f} MiB main process, "
+                f"{children / 2**20:.0f} MiB largest child process (extraction workers, Copilot CLI)")
 
 
 def login_to_website(page):
@@ -808,31 +3411,20 @@ def process_all_articles(playwright, browser, context, page):
 
         processed_ids = load_processed_articles()
 
-        for article in articles:
-            article_id = _get_article_id(article)
-            title_el = article.query_selector("h3")
-            title = title_el.inner_text() if title_el else "(no title)"
-            logger.info(f"Checking article: {title} [{article_id}]")
-
-            if not FORCE_REPROCESS and article_id in processed_ids:
-                logger.info(f"Article {article_id} already processed, skipping")
-                continue
-
-            if FORCE_REPROCESS:
-                logger.info(f"Force mode active: processing article {article_id} without updating state")
-            else:
-                logger.info(f"Processing new article: {article_id}")
-
-            expand_full_text(article)
+        cfg = get_config()
+        if cfg.DIGEST_ENABLED and cfg.DIGEST_BATCH_SIZE > 1:
+            _digest_articles_in_batches(playwright, browser, context, articles, processed_ids, cfg)
+            return
+        if cfg.DIGEST_ENABLED and cfg.LLM_CONCURRENCY > 1:
+            _digest_articles_concurrently(playwright, browser, context, articles, processed_ids, cfg.LLM_CONCURRENCY)
+            return
 
+        for article, article_id in _new_articles(articles, processed_ids):
             try:
                 process_article_content(playwright, browser, context, article)
-                if not FORCE_REPROCESS:
-                    save_processed_article(article_id)
-                    processed_ids.append(article_id)
+                _mark_processed(article_id, processed_ids)
             except Exception as e:
-                logger.error(f"Error processing article {article_id}: {str(e)}")
-                logger.error(f"Stack trace: {traceback.format_exc()}")
+                _log_article_error(article_id, e)
                 # Continue to next article; leave unmarked for retry
 
     except Exception as e:
@@ -841,6 +3433,125 @@ def process_all_articles(playwright, browser, context, page):
         raise
 
 
+def _new_articles(articles, processed_ids):
+    """Yield (article, article_id) for each Article still to process, expanded to its full text."""
+    for article in articles:
+        article_id = _get_article_id(article)
+        title_el = article.query_selector("h3")
+        title = title_el.inner_text() if title_el else "(no title)"
+        logger.info(f"Checking article: {title} [{article_id}]")
+
+        if not FORCE_REPROCESS and article_id in processed_ids:
+            logger.info(f"Article {article_id} already processed, skipping")
+            continue
+
+        if FORCE_REPROCESS:
+            logger.info(f"Force mode active: processing article {article_id} without updating state")
+        else:
+            logger.info(f"Processing new article: {article_id}")
+
+        expand_full_text(article)
+        yield article, article_id
+
+
+def _log_article_error(article_id, error):
+    """Report an Article that could not be delivered; it stays unmarked, so the next run retries it."""
+    if isinstance(error, CircuitOpenError):
+        logger.warning(f"Article {article_id} left for the next run: {error}")
+        return
+    logger.error(f"Error processing article {article_id}: {str(error)}")
+    logger.error(f"Stack trace: {traceback.format_exc()}")
+
+
+def _mark_processed(article_id, processed_ids):
+    if not FORCE_REPROCESS:
+        save_processed_article(article_id)
+        processed_ids.append(article_id)
+
+
+def _digest_articles_concurrently(playwright, browser, context, articles, processed_ids, width):
+    """Generate up to `width` Digests at once while still notifying in post order.
+
+    Reading an Article and its attachments stays on this thread (Playwright's sync API is not
+    thread-safe); only generate_digest runs in the pool. A Digest is delivered once it and every
+    earlier one are done, so parents get the notifications in the order the posts appear.
+    """
+    pending = deque()  # (article_id, PreparedArticle, Future) in post order
+
+    def deliver(block):
+        while pending and (block or pending[0][2].done()):
+            article_id, prepared, future = pending.popleft()
+            try:
+                deliver_article(prepared, future.result)
+                _mark_processed(article_id, processed_ids)
+            except Exception as e:
+                _log_article_error(article_id, e)
+
+    with ThreadPoolExecutor(max_workers=width) as pool:
+        for article, article_id in _new_articles(articles, processed_ids):
+            deliver(block=False)
+            try:
+                prepared = prepare_article(playwright, browser, context, article)
+            except Exception as e:
+                _log_article_error(article_id, e)
+                continue
+            future = pool.submit(generate_digest, prepared.title, prepared.body, prepared.attachments)
+            pending.append((article_id, prepared, future))
+        deliver(block=True)
+
+
+def _message_chars(prepared):
+    return len(prepared.title) + len(prepared.body) + sum(len(a.text) for a in prepared.attachments if not a.failed)
+
+
+def _digest_batches(items, size):
+    """Group consecutive (article_id, PreparedArticle) pairs into batches of at most `size`.
+
+    Each batched Article may use an equal share of LLM_CONTEXT_TOKENS (less the answer
+    reserve), so a full batch still fits; a longer Article gets a batch of its own.
+    """
+    context_tokens = get_config().LLM_CONTEXT_TOKENS
+    share = (context_tokens - _DIGEST_ANSWER_TOKENS) * 4 // size if context_tokens > 0 else None
+    batches = []
+    batch = []
+    for item in items:
+        if share is not None and _message_chars(item[1]) > share:
+            batches.extend([batch, [item]] if batch else [[item]])
+            batch = []
+            continue
+        batch.append(item)
+        if len(batch) == size:
+            batches.append(batch)
+            batch = []
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def _digest_articles_in_batches(playwright, browser, context, articles, processed_ids, cfg):
+    """Read every new Article, then generate their Digests DIGEST_BATCH_SIZE at a time.
+
+    Batches run up to LLM_CONCURRENCY at once; notifications still go out in post order.
+    """
+    prepared = []
+    for article, article_id in _new_articles(articles, processed_ids):
+        try:
+            prepared.append((article_id, prepare_article(playwright, browser, context, article)))
+        except Exception as e:
+            _log_article_error(article_id, e)
+
+    with ThreadPoolExecutor(max_workers=max(cfg.LLM_CONCURRENCY, 1)) as pool:
+        batches = _digest_batches(prepared, cfg.DIGEST_BATCH_SIZE)
+        futures = [pool.submit(generate_digest_batch, [item for _, item in batch]) for batch in batches]
+        for batch, future in zip(batches, futures):
+            for index, (article_id, item) in enumerate(batch):
+                try:
+                    deliver_article(item, lambda: future.result()[index])
+                    _mark_processed(article_id, processed_ids)
+                except Exception as e:
+                    _log_article_error(article_id, e)
+
+
 def expand_full_text(article):
     try:
         more_button = article.query_selector("button:has-text('Meer weergeven')")
@@ -854,38 +3565,44 @@ def expand_full_text(article):
         raise
 
 
-def process_article_content(playwright, browser, context, article):
+@dataclass
+class PreparedArticle:
+    """An Article as read from the page: everything its Digest and notification need, no Playwright."""
+    title: str
+    body: str
+    attachments: list  # list[Attachment] — includes failed extractions
+    post_date: str | None
+
+
+def prepare_article(playwright, browser, context, article):
+    """Read an Article's text, post date and attachments (Playwright thread only)."""
     body = article.query_selector("span[as='div']").inner_text()
     title = article.query_selector("h3").inner_text()
 
-    if not get_config().DIGEST_ENABLED:
-        # Translation-only mode: no LLM, no attachment extraction
-        logger.info("Digest disabled — sending translated content directly")
-        send_notification(title=translate(title), body=translate(body))
-        return
-
-    attachments = []  # list[Attachment] — includes failed extractions
+    attachments = []
 
-    # Diagnostic: log all article hrefs for runtime observability of attachment formats
+    # One pass over the article's links; the diagnostic log keeps attachment formats observable
     all_links = article.query_selector_all("a[href]")
     if all_links:
         hrefs = [link.get_attribute("href") for link in all_links if link.get_attribute("href")]
         if hrefs:
             logger.debug(f"Article links ({len(hrefs)}): {[h.split('?')[0] for h in hrefs]}")
 
-    pdf_links = article.query_selector_all("a[href*='.pdf']")
-    if pdf_links:
-        attachments.extend(process_pdf_links(playwright, browser, context, pdf_links))
+    attachment_links = _discover_attachment_links(all_links or [])
+    if attachment_links:
+        attachments.extend(process_attachment_links(playwright, browser, context, attachment_links))
+    else:
+        logger.info("No attachments found in article.")
 
-    docx_links = article.query_selector_all("a[href*='.docx']")
-    if docx_links:
-        attachments.extend(process_docx_links(playwright, browser, context, docx_links))
+    return PreparedArticle(title=title, body=body, attachments=attachments, post_date=_get_post_date(article))
 
-    if not pdf_links and not docx_links:
-        logger.info("No PDFs or Word documents found in article.")
 
+def deliver_article(prepared, get_digest):
+    """Obtain the Digest via get_digest() and notify; a failed Digest is reported and re-raised."""
     try:
-        data = generate_digest(title, body, attachments)
+        data = get_digest()
+    except CircuitOpenError:
+        raise  # the failures that opened the breaker were already reported
     except RuntimeError as e:
         logger.error(f"Digest generation failed: {e}")
         send_notification(
@@ -894,18 +3611,31 @@ def process_article_content(playwright, browser, context, article):
         )
         raise
 
-    failed_names = [a.filename for a in attachments if a.failed] or None
+    failed_names = [a.filename for a in prepared.attachments if a.failed] or None
     send_notification(
         title=data.translated_title,
         body=render_digest_notification(
             data,
             failed_attachments=failed_names,
-            original_title=title,
-            post_date=_get_post_date(article),
+            original_title=prepared.title,
+            post_date=prepared.post_date,
         ),
     )
 
 
+def process_article_content(playwright, browser, context, article):
+    if not get_config().DIGEST_ENABLED:
+        # Translation-only mode: no LLM, no attachment extraction
+        body = article.query_selector("span[as='div']").inner_text()
+        title = article.query_selector("h3").inner_text()
+        logger.info("Digest disabled — sending translated content directly")
+        send_notification(title=translate(title), body=translate(body))
+        return
+
+    prepared = prepare_article(playwright, browser, context, article)
+    deliver_article(prepared, lambda: generate_digest(prepared.title, prepared.body, prepared.attachments))
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Social Schools news automation")
     parser.add_argument(
@@ -913,8 +3643,14 @@ if __name__ == "__main__":
         action="store_true",
         help="Process the first article even if already seen, without updating state",
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ask the LLM for every Digest instead of reusing a cached one",
+    )
     args = parser.parse_args()
     FORCE_REPROCESS = args.force
+    DIGEST_CACHE_ENABLED = not args.no_cache
     try:
         with sync_playwright() as playwright:
             run(playwright)
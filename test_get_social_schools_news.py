@@ -2,6 +2,11 @@ import json
 import pytest
 import os
 import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from unittest.mock import Mock, patch, mock_open
 
 # Add the current directory to Python path
@@ -22,17 +27,44 @@ from get_social_schools_news import (  # noqa: E402
     load_config,
     get_config,
     download_pdf,
-    extract_text,
-    process_pdf_links,
-    extract_text_from_docx,
-    process_docx_links,
+    extract_text_from_docx_stream,
+    process_attachment_links,
+    AttachmentExtractor,
+    AttachmentLink,
+    register_extractor,
+    _EXTRACTORS,
+    _discover_attachment_links,
+    _normalise_attachment_url,
+    _normalise_extracted_text,
+    _drop_shared_lines,
+    _ExtractionSandbox,
+    SpilledText,
+    _build_digest_prompt,
+    _log_peak_memory,
+    RUN_STATS,
+    _digest_cache_key,
+    PreparedArticle,
+    generate_digest_batch,
+    _extract_json_array,
+    _extract_json,
+    _digest_batches,
+    _close_extraction_sandbox,
+    PdfExtractor,
+    _sniff_extractor,
+    _authenticated_session,
+    _download_attachment,
+    _extract_from_buffer,
+    _extract_pdf_text,
+    _AttachmentTextBudget,
     run,
     login_to_website,
     process_all_articles,
     expand_full_text,
     _check_copilot_available,
+    _run_copilot,
     _get_article_id,
     _get_post_date,
+    _COPILOT_ARGV_PROMPT_LIMIT,
     _COPILOT_TOOL_FREE_ARGS,
     _dict_to_digest,
     _parse_api_keys,
@@ -40,9 +72,40 @@ from get_social_schools_news import (  # noqa: E402
     get_provider,
     CopilotCliProvider,
     OpenAICompatibleProvider,
+    DIGEST_JSON_SCHEMA,
+    REQUIRED_DIGEST_FIELDS,
+    _log_llm_usage,
+    _repair_json,
+    _llm_fallbacks,
+    LLMBackend,
+    ProviderChain,
+    _BackendLimiter,
+    _retry_after_seconds,
+    CircuitOpenError,
+    _CircuitBreaker,
+    _CIRCUIT_BREAKERS,
+    _log_circuit_breakers,
+    _select_passages,
+    _text_chunks,
+    ATTACHMENT_PART_JSON_SCHEMA,
 )
 
 
+@pytest.fixture(autouse=True)
+def isolated_digest_cache(tmp_path):
+    """Keep every test's Digest cache in its own temp dir, never in the working tree"""
+    with patch('get_social_schools_news.DIGEST_CACHE_FILE', str(tmp_path / "digest_cache.json")):
+        yield tmp_path / "digest_cache.json"
+
+
+@pytest.fixture(autouse=True)
+def closed_circuit_breakers():
+    """Start every test with fresh (closed) circuit breakers, as each run does"""
+    _CIRCUIT_BREAKERS.clear()
+    yield
+    _CIRCUIT_BREAKERS.clear()
+
+
 @pytest.fixture(autouse=True)
 def mock_config():
     """Automatically mock the config for all tests"""
@@ -52,9 +115,12 @@ def mock_config():
         PUSHBULLET_API_KEYS="Test:test_api_key",
         TRANSLATION_LANGUAGE="en",
         DIGEST_ENABLED=True,
+        EXTRACTION_SANDBOX=False,  # tests that need worker processes start their own
     )
     import get_social_schools_news
     get_social_schools_news.config = None  # reset cached config before each test
+    get_social_schools_news._run_attachments.clear()  # each test is its own run
+    get_social_schools_news._copilot_verified = False
     with patch('get_social_schools_news.load_config',
                return_value=test_config):
         yield test_config
@@ -168,6 +234,33 @@ def test_send_notification_raises_on_http_error():
             send_notification("Test", "Body", "Test:bad_key")
 
 
+def test_send_notification_circuit_opens_after_consecutive_outages(mock_config):
+    """Once Pushbullet is down, later notifications fail at once instead of waiting for timeouts"""
+    import requests as req_lib
+    mock_config.CIRCUIT_BREAKER_FAILURES = 2
+    with patch('requests.post', side_effect=req_lib.exceptions.ConnectTimeout("timed out")) as mock_post:
+        for _ in range(2):
+            with pytest.raises(req_lib.exceptions.ConnectTimeout):
+                send_notification("Test", "Body", "Test:key")
+        with pytest.raises(CircuitOpenError, match="Pushbullet"):
+            send_notification("Test", "Body", "Test:key")
+    assert mock_post.call_count == 2
+    assert mock_post.call_args.kwargs["timeout"] > 0
+
+
+def test_send_notification_bad_token_does_not_open_circuit(mock_config):
+    """A 4xx is one recipient's problem, not an outage"""
+    import requests as req_lib
+    mock_config.CIRCUIT_BREAKER_FAILURES = 1
+    rejected = Mock()
+    rejected.raise_for_status.side_effect = req_lib.exceptions.HTTPError("401", response=Mock(status_code=401))
+    with patch('requests.post', return_value=rejected) as mock_post:
+        for _ in range(2):
+            with pytest.raises(req_lib.exceptions.HTTPError):
+                send_notification("Test", "Body", "Test:bad_key")
+    assert mock_post.call_count == 2
+
+
 def test_process_article_content(mock_playwright, mock_config):
     playwright, browser, context, page = mock_playwright
 
@@ -402,6 +495,84 @@ def test_generate_digest_with_attachments(mock_config):
         assert "Sign and return by 15 Aug" in prompt
 
 
+def _digest_provider(*responses):
+    provider = Mock()
+    provider.complete.side_effect = list(responses)
+    return provider
+
+
+_VALID_DIGEST_JSON = json.dumps({
+    "translated_title": "Trip", "tldr": "School trip on Friday.", "action_items": [], "key_dates": ["15 Aug"],
+})
+
+
+def test_generate_digest_reuses_cached_digest_for_identical_prompt(mock_config):
+    RUN_STATS.clear()
+    provider = _digest_provider(_VALID_DIGEST_JSON)
+    with patch('get_social_schools_news.get_provider', return_value=provider):
+        first = generate_digest("Schoolreis", "Vrijdag schoolreis.", [])
+        second = generate_digest("Schoolreis", "Vrijdag schoolreis.", [])
+
+    assert provider.complete.call_count == 1
+    assert first == second
+    assert RUN_STATS["llm_calls"] == 1 and RUN_STATS["digest_cache_hits"] == 1
+
+
+@pytest.mark.parametrize("setting,value", [("TRANSLATION_LANGUAGE", "de"), ("LLM_MODEL", "other-model")])
+def test_generate_digest_cache_is_keyed_by_language_and_model(mock_config, setting, value):
+    provider = _digest_provider(_VALID_DIGEST_JSON, _VALID_DIGEST_JSON)
+    with patch('get_social_schools_news.get_provider', return_value=provider):
+        generate_digest("Schoolreis", "Vrijdag schoolreis.", [])
+        setattr(mock_config, setting, value)
+        generate_digest("Schoolreis", "Vrijdag schoolreis.", [])
+    assert provider.complete.call_count == 2
+
+
+def test_generate_digest_no_cache_asks_the_llm_again(mock_config):
+    provider = _digest_provider(_VALID_DIGEST_JSON, _VALID_DIGEST_JSON)
+    with patch('get_social_schools_news.get_provider', return_value=provider):
+        generate_digest("Schoolreis", "Vrijdag schoolreis.", [])
+        with patch('get_social_schools_news.DIGEST_CACHE_ENABLED', False):
+            generate_digest("Schoolreis", "Vrijdag schoolreis.", [])
+    assert provider.complete.call_count == 2
+
+
+def test_generate_digest_does_not_cache_the_fallback(mock_config):
+    provider = _digest_provider("not json", "still not json", _VALID_DIGEST_JSON)
+    with patch('get_social_schools_news.get_provider', return_value=provider):
+        fallback = generate_digest("Schoolreis", "Vrijdag schoolreis.", [])
+        digest = generate_digest("Schoolreis", "Vrijdag schoolreis.", [])
+    assert fallback.tldr.startswith("(Could not generate summary")
+    assert digest.tldr == "School trip on Friday."
+
+
+def test_digest_cache_skips_expired_entries(mock_config, isolated_digest_cache):
+    import time
+    key = _digest_cache_key(_build_digest_prompt("Titel", "Body", []))
+    isolated_digest_cache.write_text(json.dumps({key: {
+        "created": time.time() - 31 * 86400,
+        "digest": {"translated_title": "Old", "tldr": "Stale", "action_items": [], "key_dates": []},
+    }}))
+    provider = _digest_provider(_VALID_DIGEST_JSON)
+    with patch('get_social_schools_news.get_provider', return_value=provider):
+        digest = generate_digest("Titel", "Body", [])
+    assert digest.translated_title == "Trip"
+
+
+def test_digest_cache_evicts_oldest_entries_beyond_limit(mock_config, isolated_digest_cache):
+    import time
+    mock_config.DIGEST_CACHE_MAX_ENTRIES = 2
+    entry = {"translated_title": "T", "tldr": "x", "action_items": [], "key_dates": []}
+    isolated_digest_cache.write_text(json.dumps({
+        "oldest": {"created": time.time() - 20, "digest": entry},
+        "newer": {"created": time.time() - 10, "digest": entry},
+    }))
+    with patch('get_social_schools_news.get_provider', return_value=_digest_provider(_VALID_DIGEST_JSON)):
+        generate_digest("Titel", "Body", [])
+    cache = json.loads(isolated_digest_cache.read_text())
+    assert "oldest" not in cache and "newer" in cache and len(cache) == 2
+
+
 def test_generate_digest_cli_not_found(mock_config):
     """Test generate_digest raises RuntimeError when copilot CLI is missing"""
     with patch('subprocess.run', side_effect=FileNotFoundError):
@@ -957,6 +1128,379 @@ def test_openai_compatible_raises_on_error_status():
             provider.complete("p")
 
 
+class _StubChatHandler(BaseHTTPRequestHandler):
+    """OpenAI-compatible stub: answers with a JSON object, then keeps talking slowly."""
+
+    protocol_version = "HTTP/1.1"  # chunked server-sent events, like Ollama and hosted APIs
+    answer = '{"tldr": "Trip {Friday}", "action_items": ["Pack \\"lunch\\""]}'
+    commentary = [" I hope", " this", " helps!"]
+    delay = 0.4
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers["Content-Length"])
+        self.server.payloads.append(json.loads(self.rfile.read(length)))
+        pieces = [self.answer[i:i + 7] for i in range(0, len(self.answer), 7)]
+        if not self.server.payloads[-1]["stream"]:
+            time.sleep(self.delay * len(self.commentary))
+            body = json.dumps({"choices": [{"message": {"content": self.answer + "".join(self.commentary)}}]})
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body.encode())
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        events = [json.dumps({"choices": [{"delta": {"content": piece}}]}) for piece in pieces + self.commentary]
+        try:
+            for i, event in enumerate(events + ["[DONE]"]):
+                if len(pieces) <= i < len(events):
+                    time.sleep(self.delay)
+                data = f"data: {event}\n\n".encode()
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.server.hung_up.set()
+
+
+@pytest.fixture
+def chat_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubChatHandler)
+    server.payloads = []
+    server.hung_up = threading.Event()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_openai_compatible_stream_stops_at_complete_json(chat_server):
+    """Streaming mode returns the first complete JSON object without waiting for the rest"""
+    provider = OpenAICompatibleProvider(
+        base_url=f"http://127.0.0.1:{chat_server.server_port}/v1", model="m", stream=True)
+    start = time.perf_counter()
+    result = provider.complete("prompt text")
+    elapsed = time.perf_counter() - start
+
+    assert result == _StubChatHandler.answer
+    assert json.loads(result)["tldr"] == "Trip {Friday}"
+    assert elapsed < _StubChatHandler.delay * len(_StubChatHandler.commentary)
+    payload = chat_server.payloads[0]
+    assert payload["stream"] is True
+    assert "tools" not in payload
+    assert "functions" not in payload
+
+
+def test_openai_compatible_stream_returns_whole_text_without_json(chat_server):
+    """A streamed answer with no JSON object in it is returned in full"""
+    with patch.object(_StubChatHandler, "answer", "No JSON {here}, sorry."), \
+         patch.object(_StubChatHandler, "delay", 0):
+        provider = OpenAICompatibleProvider(
+            base_url=f"http://127.0.0.1:{chat_server.server_port}/v1", model="m", stream=True)
+        result = provider.complete("prompt text")
+    assert result == "No JSON {here}, sorry. I hope this helps!"
+
+
+def test_openai_compatible_non_stream_waits_for_full_answer(chat_server):
+    """Without LLM_STREAM the whole answer, commentary included, is awaited as before"""
+    with patch.object(_StubChatHandler, "delay", 0.05):
+        provider = OpenAICompatibleProvider(
+            base_url=f"http://127.0.0.1:{chat_server.server_port}/v1", model="m")
+        result = provider.complete("prompt text")
+    assert result.startswith(_StubChatHandler.answer)
+    assert result.endswith("helps!")
+    assert chat_server.payloads[0]["stream"] is False
+
+
+@pytest.mark.parametrize("json_mode, expected", [
+    ("json_object", {"response_format": {"type": "json_object"}}),
+    ("json_schema", {"response_format": {"type": "json_schema",
+                                         "json_schema": {"name": "digest", "schema": DIGEST_JSON_SCHEMA, "strict": True}}}),
+    ("ollama", {"format": DIGEST_JSON_SCHEMA}),
+])
+def test_openai_compatible_json_mode_constrains_output_without_tools(json_mode, expected):
+    provider = OpenAICompatibleProvider(base_url="http://x/v1", model="m", json_mode=json_mode)
+    mock_resp = Mock()
+    mock_resp.status_code = 200
+    mock_resp.json.return_value = {"choices": [{"message": {"content": "{}"}}]}
+    with patch('requests.post', return_value=mock_resp) as mock_post:
+        provider.complete("prompt text", schema=DIGEST_JSON_SCHEMA)
+        provider.complete("prompt text")
+    with_schema, without = (json.loads(c.kwargs["data"]) for c in mock_post.call_args_list)
+    assert {k: with_schema[k] for k in expected} == expected
+    assert "tools" not in with_schema and "functions" not in with_schema
+    assert "response_format" not in without and "format" not in without
+
+
+def test_openai_compatible_rejects_unknown_json_mode():
+    with pytest.raises(RuntimeError, match="Unknown LLM_JSON_MODE 'xml'"):
+        OpenAICompatibleProvider(base_url="http://x/v1", model="m", json_mode="xml")
+
+
+def test_digest_json_schema_matches_required_fields():
+    assert set(DIGEST_JSON_SCHEMA["required"]) == REQUIRED_DIGEST_FIELDS
+    assert DIGEST_JSON_SCHEMA["properties"]["key_dates"] == {"type": "array", "items": {"type": "string"}}
+    assert DIGEST_JSON_SCHEMA["properties"]["tldr"] == {"type": "string"}
+
+
+def test_generate_digest_tracks_retry_rate_per_provider(mock_config, caplog):
+    import logging
+    RUN_STATS.clear()
+    provider = _digest_provider("not json", _VALID_DIGEST_JSON, _VALID_DIGEST_JSON)
+    with patch('get_social_schools_news.get_provider', return_value=provider):
+        generate_digest("Schoolreis", "Vrijdag schoolreis.", [])
+        generate_digest("Sportdag", "Donderdag sportdag.", [])
+    assert provider.complete.call_args_list[0].kwargs["schema"] is DIGEST_JSON_SCHEMA
+    with caplog.at_level(logging.INFO, logger="get_social_schools_news"):
+        _log_llm_usage()
+    assert "Digest retry rate for Mock: 1/2 (50%), 0 invalid" in caplog.text
+
+
+def test_generate_digest_tracks_retry_rate_per_chain_backend(mock_config, caplog):
+    import logging
+    RUN_STATS.clear()
+    down = _answering(RuntimeError("LLM request to http://nas:11434/v1 failed: refused"))
+    chain = ProviderChain([("ollama", down), ("copilot", _digest_provider("not json", _VALID_DIGEST_JSON))])
+    with patch('get_social_schools_news.get_provider', return_value=chain):
+        generate_digest("Schoolreis", "Vrijdag schoolreis.", [])
+    with caplog.at_level(logging.INFO, logger="get_social_schools_news"):
+        _log_llm_usage()
+    assert "Digest retry rate for copilot: 1/1 (100%)" in caplog.text
+
+
+def test_generate_digest_does_not_cache_fallback_answers(mock_config, isolated_digest_cache):
+    """The cache key names the main backend, so a fallback's Digest is not stored under it"""
+    mock_config.LLM_FALLBACKS = (LLMBackend(name="copilot", LLM_PROVIDER="copilot"),)
+    down = _answering(RuntimeError("LLM request to http://nas:11434/v1 failed: refused"))
+    chain = ProviderChain([("ollama", down), ("copilot", _answering(_VALID_DIGEST_JSON))])
+    with patch('get_social_schools_news.get_provider', return_value=chain):
+        generate_digest("Schoolreis", "Vrijdag schoolreis.", [])
+    assert not isolated_digest_cache.exists()
+
+    chain = ProviderChain([("ollama", _answering(_VALID_DIGEST_JSON)), ("copilot", down)])
+    with patch('get_social_schools_news.get_provider', return_value=chain):
+        generate_digest("Schoolreis", "Vrijdag schoolreis.", [])
+    assert len(json.loads(isolated_digest_cache.read_text())) == 1
+
+
+@pytest.mark.parametrize("raw", [
+    'Sure! {"translated_title": "Trip", "tldr": "Friday.", "action_items": [], "key_dates": ["15 Aug",],} Enjoy',
+    "{'translated_title': 'Trip', 'tldr': 'It\\'s Friday.', action_items: [], key_dates: ['15 Aug']}",
+    '{“translated_title”: “Trip”, "tldr": "The “big” day\nis Friday.", "action_items": [], "key_dates": ["15 Aug"',
+])
+def test_repair_json_fixes_almost_valid_answers(raw):
+    data = _repair_json(raw)
+    assert data["translated_title"] == "Trip"
+    assert data["key_dates"] == ["15 Aug"]
+    assert _dict_to_digest(data).tldr.endswith("Friday.")
+
+
+def test_repair_json_quotes_non_ascii_bare_words():
+    data = _repair_json("{translated_title: 'Trip', tldr: één, überhaupt: True, action_items: [], key_dates: []}")
+    assert data["tldr"] == "één"
+    assert data["überhaupt"] is True
+
+
+@pytest.mark.parametrize("answer", ["[" + _VALID_DIGEST_JSON + "]", "42", '"Trip"'])
+def test_generate_digest_handles_answer_that_is_not_an_object(mock_config, answer):
+    """An array or scalar answer is repaired or retried like any other invalid answer"""
+    provider = _digest_provider(answer, _VALID_DIGEST_JSON)
+    with patch('get_social_schools_news.get_provider', return_value=provider):
+        digest = generate_digest("Schoolreis", "Vrijdag schoolreis.", [])
+    assert digest.translated_title == "Trip"
+    assert provider.complete.call_count == (1 if answer.startswith("[") else 2)
+
+
+def test_generate_digest_repairs_locally_before_retrying(mock_config, caplog):
+    import logging
+    RUN_STATS.clear()
+    almost = _VALID_DIGEST_JSON[:-1] + ",\n"  # trailing comma, closing brace cut off
+    provider = _digest_provider(almost, "no JSON at all", _VALID_DIGEST_JSON)
+    with patch('get_social_schools_news.get_provider', return_value=provider):
+        repaired = generate_digest("Schoolreis", "Vrijdag schoolreis.", [])
+        retried = generate_digest("Sportdag", "Donderdag sportdag.", [])
+    assert provider.complete.call_count == 3
+    assert repaired.translated_title == retried.translated_title == "Trip"
+    with caplog.at_level(logging.INFO, logger="get_social_schools_news"):
+        _log_llm_usage()
+    assert "Digest retry rate for Mock: 1/2 (50%), 1 invalid answer(s) repaired locally instead" in caplog.text
+
+
+def test_llm_fallbacks_read_named_sections_in_order():
+    import configparser
+    parser = configparser.ConfigParser()
+    parser.read_string(
+        "[DEFAULT]\nLLM_MODEL = llama3.1\nLLM_FALLBACKS = copilot, cloud\n"
+        "[llm:cloud]\nLLM_PROVIDER = openai_compatible\nLLM_BASE_URL = https://openrouter.ai/api/v1\n"
+        "LLM_MODEL = openai/gpt-4o-mini\nLLM_API_KEY = secret\n"
+    )
+    assert _llm_fallbacks(parser) == (
+        LLMBackend(name="copilot", LLM_PROVIDER="copilot"),
+        LLMBackend(name="cloud", LLM_PROVIDER="openai_compatible", LLM_BASE_URL="https://openrouter.ai/api/v1",
+                   LLM_MODEL="openai/gpt-4o-mini", LLM_API_KEY="secret"),
+    )
+    parser["DEFAULT"]["LLM_FALLBACKS"] = "missing"
+    with pytest.raises(RuntimeError, match=r"no \[llm:missing\] section"):
+        _llm_fallbacks(parser)
+
+
+def test_get_provider_builds_chain_of_tool_free_providers(mock_config):
+    mock_config.LLM_PROVIDER = "openai_compatible"
+    mock_config.LLM_BASE_URL = "http://nas:11434/v1"
+    mock_config.LLM_MODEL = "llama3.1"
+    mock_config.LLM_FALLBACKS = (LLMBackend(name="copilot", LLM_PROVIDER="copilot"),)
+    mock_config.LLM_HEDGE_SECONDS = 20
+    chain = get_provider()
+    assert isinstance(chain, ProviderChain)
+    assert chain.hedge_seconds == 20
+    assert [(name, type(p)) for name, p in chain.providers] == [
+        ("openai_compatible", OpenAICompatibleProvider), ("copilot", CopilotCliProvider),
+    ]
+
+
+def test_get_provider_gives_each_backend_its_own_stream_and_json_mode(mock_config):
+    mock_config.LLM_PROVIDER = "openai_compatible"
+    mock_config.LLM_BASE_URL = "http://nas:11434/v1"
+    mock_config.LLM_MODEL = "llama3.1"
+    mock_config.LLM_STREAM = True
+    mock_config.LLM_JSON_MODE = "ollama"
+    mock_config.LLM_FALLBACKS = (LLMBackend(
+        name="cloud", LLM_PROVIDER="openai_compatible", LLM_BASE_URL="https://openrouter.ai/api/v1",
+        LLM_MODEL="openai/gpt-4o-mini", LLM_JSON_MODE="json_schema",
+    ),)
+    (_, local), (_, cloud) = get_provider().providers
+    assert (local.stream, local.json_mode) == (True, "ollama")
+    assert (cloud.stream, cloud.json_mode) == (False, "json_schema")
+
+
+def _answering(answer, delay=0.0):
+    def complete(prompt, schema=None):
+        time.sleep(delay)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+    provider = Mock()
+    provider.complete.side_effect = complete
+    return provider
+
+
+def test_provider_chain_fails_over_in_order():
+    RUN_STATS.clear()
+    down = _answering(RuntimeError("LLM request to http://nas:11434/v1 failed: refused"))
+    copilot = _answering(_VALID_DIGEST_JSON)
+    cloud = _answering("unused")
+    chain = ProviderChain([("ollama", down), ("copilot", copilot), ("cloud", cloud)])
+    assert chain.complete("prompt", schema=DIGEST_JSON_SCHEMA) == _VALID_DIGEST_JSON
+    assert cloud.complete.call_count == 0
+    assert RUN_STATS["llm_failovers"] == 1
+
+    chain = ProviderChain([("ollama", down), ("cloud", _answering(RuntimeError("status 503")))])
+    with pytest.raises(RuntimeError, match="All LLM providers failed; last error: status 503"):
+        chain.complete("prompt")
+
+
+def test_provider_chain_hedges_slow_provider_and_takes_first_valid_answer():
+    RUN_STATS.clear()
+    slow = _answering(_VALID_DIGEST_JSON, delay=1.5)
+    unusable = _answering("Sorry, I cannot help with that.", delay=0.05)
+    fast = _answering(json.dumps(_digest_json("Fast")))
+    chain = ProviderChain([("ollama", slow), ("copilot", unusable), ("cloud", fast)], hedge_seconds=0.1)
+    start = time.perf_counter()
+    answer = chain.complete("prompt", schema=DIGEST_JSON_SCHEMA)
+    assert time.perf_counter() - start < 1.0
+    assert json.loads(answer)["translated_title"] == "Fast"
+    assert RUN_STATS["llm_hedges"] == 2
+
+
+def test_provider_chain_health_check_needs_one_available_provider():
+    healthy, broken = Mock(), Mock()
+    broken.health_check.side_effect = RuntimeError("unreachable")
+    ProviderChain([("ollama", broken), ("copilot", healthy)]).health_check()
+    with pytest.raises(RuntimeError, match="No LLM provider is available"):
+        ProviderChain([("ollama", broken)]).health_check()
+
+
+def test_backend_limiter_paces_requests_with_token_bucket():
+    limiter = _BackendLimiter(rate_per_minute=600)
+    start = time.perf_counter()
+    for _ in range(3):
+        limiter.acquire()
+        limiter.release(0.0, True)
+    assert time.perf_counter() - start >= 0.18
+    limiter.pause(0.2)
+    start = time.perf_counter()
+    limiter.acquire()
+    assert time.perf_counter() - start >= 0.15
+
+
+def test_backend_limiter_grows_concurrency_and_halves_on_errors_or_slow_answers():
+    limiter = _BackendLimiter(max_concurrency=4, latency_target=5)
+    assert limiter.limit == 1
+    for _ in range(20):
+        limiter.acquire()
+        limiter.release(1.0, True)
+    assert limiter.limit == 4
+    limiter.acquire()
+    limiter.release(9.0, True)
+    assert limiter.limit == 2
+    limiter.acquire()
+    limiter.release(1.0, False)
+    assert limiter.limit == 1
+
+    limiter = _BackendLimiter(max_concurrency=2)
+    limiter.acquire()
+    second = threading.Thread(target=limiter.acquire)
+    second.start()
+    second.join(0.1)
+    assert second.is_alive()  # only one request in flight until the first answer
+    limiter.release(1.0, True)
+    second.join(1)
+    assert not second.is_alive()
+    assert limiter.in_flight == 1
+
+
+def test_openai_compatible_waits_out_retry_after_on_429():
+    provider = OpenAICompatibleProvider(base_url="http://x/v1", model="m")
+    limited = Mock(status_code=429, headers={"Retry-After": "0.2"})
+    ok = Mock(status_code=200)
+    ok.json.return_value = {"choices": [{"message": {"content": "hello"}}]}
+    with patch('requests.post', side_effect=[limited, ok]) as mock_post:
+        start = time.perf_counter()
+        assert provider.complete("p") == "hello"
+    assert time.perf_counter() - start >= 0.15
+    assert mock_post.call_count == 2
+
+    too_long = Mock(status_code=503, headers={"Retry-After": "3600"}, text="overloaded")
+    with patch('requests.post', return_value=too_long) as mock_post:
+        with pytest.raises(RuntimeError, match="returned status 503"):
+            provider.complete("p")
+    assert mock_post.call_count == 1
+
+
+def test_retry_after_seconds_accepts_delta_or_http_date():
+    assert _retry_after_seconds("7", default=1) == 7
+    assert _retry_after_seconds(None, default=1) == 1
+    assert _retry_after_seconds("soon", default=1) == 1
+    assert _retry_after_seconds("Wed, 21 Oct 2015 07:28:00 GMT", default=1) == 0
+    assert 50 < _retry_after_seconds(format_datetime(datetime.now(timezone.utc) + timedelta(seconds=60), usegmt=True),
+                                     default=1) <= 60
+
+
+def test_get_provider_shares_one_limiter_per_backend(mock_config):
+    mock_config.LLM_RATE_PER_MINUTE = 30
+    assert get_provider().limiter is get_provider().limiter
+    assert get_provider().limiter.rate == 0.5
+    mock_config.LLM_RATE_PER_MINUTE = 60
+    assert get_provider().limiter.rate == 1
+
+
 def test_generate_digest_via_openai_compatible_provider():
     """generate_digest routes through the HTTP provider when configured, not the CLI"""
     cfg = Config(
@@ -1065,112 +1609,986 @@ def test_extract_text_from_pdf():
         mock_doc.__iter__ = Mock(return_value=iter([mock_page]))
         mock_fitz_open.return_value = mock_doc
 
-        result = extract_text("/tmp/test.pdf")
+        result, pages_skipped = _extract_pdf_text("/tmp/test.pdf")
 
-        assert result == mock_text
+        assert result == mock_text and pages_skipped == 0
         mock_fitz_open.assert_called_once_with("/tmp/test.pdf")
         mock_page.get_text.assert_called_once()
 
 
-def test_process_pdf_links():
-    """Test processing PDF links returns Attachment objects with no failures"""
-    playwright, browser, context = Mock(), Mock(), Mock()
+def _make_pdf_bytes(*page_texts):
+    import fitz
+    doc = fitz.open()
+    for text in page_texts:
+        doc.new_page().insert_text((72, 72), text)
+    return doc.tobytes()
+
+
+def _make_docx_bytes(*paragraphs):
+    from io import BytesIO
+    from docx import Document
+    doc = Document()
+    for paragraph in paragraphs:
+        doc.add_paragraph(paragraph)
+    buffer = BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("wrap", [bytes, bytearray, memoryview])
+def test_extract_text_from_pdf_buffer(wrap):
+    """A PDF is extracted straight from an in-memory buffer, with no temp file"""
+    data = wrap(_make_pdf_bytes("Inleveren voor 15 aug"))
+    with patch('tempfile.TemporaryDirectory') as mock_tempdir:
+        result, _ = _extract_pdf_text(data)
+    assert "Inleveren voor 15 aug" in result
+    mock_tempdir.assert_not_called()
+
+
+def test_extract_from_buffer_keeps_small_attachments_in_memory(mock_config):
+    """Attachments at or below ATTACHMENT_SPILL_BYTES are handed to the extractor as bytes"""
+    mock_config.ATTACHMENT_SPILL_BYTES = 1024
+    extractor = Mock(return_value="text")
+    assert _extract_from_buffer(b"x" * 1024, extractor, "small.pdf") == "text"
+    extractor.assert_called_once_with(b"x" * 1024)
+
+
+def test_extract_from_buffer_spills_large_attachments_to_disk(mock_config):
+    """Attachments above ATTACHMENT_SPILL_BYTES are written to a temp file and extracted by path"""
+    mock_config.ATTACHMENT_SPILL_BYTES = 16
+    data = _make_pdf_bytes("Grote gids")
+    seen = {}
+
+    def extractor(source):
+        seen["source"] = source
+        with open(source, "rb") as f:
+            seen["data"] = f.read()
+        return _extract_pdf_text(source)[0]
+
+    assert "Grote gids" in _extract_from_buffer(data, extractor, "gids.pdf")
+    assert isinstance(seen["source"], str) and seen["source"].endswith("gids.pdf")
+    assert seen["data"] == data
+    assert not os.path.exists(seen["source"])
+
+
+def test_extract_pdf_text_stops_at_char_budget():
+    """Budgeted extraction stops on the page that exhausts the budget and counts the rest as skipped"""
+    data = _make_pdf_bytes("a" * 30, "b" * 30, "c" * 30, "d" * 30)
+    text, pages_skipped = _extract_pdf_text(data, char_budget=45)
+    assert len(text) == 45
+    assert "c" not in text
+    assert pages_skipped == 2
+
+
+def test_extract_pdf_text_without_budget_reads_every_page():
+    data = _make_pdf_bytes("eerste", "tweede")
+    text, pages_skipped = _extract_pdf_text(data)
+    assert "eerste" in text and "tweede" in text
+    assert pages_skipped == 0
+
+
+def _make_schedule_pdf_bytes():
+    """A ruled cost table above a two-column notice whose lines are written left, right, left, right."""
+    import fitz
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 60), "Kosten schoolreis")
+    for r, row in enumerate([("Groep", "Datum", "Bedrag"), ("Groep 5", "15 aug", "EUR 12,50")]):
+        for c, cell in enumerate(row):
+            rect = fitz.Rect(72 + c * 140, 80 + r * 20, 212 + c * 140, 100 + r * 20)
+            page.draw_rect(rect, color=(0, 0, 0), width=0.5)
+            page.insert_text((rect.x0 + 4, rect.y1 - 6), cell)
+    for i in range(3):
+        page.insert_text((72, 300 + i * 40), f"Links regel {i + 1}: de lopende tekst van")
+        page.insert_text((330, 300 + i * 40), f"Rechts regel {i + 1}: de lopende tekst van")
+    return doc.tobytes()
+
+
+def test_extract_pdf_text_layout_emits_tables_as_rows():
+    text, _ = _extract_pdf_text(_make_schedule_pdf_bytes(), layout=True)
+    assert "Groep\tDatum\tBedrag\nGroep 5\t15 aug\tEUR 12,50\n" in text
+    assert text.startswith("Kosten schoolreis\n")
+
+
+def test_extract_pdf_text_layout_reads_columns_in_order():
+    plain, _ = _extract_pdf_text(_make_schedule_pdf_bytes())
+    layout, _ = _extract_pdf_text(_make_schedule_pdf_bytes(), layout=True)
+    assert plain.index("Rechts regel 1") < plain.index("Links regel 3")
+    assert layout.index("Links regel 3") < layout.index("Rechts regel 1")
+
+
+def test_extract_pdf_text_layout_keeps_two_column_date_list_paired():
+    """A date with its event beside it is a list, not two columns of running text"""
+    import fitz
+    doc = fitz.open()
+    page = doc.new_page()
+    events = [("Ma 3 maart", "Gymles"), ("Di 4 maart", "Zwemmen"), ("Wo 5 maart", "Studiedag, school dicht")]
+    for i, (date, event) in enumerate(events):
+        page.insert_text((72, 100 + i * 20), date)
+        page.insert_text((330, 100 + i * 20), event)
+    text, _ = _extract_pdf_text(doc.tobytes(), layout=True)
+    assert text.split("\n")[:6] == ["Ma 3 maart", "Gymles", "Di 4 maart", "Zwemmen", "Wo 5 maart", "Studiedag, school dicht"]
+
+
+def test_extract_pdf_text_layout_skips_table_search_without_drawings():
+    import fitz
+    with patch.object(fitz.Page, 'find_tables') as mock_find_tables:
+        text, _ = _extract_pdf_text(_make_pdf_bytes("Alleen tekst"), layout=True)
+    mock_find_tables.assert_not_called()
+    assert "Alleen tekst" in text
+
+
+@pytest.mark.parametrize("layout", [True, False])
+def test_pdf_extractor_follows_pdf_layout_setting(mock_config, layout):
+    mock_config.PDF_LAYOUT = layout
+    text, _ = PdfExtractor().extract(_make_schedule_pdf_bytes())
+    assert ("Groep\tDatum\tBedrag" in text) is layout
+
+
+def _link(url):
+    link = Mock()
+    link.get_attribute.return_value = url
+    return link
+
+
+def _attachment_links(*names):
+    return [AttachmentLink(url=f"http://example.com/{name}", filename=name) for name in names]
+
+
+def test_process_attachment_links_applies_per_article_budget():
+    """Once the article budget is spent, later attachments are recorded as truncated without download"""
+    budget = _AttachmentTextBudget(per_attachment=100, per_article=45)
+
+    with patch('get_social_schools_news._download_attachment',
+               return_value=_make_pdf_bytes("a" * 30, "b" * 30, "c" * 30)) as mock_download:
+        first, second = process_attachment_links(
+            Mock(), Mock(), Mock(), _attachment_links("first.pdf", "second.pdf"), budget=budget,
+        )
 
-    # Mock PDF links
-    mock_link1 = Mock()
-    mock_link1.get_attribute.return_value = "http://example.com/test1.pdf"
-    mock_link2 = Mock()
-    mock_link2.get_attribute.return_value = "http://example.com/test2.pdf"
-    pdf_links = [mock_link1, mock_link2]
+    assert mock_download.call_count == 1
+    assert len(first.text) == 45 and first.truncated
+    assert second.truncated and second.text == "" and not second.failed
 
-    with patch('get_social_schools_news._download_pdf') as mock_download, \
-         patch('get_social_schools_news.extract_text') as mock_extract, \
-         patch('tempfile.TemporaryDirectory'):
 
-        mock_extract.return_value = "PDF content"
+def test_generate_digest_notes_truncated_attachment_in_prompt(mock_config):
+    """The prompt tells the model an attachment was cut short and how many pages were left out"""
+    mock_result = Mock()
+    mock_result.returncode = 0
+    mock_result.stdout = json.dumps({
+        "translated_title": "Title", "tldr": "Summary", "action_items": [], "key_dates": [],
+    })
 
-        attachments = process_pdf_links(playwright, browser, context, pdf_links)
+    with patch('subprocess.run', return_value=mock_result) as mock_run:
+        generate_digest("Title", "Body", [
+            Attachment(filename="gids.pdf", url="http://x/gids.pdf", filetype="pdf",
+                       text="Begin van de gids", truncated=True, pages_skipped=57),
+            Attachment(filename="extra.pdf", url="http://x/extra.pdf", filetype="pdf",
+                       text="", truncated=True),
+        ])
 
-        assert mock_download.call_count == 2
-        assert mock_extract.call_count == 2
-        assert all(isinstance(a, Attachment) for a in attachments)
-        assert [a.filename for a in attachments] == ["test1.pdf", "test2.pdf"]
-        assert all(a.text == "PDF content" for a in attachments)
-        assert all(not a.failed for a in attachments)
+        prompt = mock_run.call_args[0][0][mock_run.call_args[0][0].index("-p") + 1]
+        assert "gids.pdf \u2014 truncated, the last 57 page(s) were not included" in prompt
+        assert "extra.pdf \u2014 not included" in prompt
+
+
+def test_spilled_text_behaves_like_the_text_it_holds():
+    text = "Beste ouders,\nDe ouderbijdrage is \u20ac 45.\n" * 500
+    spilled = SpilledText(text)
+    assert len(spilled) == len(text) and spilled
+    assert str(spilled) == text
+    assert spilled[:30] == text[:30]
+    assert spilled[:len(text) + 10] == text
+    assert list(spilled.lines()) == text.split("\n")
+    # A multi-byte character split across two mmap reads is decoded intact.
+    assert "".join(spilled.chunks(size=7)) == text
+    assert not SpilledText("")
+
+
+def test_attachment_records_use_slots():
+    attachment = Attachment(filename="a.pdf", url="http://x/a.pdf", filetype="pdf", text="")
+    assert not hasattr(attachment, "__dict__")
+    with pytest.raises(AttributeError):
+        attachment.unknown_field = 1
+
+
+def test_long_attachment_text_is_spilled_and_streamed_into_the_prompt(mock_config):
+    mock_config.ATTACHMENT_TEXT_SPILL_CHARS = 100
+    mock_config.ATTACHMENT_MAX_CHARS = 0
+    mock_config.ARTICLE_ATTACHMENT_MAX_CHARS = 0
+    paragraphs = [f"Alinea {i}: graag inleveren voor 15 aug." for i in range(50)]
+
+    with patch('get_social_schools_news._download_attachment', return_value=_make_docx_bytes(*paragraphs)):
+        (attachment,) = process_attachment_links(Mock(), Mock(), Mock(), _attachment_links("lang.docx"))
+
+    assert isinstance(attachment.text, SpilledText)
+    prompt = _build_digest_prompt("Titel", "Body", [attachment])
+    assert "[Attachment: lang.docx]\n" + "\n".join(paragraphs) in prompt
+    assert "- date: 15 aug" in prompt
+
+
+def test_long_attachment_text_stays_spilled_after_shared_lines_and_budget(mock_config):
+    """Dropping shared lines and clipping to the Article budget do not pull the text back into memory"""
+    mock_config.ATTACHMENT_TEXT_SPILL_CHARS = 100
+    mock_config.ATTACHMENT_MAX_CHARS = 0
+    sign_off = "Met vriendelijke groet, de directie van De Linde"
+    first = [f"Brief {i}: graag inleveren voor 15 aug." for i in range(20)] + [sign_off]
+    second = [f"Bijlage {i}: de kosten zijn 12 euro." for i in range(40)] + [sign_off]
+    documents = [_make_docx_bytes(*first), _make_docx_bytes(*second)]
+
+    with patch('get_social_schools_news._download_attachment', side_effect=documents):
+        one, two = process_attachment_links(Mock(), Mock(), Mock(), _attachment_links("brief.docx", "bijlage.docx"),
+                                            budget=_AttachmentTextBudget(per_attachment=0, per_article=1500))
+
+    assert isinstance(one.text, SpilledText) and isinstance(two.text, SpilledText)
+    assert sign_off not in str(two.text)
+    assert two.truncated and len(one.text) + len(two.text) == 1500
+
+
+def test_digest_prompt_fits_llm_context_tokens(mock_config, caplog):
+    """Attachments share what the body and hints leave, each marked when cut, and the cut is logged"""
+    import logging
+    mock_config.LLM_CONTEXT_TOKENS = 3000
+    body = "Graag het formulier inleveren voor 15 aug. " * 20
+    small = Attachment(filename="brief.pdf", url="http://x/b.pdf", filetype="pdf", text="Korte brief.")
+    big = Attachment(filename="gids.pdf", url="http://x/g.pdf", filetype="pdf", text="Gids. " * 2000)
+    bigger = Attachment(filename="rooster.pdf", url="http://x/r.pdf", filetype="pdf", text="Rooster. " * 3000)
+
+    with caplog.at_level(logging.INFO, logger="get_social_schools_news"):
+        prompt = _build_digest_prompt("Titel", body, [small, big, bigger])
+
+    assert len(prompt) <= (3000 - 1024) * 4
+    assert body in prompt
+    assert "[Attachment: brief.pdf]\nKorte brief." in prompt
+    assert "[Attachment: gids.pdf — truncated to fit the text budget]" in prompt
+    assert "[Attachment: rooster.pdf — truncated to fit the text budget]" in prompt
+    gids = prompt.count("Gids. ")
+    rooster = prompt.count("Rooster. ")
+    assert 0 < gids < 2000 and 0 < rooster < 3000
+    assert abs(gids * 6 / (rooster * 9) - len(big.text) / len(bigger.text)) < 0.05  # proportional to size
+    assert "- date: 15 aug" in prompt
+    assert "cut to fit LLM_CONTEXT_TOKENS=3000" in caplog.text
+    assert "'gids.pdf' ~3000 ->" in caplog.text
+
+
+def test_digest_prompt_shortens_body_only_when_it_alone_is_too_long(mock_config):
+    mock_config.LLM_CONTEXT_TOKENS = 2000
+    body = "Lange nieuwsbrief zonder data. " * 1000
+    attachment = Attachment(filename="a.pdf", url="http://x/a.pdf", filetype="pdf", text="Bijlage.")
+    prompt = _build_digest_prompt("Titel", body, [attachment])
+    assert len(prompt) <= (2000 - 1024) * 4
+    assert "[… message shortened to fit the model's context]" in prompt
+    assert "[Attachment: a.pdf — not included, the text budget for this message was already used]" in prompt
+
+
+def test_digest_prompt_unlimited_context_leaves_text_alone(mock_config):
+    mock_config.LLM_CONTEXT_TOKENS = 0
+    attachment = Attachment(filename="a.pdf", url="http://x/a.pdf", filetype="pdf", text="Bijlage. " * 50_000)
+    prompt = _build_digest_prompt("Titel", "Body", [attachment])
+    assert "[Attachment: a.pdf]\n" + attachment.text in prompt
+
+
+def _school_guide():
+    filler = [f"Algemene informatie over de school, regel {i}." for i in range(40)]
+    return "\n".join(["Schoolgids 2025", *filler, "3. Schoolreis", *filler[:5],
+                      "Graag het toestemmingsformulier inleveren voor 12 sep.", *filler[5:]])
+
+
+def test_select_passages_keeps_hint_windows_with_section_heading():
+    excerpt, omitted = _select_passages(_school_guide())
+    assert excerpt.split("\n") == [
+        "[… 41 line(s) left out …]",
+        "3. Schoolreis",
+        "[… 3 line(s) left out …]",
+        "Algemene informatie over de school, regel 3.",
+        "Algemene informatie over de school, regel 4.",
+        "Graag het toestemmingsformulier inleveren voor 12 sep.",
+        "Algemene informatie over de school, regel 5.",
+        "Algemene informatie over de school, regel 6.",
+        "[… 33 line(s) left out …]",
+    ]
+    assert omitted == 77
+    assert _select_passages("Geen data hier.\nAlleen tekst.") == ("Geen data hier.\nAlleen tekst.", 0)
+
+
+def test_digest_prompt_sends_only_passages_of_long_attachments(mock_config, caplog):
+    """The body stays whole; a long attachment is cut to its excerpts, a short one is left alone"""
+    import logging
+    mock_config.PASSAGE_SELECTION_CHARS = 500
+    body = "Beste ouders, zie de schoolgids. " * 30
+    guide = Attachment(filename="gids.pdf", url="http://x/g.pdf", filetype="pdf", text=_school_guide())
+    letter = Attachment(filename="brief.pdf", url="http://x/b.pdf", filetype="pdf", text="Kort: graag 1 okt betalen.")
+
+    with caplog.at_level(logging.INFO, logger="get_social_schools_news"):
+        prompt = _build_digest_prompt("Titel", body, [guide, letter])
+
+    assert body in prompt
+    assert "[Attachment: gids.pdf — excerpts around dates and instructions only, 77 line(s) left out]" in prompt
+    assert "regel 20." not in prompt
+    assert "Graag het toestemmingsformulier inleveren voor 12 sep." in prompt
+    assert "[Attachment: brief.pdf]\nKort: graag 1 okt betalen." in prompt
+    assert "Passage selection for 'gids.pdf' in 'Titel'" in caplog.text
+
+    mock_config.PASSAGE_SELECTION_CHARS = 0
+    assert "regel 20." in _build_digest_prompt("Titel", body, [guide, letter])
+
+
+def test_text_chunks_split_at_line_ends_and_cut_overlong_lines():
+    assert list(_text_chunks("aaa\nbbb\nccc", 8)) == ["aaa\nbbb", "ccc"]
+    assert list(_text_chunks("ab\nc\n" + "x" * 10 + "\nd", 4)) == ["ab\nc", "xxxx", "xxxx", "xx\nd"]
+
+
+def test_generate_digest_reads_long_attachment_in_parallel_parts(mock_config):
+    """Each part gets its own bounded call; the Digest call sees only the items found, and is cached"""
+    mock_config.MAP_REDUCE_CHUNK_CHARS = 400
+    pages = [f"Pagina {p}: algemene informatie over de school.\n" * 8 for p in range(6)]
+    guide = Attachment(filename="gids.pdf", url="http://x/g.pdf", filetype="pdf", text="".join(pages))
+    all_running = threading.Barrier(3, timeout=5)
+    prompts = []
+
+    def complete(prompt, schema=None):
+        prompts.append(prompt)
+        if schema is ATTACHMENT_PART_JSON_SCHEMA:
+            assert len(prompt) < 2000
+            part = int(prompt.split("Below is part ")[1].split(" ")[0])
+            if part <= 3:
+                all_running.wait()  # breaks unless parts are read at the same time
+            if part == 2:
+                return "I could not find anything useful."
+            return json.dumps({"action_items": ["12 Sep - formulier inleveren (see gids.pdf)"],
+                               "key_dates": [f"{part} Oct - studiedag"]})
+        return _VALID_DIGEST_JSON
+
+    provider = Mock()
+    provider.complete.side_effect = complete
+    with patch('get_social_schools_news.get_provider', return_value=provider):
+        digest = generate_digest("Schoolgids", "Zie de bijlage.", [guide])
+        assert generate_digest("Schoolgids", "Zie de bijlage.", [guide]) == digest
+
+    parts = [p for p in prompts if "--- PART START ---" in p]
+    (final,) = [p for p in prompts if "--- MESSAGE START ---" in p]
+    assert len(parts) == len(prompts) - 1 > 3
+    assert digest.translated_title == "Trip"
+    assert f"[Attachment: gids.pdf — too long to include, read in {len(parts)} parts; " in final
+    assert final.count("- 12 Sep - formulier inleveren (see gids.pdf)") == 1
+    assert "- 1 Oct - studiedag\n- 3 Oct - studiedag" in final
+    assert f"(Part(s) 2 of {len(parts)} could not be read.)" in final
+    assert "algemene informatie" not in final
+
+
+def test_log_peak_memory_reports_rss(caplog):
+    import logging
+    with caplog.at_level(logging.INFO, logger="get_social_schools_news"):
+        _log_peak_memory()
+    assert "Peak memory (RSS):" in caplog.text
+
+
+def _mock_streamed_response(chunks, headers=None):
+    response = Mock()
+    response.headers = headers or {}
+    response.iter_content.return_value = iter(chunks)
+    response.__enter__ = Mock(return_value=response)
+    response.__exit__ = Mock(return_value=False)
+    return response
+
+
+def _mock_browser_context():
+    context = Mock()
+    context.cookies.return_value = [
+        {"name": "CloudFront-Policy", "value": "abc", "domain": "cdn.example.com", "path": "/"},
+    ]
+    return context
+
+
+def test_download_attachment_authenticated_streams_with_browser_cookies():
+    """The browser session's cookies go along on a streamed GET; nothing touches disk"""
+    response = _mock_streamed_response([b"%PDF", b"-1.7 body"], headers={"Content-Type": "application/pdf"})
+    with patch('requests.Session.get', return_value=response) as mock_get, patch('builtins.open') as mock_file:
+        assert _download_attachment("http://x/a.pdf", browser_context=_mock_browser_context()) == b"%PDF-1.7 body"
+    mock_file.assert_not_called()
+    assert mock_get.call_args.kwargs["stream"] is True
+
+
+def test_download_attachment_closes_the_authenticated_session():
+    """The cookie session is closed after every download, failed ones included"""
+    response = _mock_streamed_response([b"x" * 4096])
+    with patch('requests.Session.get', return_value=response), patch('requests.Session.close') as mock_close:
+        with pytest.raises(IOError, match="download aborted"):
+            _download_attachment("http://x/a.pdf", browser_context=_mock_browser_context(), max_bytes=1024)
+    mock_close.assert_called_once()
+
+
+def test_authenticated_session_carries_browser_cookies():
+    session = _authenticated_session(_mock_browser_context(), "https://cdn.example.com/a.pdf")
+    assert session.cookies.get("CloudFront-Policy", domain="cdn.example.com") == "abc"
+
+
+def test_download_attachment_authenticated_failure_raises():
+    import requests
+    response = _mock_streamed_response([])
+    response.raise_for_status.side_effect = requests.HTTPError("403 Client Error: Forbidden")
+    with patch('requests.Session.get', return_value=response):
+        with pytest.raises(IOError, match="403"):
+            _download_attachment("http://x/a.pdf", browser_context=_mock_browser_context())
+
+
+def test_download_attachment_rejects_oversized_file_before_reading_body():
+    """A Content-Length above ATTACHMENT_MAX_BYTES aborts before the body is read"""
+    response = _mock_streamed_response([b"x"], headers={"content-length": str(300 * 1024 * 1024)})
+    with patch('requests.Session.get', return_value=response):
+        with pytest.raises(IOError, match="too large"):
+            _download_attachment("http://x/film.pdf", browser_context=_mock_browser_context(), max_bytes=1024)
+    response.iter_content.assert_not_called()
+
+
+def test_download_attachment_rejects_wrong_content_type():
+    """A video mislabelled as a PDF is refused on its Content-Type"""
+    response = _mock_streamed_response([b"x"], headers={"content-type": "video/mp4"})
+    with patch('requests.Session.get', return_value=response):
+        with pytest.raises(IOError, match="wrong content type 'video/mp4'"):
+            _download_attachment("http://x/film.pdf", browser_context=_mock_browser_context())
+    response.iter_content.assert_not_called()
+
+
+def test_download_attachment_authenticated_aborts_chunked_body_past_cap():
+    """A chunked authenticated response with no Content-Length is cut off at the cap, not buffered whole"""
+    consumed = []
+    response = _mock_streamed_response([])
+    response.iter_content.return_value = (consumed.append(c) or c for c in [b"x" * 512] * 100)
+    with patch('requests.Session.get', return_value=response):
+        with pytest.raises(IOError, match="download aborted"):
+            _download_attachment("http://x/a.pdf", browser_context=_mock_browser_context(), max_bytes=2048)
+    assert len(consumed) == 5
+
+
+def test_download_attachment_streaming_aborts_past_cap():
+    """Without Content-Length, the requests path stops reading as soon as the cap is crossed"""
+    chunks = [b"x" * 512 for _ in range(100)]
+    response = _mock_streamed_response([], headers={"Content-Type": "application/pdf"})
+    consumed = []
+    response.iter_content.return_value = (consumed.append(c) or c for c in chunks)
+    with patch('requests.get', return_value=response):
+        with pytest.raises(IOError, match="download aborted"):
+            _download_attachment("http://x/a.pdf", max_bytes=2048)
+    assert len(consumed) == 5
+
+
+def test_download_attachment_streaming_returns_joined_chunks():
+    response = _mock_streamed_response([b"%PDF", b"-1.7"], headers={"Content-Type": "application/octet-stream"})
+    with patch('requests.get', return_value=response) as mock_get:
+        assert _download_attachment("http://x/a.pdf", max_bytes=1024) == b"%PDF-1.7"
+    assert mock_get.call_args.kwargs["stream"] is True
+
+
+def test_process_attachment_links_records_rejection_reason():
+    """An oversized attachment becomes a failed Attachment carrying the reason"""
+    with patch('get_social_schools_news._download_attachment',
+               side_effect=IOError("too large (314572800 bytes, limit is 26214400): http://example.com/film.pdf")):
+        (attachment,) = process_attachment_links(Mock(), Mock(), Mock(), _attachment_links("film.pdf"))
+    assert attachment.failed
+    assert attachment.failure_reason.startswith("too large")
 
 
-def test_process_pdf_links_partial_failure():
-    """Test that a failing PDF is recorded with failed=True without stopping other attachments"""
-    playwright, browser, context = Mock(), Mock(), Mock()
+# =============================================================================
+# DOCX PROCESSING TESTS
+# =============================================================================
 
-    mock_link1 = Mock()
-    mock_link1.get_attribute.return_value = "http://example.com/ok.pdf"
-    mock_link2 = Mock()
-    mock_link2.get_attribute.return_value = "http://example.com/broken.pdf"
-    pdf_links = [mock_link1, mock_link2]
+def _python_docx_text(data):
+    """What python-docx reads from a document: one line per doc.paragraphs entry."""
+    from io import BytesIO
+    from docx import Document
+    return "".join(paragraph.text + "\n" for paragraph in Document(BytesIO(data)).paragraphs)
+
+
+def test_extract_text_from_docx_stream_reads_file_path(tmp_path):
+    path = tmp_path / "brief.docx"
+    path.write_bytes(_make_docx_bytes("First paragraph", "Second paragraph"))
+    assert extract_text_from_docx_stream(str(path)) == "First paragraph\nSecond paragraph\n"
+
+
+def test_extract_text_from_docx_stream_buffer():
+    """A Word document is extracted straight from an in-memory buffer"""
+    data = _make_docx_bytes("Eerste alinea", "Tweede alinea")
+    assert extract_text_from_docx_stream(memoryview(data)) == "Eerste alinea\nTweede alinea\n"
+
+
+def _make_docx_with_table_bytes():
+    from io import BytesIO
+    from docx import Document
+    doc = Document()
+    doc.add_paragraph("Beste ouders,")
+    doc.add_paragraph("")
+    table = doc.add_table(rows=2, cols=3)
+    for r, values in enumerate([("Datum", "Activiteit", "Kosten"), ("15 aug", "Schoolreis", "\u20ac12,50")]):
+        for c, value in enumerate(values):
+            table.cell(r, c).text = value
+    doc.add_paragraph("Met vriendelijke groet")
+    doc.sections[0].header.paragraphs[0].text = "Basisschool De Linde"
+    doc.sections[0].footer.paragraphs[0].text = "Postbus 1, Utrecht"
+    buffer = BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def test_extract_text_from_docx_stream_matches_python_docx_paragraphs():
+    """Without tables, the streaming extractor yields exactly what the python-docx path yields"""
+    data = _make_docx_bytes("Eerste alinea", "", "Derde\talinea")
+    assert extract_text_from_docx_stream(data) == _python_docx_text(data)
+
+
+def test_extract_text_from_docx_stream_ignores_tab_stop_definitions():
+    """Tab stops set in a paragraph's properties are not typed tabs, as in python-docx"""
+    from io import BytesIO
+    from docx import Document
+    from docx.shared import Cm
+    doc = Document()
+    paragraph = doc.add_paragraph("Datum\tActiviteit")
+    paragraph.paragraph_format.tab_stops.add_tab_stop(Cm(4))
+    paragraph.paragraph_format.tab_stops.add_tab_stop(Cm(9))
+    buffer = BytesIO()
+    doc.save(buffer)
+    assert extract_text_from_docx_stream(buffer.getvalue()) == "Datum\tActiviteit\n" == paragraph.text + "\n"
+
+
+def test_extract_text_from_docx_stream_keeps_tables_as_tab_separated_rows():
+    """Table rows come out as compact tab-separated lines in document order"""
+    text = extract_text_from_docx_stream(_make_docx_with_table_bytes())
+    assert text == (
+        "Beste ouders,\n\n"
+        "Datum\tActiviteit\tKosten\n"
+        "15 aug\tSchoolreis\t\u20ac12,50\n"
+        "Met vriendelijke groet\n"
+    )
 
-    def download_side_effect(url, path, browser_context=None):
-        if "broken" in url:
-            raise Exception("404 Not Found")
 
-    with patch('get_social_schools_news._download_pdf', side_effect=download_side_effect), \
-         patch('get_social_schools_news.extract_text', return_value="OK content"), \
-         patch('tempfile.TemporaryDirectory'):
-        attachments = process_pdf_links(playwright, browser, context, pdf_links)
+def test_extract_text_from_docx_stream_headers_and_footers_on_request():
+    data = _make_docx_with_table_bytes()
+    assert "De Linde" not in extract_text_from_docx_stream(data)
+    text = extract_text_from_docx_stream(data, include_headers_footers=True)
+    assert text.startswith("Basisschool De Linde\n")
+    assert text.endswith("Postbus 1, Utrecht\n")
 
-    assert len(attachments) == 2
-    ok, broken = attachments
-    assert ok.filename == "ok.pdf" and not ok.failed and ok.text == "OK content"
-    assert broken.filename == "broken.pdf" and broken.failed
+
+def test_extract_text_from_docx_stream_stops_at_char_budget():
+    text = extract_text_from_docx_stream(_make_docx_bytes("a" * 50, "b" * 50, "c" * 50), char_budget=60)
+    assert len(text) == 60
+    assert "c" not in text
 
 
 # =============================================================================
-# DOCX PROCESSING TESTS
+# ATTACHMENT REGISTRY AND PIPELINE TESTS
 # =============================================================================
 
-def test_extract_text_from_docx():
-    """Test text extraction from Word document"""
-    with patch('get_social_schools_news.Document') as mock_document:
-        mock_doc = Mock()
-        mock_paragraph1 = Mock()
-        mock_paragraph1.text = "First paragraph"
-        mock_paragraph2 = Mock()
-        mock_paragraph2.text = "Second paragraph"
-        mock_doc.paragraphs = [mock_paragraph1, mock_paragraph2]
-        mock_document.return_value = mock_doc
 
-        result = extract_text_from_docx("/tmp/test.docx")
+def _make_zip_bytes(members, stored_first=None):
+    import zipfile
+    from io import BytesIO
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        if stored_first:
+            archive.writestr(zipfile.ZipInfo(stored_first[0]), stored_first[1], compress_type=zipfile.ZIP_STORED)
+        for name, content in members.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+def _make_xlsx_bytes():
+    ns = 'xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+    return _make_zip_bytes({
+        "[Content_Types].xml": "<Types/>",
+        "xl/workbook.xml": f"<workbook {ns}/>",
+        "xl/sharedStrings.xml": f"<sst {ns}><si><t>Datum</t></si><si><t>Kosten</t></si>"
+                                f"<si><r><t>Schoolreis</t></r></si></sst>",
+        "xl/worksheets/sheet1.xml": (
+            f'<worksheet {ns}><sheetData>'
+            f'<row r="1"><c r="A1" t="s"><v>0</v></c><c r="C1" t="s"><v>1</v></c></row>'
+            f'<row r="2"><c r="A2" t="inlineStr"><is><t>15 aug</t></is></c><c r="B2" t="s"><v>2</v></c>'
+            f'<c r="C2"><v>12.5</v></c></row>'
+            f'</sheetData></worksheet>'
+        ),
+    })
+
+
+def _make_pptx_bytes():
+    ns = ('xmlns:p="http://schemas.openxmlformats.org/presentationml/2006/main" '
+          'xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main"')
+    slide = '<p:sld {ns}><a:p><a:r><a:t>{text}</a:t></a:r></a:p></p:sld>'
+    return _make_zip_bytes({
+        "ppt/presentation.xml": f"<p:presentation {ns}/>",
+        "ppt/slides/slide2.xml": slide.format(ns=ns, text="Tweede dia"),
+        "ppt/slides/slide10.xml": slide.format(ns=ns, text="Tiende dia"),
+        "ppt/slides/slide1.xml": slide.format(ns=ns, text="Welkom"),
+    })
+
+
+def _make_odt_bytes():
+    ns = ('xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0" '
+          'xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0" '
+          'xmlns:table="urn:oasis:names:tc:opendocument:xmlns:table:1.0"')
+    content = (
+        f"<office:document-content {ns}><office:body><office:text>"
+        "<text:h>Kamp</text:h><text:p>Graag <text:span>aanmelden</text:span> voor 1 mei.</text:p>"
+        "<table:table><table:table-row><table:table-cell><text:p>Dag</text:p></table:table-cell>"
+        "<table:table-cell><text:p>Tijd</text:p></table:table-cell></table:table-row></table:table>"
+        "</office:text></office:body></office:document-content>"
+    )
+    return _make_zip_bytes({"content.xml": content},
+                           stored_first=("mimetype", "application/vnd.oasis.opendocument.text"))
+
+
+@pytest.mark.parametrize("make,filetype", [
+    (lambda: _make_pdf_bytes("x"), "pdf"),
+    (lambda: _make_docx_bytes("x"), "docx"),
+    (_make_xlsx_bytes, "xlsx"),
+    (_make_pptx_bytes, "pptx"),
+    (_make_odt_bytes, "odt"),
+    (lambda: "Gewone tekst \u20ac".encode("utf-8"), "txt"),
+])
+def test_sniff_extractor_identifies_format_from_magic_bytes(make, filetype):
+    assert _sniff_extractor(make()).filetype == filetype
+
+
+@pytest.mark.parametrize("data", [
+    b"\x00\x00\x00\x18ftypmp42 video bytes",
+    b"<!DOCTYPE html><html><body>Log in</body></html>",
+    _make_zip_bytes({"random.bin": "x"}),
+])
+def test_sniff_extractor_rejects_unsupported_data(data):
+    assert _sniff_extractor(data) is None
+
+
+def test_xlsx_extractor_emits_tab_separated_rows():
+    text, _ = _EXTRACTORS["application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"].extract(
+        _make_xlsx_bytes())
+    assert text == "[Sheet 1]\nDatum\t\tKosten\n15 aug\tSchoolreis\t12.5\n"
+
+
+def test_pptx_extractor_orders_slides_numerically():
+    text, _ = _sniff_extractor(_make_pptx_bytes()).extract(_make_pptx_bytes())
+    assert text == "[Slide 1]\nWelkom\n[Slide 2]\nTweede dia\n[Slide 3]\nTiende dia\n"
+
+
+def test_odt_extractor_reads_paragraphs_and_table_rows():
+    text, _ = _sniff_extractor(_make_odt_bytes()).extract(_make_odt_bytes())
+    assert text == "Kamp\nGraag aanmelden voor 1 mei.\nDag\tTijd\n"
+
+
+def test_register_extractor_adds_a_format_with_one_class():
+    """A new format is one small registered class: discovery, download and sniffing pick it up"""
+    @register_extractor
+    class RtfExtractor(AttachmentExtractor):
+        filetype = "rtf"
+        mime_type = "application/rtf"
+        extensions = (".rtf",)
+
+        def sniff(self, data):
+            return bytes(data[:5]) == b"{\\rtf"
+
+        def extract(self, source, char_budget=None):
+            return "rtf text", 0
+
+    try:
+        (link,) = _discover_attachment_links([_link("http://x/brief.rtf")])
+        with patch('get_social_schools_news._download_attachment', return_value=b"{\\rtf1 ..."):
+            (attachment,) = process_attachment_links(Mock(), Mock(), Mock(), [link])
+        assert attachment.filetype == "rtf" and attachment.text == "rtf text"
+    finally:
+        del _EXTRACTORS["application/rtf"]
+
+
+def test_discover_attachment_links_single_pass_over_links():
+    """Supported formats are found by path or query-string extension; everything else is ignored"""
+    links = [
+        _link("https://cdn.example.com/files/brief.pdf?Signature=abc"),
+        _link("https://cdn.example.com/files/rooster.XLSX"),
+        _link("https://cdn.example.com/download?id=7&response-content-disposition="
+              "attachment%3B%20filename%3D%22Ouderavond%20info.docx%22"),
+        _link("https://app.socialschools.eu/home"),
+        _link(None),
+        _link("https://cdn.example.com/files/notulen.odt"),
+    ]
+    found = _discover_attachment_links(links)
+    assert [a.filename for a in found] == ["brief.pdf", "rooster.XLSX", "Ouderavond info.docx", "notulen.odt"]
+    assert found[0].url == "https://cdn.example.com/files/brief.pdf?Signature=abc"
+
+
+def test_process_attachment_links_sniffs_type_from_content():
+    """The extractor is chosen from the downloaded bytes, even when the link's extension lies"""
+    pdf = _make_pdf_bytes("PDF inhoud")
+    docx = _make_docx_bytes("Word inhoud")
+
+    def download(url, browser_context=None):
+        return docx if "mislabelled" in url else pdf
+
+    with patch('get_social_schools_news._download_attachment', side_effect=download):
+        attachments = process_attachment_links(
+            Mock(), Mock(), Mock(), _attachment_links("brief.pdf", "mislabelled.pdf"),
+        )
+
+    assert [a.filetype for a in attachments] == ["pdf", "docx"]
+    assert "PDF inhoud" in attachments[0].text
+    assert attachments[1].text == "Word inhoud"
+    assert all(not a.failed for a in attachments)
+
+
+def test_process_attachment_links_partial_failure():
+    """A failing download is recorded with failed=True without stopping other attachments"""
+    def download(url, browser_context=None):
+        if "broken" in url:
+            raise Exception("404 Not Found")
+        return _make_pdf_bytes("OK content")
+
+    with patch('get_social_schools_news._download_attachment', side_effect=download):
+        ok, broken = process_attachment_links(Mock(), Mock(), Mock(), _attachment_links("ok.pdf", "broken.pdf"))
+
+    assert ok.filename == "ok.pdf" and not ok.failed and "OK content" in ok.text
+    assert broken.filename == "broken.pdf" and broken.failed and broken.failure_reason == "404 Not Found"
+
+
+def test_process_attachment_links_retries_a_failed_file_for_a_later_article():
+    """A transient failure in one Article is not reused for the rest of the run"""
+    responses = [IOError("503 Service Unavailable"), _make_pdf_bytes("Jaarkalender")]
+    with patch('get_social_schools_news._download_attachment', side_effect=responses) as mock_download:
+        (first,) = process_attachment_links(Mock(), Mock(), Mock(), _attachment_links("kalender.pdf"))
+        (second,) = process_attachment_links(Mock(), Mock(), Mock(), _attachment_links("kalender.pdf"))
+
+    assert mock_download.call_count == 2
+    assert first.failed and not second.failed and "Jaarkalender" in second.text
+
+
+def test_process_attachment_links_retries_a_failed_extraction_for_a_later_article():
+    failed = Attachment(filename="gids.pdf", url="http://example.com/gids.pdf", filetype="pdf", text="",
+                        failed=True, failure_reason="extraction failed: timed out")
+    ok = Attachment(filename="gids.pdf", url="http://example.com/gids.pdf", filetype="pdf", text="Gids")
+    with patch('get_social_schools_news._download_attachment', return_value=_make_pdf_bytes("Gids")), \
+            patch('get_social_schools_news._extract_attachment', side_effect=[failed, ok]) as mock_extract:
+        (first,) = process_attachment_links(Mock(), Mock(), Mock(), _attachment_links("gids.pdf"))
+        (second,) = process_attachment_links(Mock(), Mock(), Mock(), _attachment_links("gids.pdf"))
+
+    assert mock_extract.call_count == 2
+    assert first.failed and second.text == "Gids"
+
+
+def test_process_attachment_links_unsupported_format_fails_closed():
+    with patch('get_social_schools_news._download_attachment', return_value=b"\x00\x01binary"):
+        (attachment,) = process_attachment_links(Mock(), Mock(), Mock(), _attachment_links("rooster.xlsx"))
+    assert attachment.failed and "unsupported file format" in attachment.failure_reason
+    assert attachment.filetype == "xlsx"
+
+
+def test_normalise_extracted_text_strips_repeated_page_headers_and_footers():
+    letterhead = "OBS De Regenboog\nSchoolstraat 1, Utrecht\n"
+    filler = "".join(f"Over de school, alinea {i}.\n" for i in range(4))
+    pages = [
+        letterhead + filler + "Beste ouders,\n\nHet schoolreisje is op 15 aug.\nPagina 1 van 3\n",
+        letterhead + filler + "Graag het formulier inle-\nveren bij de leerkracht.\nPagina 2 van 3\n",
+        letterhead + filler + "Met   vriendelijke groet,   \n\n\n\nDe directie\nPagina 3 van 3\n",
+    ]
+    text = _normalise_extracted_text("\f".join(pages))
+
+    assert text.count("OBS De Regenboog") == 1
+    assert text.count("Schoolstraat 1, Utrecht") == 1
+    assert "Pagina" not in text
+    assert "inleveren" in text
+    assert "Met vriendelijke groet,\n\nDe directie" in text
+
+
+def test_normalise_extracted_text_keeps_dated_lines_of_short_timetable_pages():
+    """Weeks of a timetable differ only by their dates; none of them is a repeated header"""
+    pages = [
+        f"Week {week}\nMaandag {day} maart: gym\nDinsdag {day + 1} maart: zwemmen\n€ 25\n"
+        for week, day in ((10, 3), (11, 10), (12, 17))
+    ]
+    text = _normalise_extracted_text("\f".join(pages))
+    for line in ("Week 11", "Maandag 10 maart: gym", "Maandag 17 maart: gym", "Dinsdag 18 maart: zwemmen"):
+        assert line in text
+    assert text.count("€ 25") == 3
+
 
-        expected = "First paragraph\nSecond paragraph\n"
-        assert result == expected
-        mock_document.assert_called_once_with("/tmp/test.docx")
+def test_normalise_extracted_text_keeps_numbers_that_are_not_this_pages_number():
+    body = "".join(f"Regel {i} van de brief.\n" for i in range(8))
+    text = _normalise_extracted_text(f"{body}1\f{body}7\f{body}3/3")
+    assert "\n7" in text
+    assert "3/3" not in text
 
 
-def test_process_docx_links():
-    """Test processing DOCX links returns Attachment objects"""
-    playwright, browser, context = Mock(), Mock(), Mock()
+def test_drop_shared_lines_keeps_lines_that_differ_by_date_or_group():
+    seen = set()
+    assert _drop_shared_lines("3 maart 19:30 ouderavond groep 5", seen) is None
+    assert _drop_shared_lines("11 maart 19:30 ouderavond groep 7", seen) is None
+    assert _drop_shared_lines("Extra\n3 maart 19:30 ouderavond groep 5", seen) == "Extra"
 
-    # Mock DOCX link
-    mock_link = Mock()
-    mock_link.get_attribute.return_value = "http://example.com/test.docx"
-    docx_links = [mock_link]
 
-    with patch('get_social_schools_news._download_docx') as mock_download, \
-         patch('get_social_schools_news.extract_text_from_docx') as \
-         mock_extract, \
-         patch('tempfile.TemporaryDirectory'):
+def test_normalise_extracted_text_keeps_single_page_documents():
+    assert _normalise_extracted_text("Groep 5\n\nGroep 5\n3\n") == "Groep 5\n\nGroep 5\n3"
 
-        mock_extract.return_value = "DOCX content"
 
-        attachments = process_docx_links(playwright, browser, context, docx_links)
+def test_process_attachment_links_reports_removed_boilerplate():
+    """Each attachment records how much normalisation removed, and shared sign-offs are sent once"""
+    sign_off = "Met vriendelijke groet, de directie van OBS De Regenboog"
+    letter = _make_pdf_bytes(*("Kop OBS De Regenboog\n" + "\n".join(f"Pagina-inhoud {p}.{i}" for i in range(8))
+                               for p in range(3)))
+    form = _make_docx_bytes("Inschrijfformulier schoolreis", sign_off)
+    brief = _make_docx_bytes("Informatie over de schoolreis", sign_off)
 
-        mock_download.assert_called_once()
-        mock_extract.assert_called_once()
-        assert len(attachments) == 1
-        assert isinstance(attachments[0], Attachment)
-        assert attachments[0].filename == "test.docx"
-        assert attachments[0].text == "DOCX content"
-        assert not attachments[0].failed
+    def download(url, browser_context=None):
+        return {"letter.pdf": letter, "form.docx": form, "brief.docx": brief}[url.rsplit("/", 1)[-1]]
+
+    with patch('get_social_schools_news._download_attachment', side_effect=download):
+        pdf, first, second = process_attachment_links(
+            Mock(), Mock(), Mock(), _attachment_links("letter.pdf", "form.docx", "brief.docx"),
+        )
+
+    assert pdf.text.count("Kop OBS De Regenboog") == 1
+    assert pdf.chars_removed > 0 and pdf.tokens_removed > 0
+    assert sign_off in first.text
+    assert sign_off not in second.text
+    assert second.chars_removed >= len(sign_off) and second.tokens_removed > 0
+
+
+def test_normalise_attachment_url_ignores_signatures_and_ordering():
+    signed = "HTTPS://CDN.example.com/files/brief.pdf?b=2&Expires=1&Signature=abc&Key-Pair-Id=K&a=1#page=2"
+    assert _normalise_attachment_url(signed) == "https://cdn.example.com/files/brief.pdf?a=1&b=2"
+    assert (_normalise_attachment_url("https://s3.example.com/x.pdf?X-Amz-Signature=1&X-Amz-Date=2")
+            == _normalise_attachment_url("https://s3.example.com/x.pdf?X-Amz-Signature=3"))
+
+
+def test_process_attachment_links_lists_duplicate_links_once():
+    """A preview link and a signed download link to the same file are fetched and listed once"""
+    links = [
+        AttachmentLink(url="https://cdn.example.com/brief.pdf?Signature=a", filename="brief.pdf"),
+        AttachmentLink(url="https://cdn.example.com/brief.pdf?Signature=b&Expires=9", filename="brief.pdf"),
+    ]
+    with patch('get_social_schools_news._download_attachment',
+               return_value=_make_pdf_bytes("Brief")) as mock_download:
+        attachments = process_attachment_links(Mock(), Mock(), Mock(), links)
+
+    assert mock_download.call_count == 1
+    assert len(attachments) == 1
+
+
+def test_process_attachment_links_deduplicates_by_content():
+    """Different URLs serving identical bytes are extracted once and listed once"""
+    with patch('get_social_schools_news._download_attachment', return_value=_make_pdf_bytes("Zelfde")), \
+            patch('get_social_schools_news._extract_pdf_text', return_value=("Zelfde", 0)) as mock_extract:
+        attachments = process_attachment_links(
+            Mock(), Mock(), Mock(), _attachment_links("preview.pdf", "download.pdf"),
+        )
+
+    assert mock_extract.call_count == 1
+    assert [a.filename for a in attachments] == ["preview.pdf"]
+
+
+def test_process_attachment_links_shares_attachment_across_articles():
+    """The same file in two Articles of one run is downloaded once and both get the same Attachment"""
+    with patch('get_social_schools_news._download_attachment',
+               return_value=_make_pdf_bytes("Jaarkalender")) as mock_download:
+        (first,) = process_attachment_links(Mock(), Mock(), Mock(), _attachment_links("kalender.pdf"))
+        (second,) = process_attachment_links(Mock(), Mock(), Mock(), _attachment_links("kalender.pdf"))
+
+    assert mock_download.call_count == 1
+    assert first is second
+
+
+def test_process_attachment_links_shared_attachment_is_not_cut_to_an_earlier_article_budget():
+    """An Article with room for the whole file gets it, even after one with a tight budget fetched it"""
+    links = _attachment_links("kalender.pdf")
+    with patch('get_social_schools_news._download_attachment',
+               return_value=_make_pdf_bytes("a" * 30, "b" * 30)) as mock_download:
+        (tight,) = process_attachment_links(Mock(), Mock(), Mock(), links,
+                                            budget=_AttachmentTextBudget(per_attachment=100, per_article=20))
+        (roomy,) = process_attachment_links(Mock(), Mock(), Mock(), links,
+                                            budget=_AttachmentTextBudget(per_attachment=100, per_article=100))
+
+    assert mock_download.call_count == 1
+    assert len(tight.text) == 20 and tight.truncated
+    assert "a" * 30 in roomy.text and "b" * 30 in roomy.text and not roomy.truncated
+
+
+class _SleepingExtractor(AttachmentExtractor):
+    """Stands in for a PDF that hangs MuPDF. Module-level so worker processes can unpickle it."""
+    filetype = "pdf"
+    off_main_thread = True
+
+    def extract(self, source, char_budget=None):
+        import time
+        time.sleep(60)
+
+
+class _HungryExtractor(AttachmentExtractor):
+    """Stands in for a PDF that makes MuPDF allocate gigabytes."""
+    filetype = "pdf"
+
+    def extract(self, source, char_budget=None):
+        return str(len(bytearray(8 * 1024 ** 3))), 0
+
+
+@pytest.fixture
+def sandbox():
+    workers = _ExtractionSandbox(workers=1, timeout=2, memory_mb=1024)
+    yield workers
+    workers.close()
+
+
+def test_extraction_sandbox_extracts_in_a_worker_process(sandbox):
+    text, pages_skipped = sandbox.extract(PdfExtractor(), _make_pdf_bytes("In een apart proces"), None, "a.pdf")
+    assert "In een apart proces" in text and pages_skipped == 0
+
+
+def test_extraction_sandbox_kills_and_replaces_a_hung_worker(sandbox):
+    import time
+    sandbox.extract(PdfExtractor(), _make_pdf_bytes("opwarmen"), None, "warm.pdf")
+    hung_pid = sandbox._workers[0]["process"].pid
+
+    start = time.monotonic()
+    with pytest.raises(TimeoutError, match="longer than 2s"):
+        sandbox.extract(_SleepingExtractor(), b"%PDF", None, "hangs.pdf")
+    assert time.monotonic() - start < 10
+
+    text, _ = sandbox.extract(PdfExtractor(), _make_pdf_bytes("Weer gezond"), None, "b.pdf")
+    assert "Weer gezond" in text
+    assert sandbox._workers[0]["process"].pid != hung_pid
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="RLIMIT_AS is POSIX only")
+def test_extraction_sandbox_caps_worker_memory(sandbox):
+    with pytest.raises(RuntimeError, match="out of memory"):
+        sandbox.extract(_HungryExtractor(), b"%PDF", None, "huge.pdf")
+    text, _ = sandbox.extract(PdfExtractor(), _make_pdf_bytes("Nog steeds"), None, "c.pdf")
+    assert "Nog steeds" in text
+
+
+def test_process_attachment_links_turns_a_hung_extraction_into_a_failed_attachment(mock_config):
+    mock_config.EXTRACTION_SANDBOX = True
+    mock_config.EXTRACTION_TIMEOUT = 2
+    try:
+        with patch('get_social_schools_news._download_and_sniff', return_value=(b"%PDF", _SleepingExtractor())):
+            (attachment,) = process_attachment_links(Mock(), Mock(), Mock(), _attachment_links("hangs.pdf"))
+    finally:
+        _close_extraction_sandbox()
+    assert attachment.failed
+    assert attachment.failure_reason.startswith("extraction failed: extraction took longer than 2s")
+
+
+def test_process_attachment_links_runs_slow_extractors_off_main_thread():
+    """PDF extraction runs in the pool while downloads stay on the calling (Playwright) thread"""
+    import threading
+    threads = {}
+    real_extract = _extract_pdf_text
+
+    def extract(source, **kwargs):
+        threads["extract"] = threading.current_thread()
+        return real_extract(source, **kwargs)
+
+    def download(url, browser_context=None):
+        threads["download"] = threading.current_thread()
+        return _make_pdf_bytes("x")
+
+    with patch('get_social_schools_news._download_attachment', side_effect=download), \
+            patch('get_social_schools_news._extract_pdf_text', side_effect=extract):
+        process_attachment_links(Mock(), Mock(), Mock(), _attachment_links("a.pdf"))
+
+    assert threads["download"] is threading.main_thread()
+    assert threads["extract"] is not threading.main_thread()
 
 
 # =============================================================================
@@ -1298,6 +2716,229 @@ def test_process_all_articles_new_article(mock_playwright):
         mock_save.assert_called_once_with("test_article_id")
 
 
+def _feed_with_articles(page, *ids):
+    feed = Mock()
+    articles = []
+    for article_id in ids:
+        article = Mock()
+        article.get_attribute.return_value = article_id
+        title_element = Mock()
+        title_element.inner_text.return_value = f"Title {article_id}"
+        article.query_selector.side_effect = lambda selector, el=title_element: {"h3": el}.get(selector)
+        articles.append(article)
+    page.query_selector.return_value = feed
+    feed.query_selector_all.return_value = articles
+    return articles
+
+
+def _prepared(playwright, browser, context, article):
+    article_id = article.get_attribute("data-id")
+    return PreparedArticle(title=article_id, body="", attachments=[], post_date=None)
+
+
+def test_process_all_articles_digests_concurrently_and_notifies_in_post_order(mock_playwright, mock_config):
+    """With LLM_CONCURRENCY the Digests overlap, but notifications keep the feed order"""
+    import threading
+    import time
+    playwright, browser, context, page = mock_playwright
+    _feed_with_articles(page, "a1", "a2", "a3")
+    mock_config.LLM_CONCURRENCY = 3
+    all_running = threading.Barrier(3, timeout=5)
+
+    def digest(title, body, attachments):
+        all_running.wait()  # breaks unless all three Digests run at the same time
+        time.sleep({"a1": 0.3, "a2": 0.1, "a3": 0.0}[title])
+        return Digest(translated_title=f"Digest {title}", tldr="x", action_items=[], key_dates=[])
+
+    with patch('get_social_schools_news.load_processed_articles', return_value=[]), \
+         patch('get_social_schools_news.save_processed_article') as mock_save, \
+         patch('get_social_schools_news.expand_full_text'), \
+         patch('get_social_schools_news.prepare_article', side_effect=_prepared), \
+         patch('get_social_schools_news.generate_digest', side_effect=digest), \
+         patch('get_social_schools_news.send_notification') as mock_notify:
+        process_all_articles(playwright, browser, context, page)
+
+    assert [c.kwargs["title"] for c in mock_notify.call_args_list] == ["Digest a1", "Digest a2", "Digest a3"]
+    assert [c.args[0] for c in mock_save.call_args_list] == ["a1", "a2", "a3"]
+
+
+def test_process_all_articles_concurrent_failure_leaves_article_for_retry(mock_playwright, mock_config):
+    playwright, browser, context, page = mock_playwright
+    _feed_with_articles(page, "a1", "a2", "a3")
+    mock_config.LLM_CONCURRENCY = 2
+
+    def digest(title, body, attachments):
+        if title == "a2":
+            raise RuntimeError("Copilot CLI did not answer within 120s (LLM_TIMEOUT)")
+        return Digest(translated_title=f"Digest {title}", tldr="x", action_items=[], key_dates=[])
+
+    with patch('get_social_schools_news.load_processed_articles', return_value=[]), \
+         patch('get_social_schools_news.save_processed_article') as mock_save, \
+         patch('get_social_schools_news.expand_full_text'), \
+         patch('get_social_schools_news.prepare_article', side_effect=_prepared), \
+         patch('get_social_schools_news.generate_digest', side_effect=digest), \
+         patch('get_social_schools_news.send_notification') as mock_notify:
+        process_all_articles(playwright, browser, context, page)
+
+    assert [c.kwargs["title"] for c in mock_notify.call_args_list] == [
+        "Digest a1", "Social Schools update", "Digest a3",
+    ]
+    assert [c.args[0] for c in mock_save.call_args_list] == ["a1", "a3"]
+
+
+def test_process_all_articles_stops_calling_llm_once_its_circuit_opens(mock_playwright, mock_config, caplog):
+    """A dead LLM costs CIRCUIT_BREAKER_FAILURES timeouts, not one per Article; all stay unmarked"""
+    playwright, browser, context, page = mock_playwright
+    _feed_with_articles(page, "a1", "a2", "a3", "a4")
+    mock_config.CIRCUIT_BREAKER_FAILURES = 2
+    RUN_STATS.clear()
+    with patch('get_social_schools_news.load_processed_articles', return_value=[]), \
+         patch('get_social_schools_news.save_processed_article') as mock_save, \
+         patch('get_social_schools_news.expand_full_text'), \
+         patch('get_social_schools_news.prepare_article', side_effect=_prepared), \
+         patch('get_social_schools_news._check_copilot_available'), \
+         patch('get_social_schools_news._run_copilot', side_effect=RuntimeError("no answer within 120s")) as copilot, \
+         patch('get_social_schools_news.send_notification') as mock_notify:
+        process_all_articles(playwright, browser, context, page)
+        with caplog.at_level("INFO"):
+            _log_circuit_breakers()
+
+    assert copilot.call_count == 2
+    assert [c.kwargs["title"] for c in mock_notify.call_args_list] == ["Social Schools update"] * 2
+    mock_save.assert_not_called()
+    assert "Circuit breaker for LLM backend 'copilot': closed -> open x1; 2 call(s) skipped while open" in caplog.text
+
+
+def test_circuit_breaker_half_open_probe_closes_or_reopens():
+    RUN_STATS.clear()
+    breaker = _CircuitBreaker("Ollama", failures=1, reset_seconds=0.1)
+    with pytest.raises(RuntimeError, match="refused"):
+        with breaker:
+            raise RuntimeError("refused")
+    with pytest.raises(CircuitOpenError):
+        with breaker:
+            pass
+    time.sleep(0.15)
+    with pytest.raises(RuntimeError):
+        with breaker:  # the probe fails: open again for another reset period
+            raise RuntimeError("refused")
+    assert breaker.state == "open"
+    time.sleep(0.15)
+    with breaker:
+        assert breaker.state == "half-open"
+        with pytest.raises(CircuitOpenError):  # only one probe at a time
+            with breaker:
+                pass
+    assert breaker.state == "closed"
+    assert [k[2] for k in RUN_STATS if isinstance(k, tuple) and k[0] == "circuit"] == [
+        "closed -> open", "open -> half-open", "half-open -> open", "half-open -> closed",
+    ]
+
+
+def test_provider_chain_reports_circuit_open_when_no_provider_was_called():
+    chain = ProviderChain([("ollama", _answering(CircuitOpenError("ollama open"))),
+                           ("cloud", _answering(CircuitOpenError("cloud open")))])
+    with pytest.raises(CircuitOpenError, match="cloud open"):
+        chain.complete("prompt")
+    chain = ProviderChain([("ollama", _answering(CircuitOpenError("ollama open"))),
+                           ("cloud", _answering(RuntimeError("status 500")))])
+    with pytest.raises(RuntimeError) as raised:
+        chain.complete("prompt")
+    assert not isinstance(raised.value, CircuitOpenError)
+
+
+def _digest_json(title):
+    return {"translated_title": title, "tldr": f"About {title}.", "action_items": [], "key_dates": []}
+
+
+def test_generate_digest_batch_one_call_with_fallback_for_invalid_item(mock_config):
+    """Valid array items are used; only the invalid one gets its own call, and the rest are cached"""
+    RUN_STATS.clear()
+    articles = [PreparedArticle(title=t, body=f"Bericht {t}.", attachments=[], post_date=None)
+                for t in ("a1", "a2", "a3")]
+    batch_answer = "Here you go:\n" + json.dumps(
+        {"digests": [_digest_json("A1"), {"tldr": "missing fields"}, _digest_json("A3")]})
+    provider = _digest_provider(batch_answer, json.dumps(_digest_json("A2")))
+
+    with patch('get_social_schools_news.get_provider', return_value=provider):
+        digests = generate_digest_batch(articles)
+        again = generate_digest_batch(articles)
+
+    assert [d.translated_title for d in digests] == ["A1", "A2", "A3"]
+    assert again == digests
+    assert provider.complete.call_count == 2
+    batch_prompt = provider.complete.call_args_list[0].args[0]
+    assert 'JSON object {"digests": [...]} whose array holds exactly 3 objects' in batch_prompt
+    assert provider.complete.call_args_list[0].kwargs["schema"]["required"] == ["digests"]
+    assert "--- MESSAGE 3 START ---\nTitle: a3" in batch_prompt
+    assert RUN_STATS["llm_calls_saved"] == 1
+    assert RUN_STATS["digest_cache_hits"] == 3
+
+
+def test_extract_json_finds_object_nested_in_prose_braces_and_after_stray_brace():
+    assert _extract_json('Summary {see {"a": {"b": "}\\""}} below} {"c": 1}') == {"a": {"b": '}"'}}
+    assert _extract_json('Use { to start. {"a": 1}') == {"a": 1}
+    assert _extract_json('```json\n{"a": 2}\n```') == {"a": 2}
+    with pytest.raises(ValueError, match="No valid JSON"):
+        _extract_json("{not json} and {neither}")
+
+
+def test_extract_json_is_linear_on_pathological_responses():
+    """Megabyte-scale brace-heavy answers that made the old per-'{' raw_decode scan quadratic"""
+    repeated = ('{"translated_title": "Trip", "tldr": "' + "x" * 60 + '", "action_items": [') * 12_000
+    deeply_nested = '{"a": ' * 200_000
+    code = "function f(x) { if (x) { return {a: x}; } }\n" * 25_000
+    for text in (repeated, deeply_nested, code):
+        start = time.perf_counter()
+        with pytest.raises(ValueError):
+            _extract_json(text)
+        assert time.perf_counter() - start < 2
+    start = time.perf_counter()
+    assert _extract_json(code + _VALID_DIGEST_JSON)["translated_title"] == "Trip"
+    assert time.perf_counter() - start < 2
+
+
+def test_extract_json_array_accepts_wrapped_and_fenced_arrays():
+    items = [_digest_json("A1"), _digest_json("A2")]
+    assert _extract_json_array(json.dumps({"digests": items})) == items
+    assert _extract_json_array("Sure! " + json.dumps(items)) == items
+    assert _extract_json_array("```json\n" + json.dumps(items) + "\n```") == items
+    with pytest.raises(ValueError):
+        _extract_json_array(json.dumps(_digest_json("A1")))
+
+
+def test_digest_batches_keep_long_articles_alone(mock_config):
+    mock_config.LLM_CONTEXT_TOKENS = 2048
+    short = [(f"s{i}", PreparedArticle(title="t", body="kort", attachments=[], post_date=None)) for i in range(5)]
+    long = ("long", PreparedArticle(title="t", body="lang " * 1000, attachments=[], post_date=None))
+    batches = _digest_batches(short[:3] + [long] + short[3:], 2)
+    assert [[article_id for article_id, _ in batch] for batch in batches] == [
+        ["s0", "s1"], ["s2"], ["long"], ["s3", "s4"],
+    ]
+
+
+def test_process_all_articles_batches_digests_and_notifies_in_post_order(mock_playwright, mock_config):
+    playwright, browser, context, page = mock_playwright
+    _feed_with_articles(page, "a1", "a2", "a3")
+    mock_config.DIGEST_BATCH_SIZE = 2
+
+    def digest_batch(articles):
+        return [Digest(translated_title=f"Digest {a.title}", tldr="x", action_items=[], key_dates=[])
+                for a in articles]
+
+    with patch('get_social_schools_news.load_processed_articles', return_value=[]), \
+         patch('get_social_schools_news.save_processed_article') as mock_save, \
+         patch('get_social_schools_news.expand_full_text'), \
+         patch('get_social_schools_news.prepare_article', side_effect=_prepared), \
+         patch('get_social_schools_news.generate_digest_batch', side_effect=digest_batch) as mock_batch, \
+         patch('get_social_schools_news.send_notification') as mock_notify:
+        process_all_articles(playwright, browser, context, page)
+
+    assert [[a.title for a in c.args[0]] for c in mock_batch.call_args_list] == [["a1", "a2"], ["a3"]]
+    assert [c.kwargs["title"] for c in mock_notify.call_args_list] == ["Digest a1", "Digest a2", "Digest a3"]
+    assert [c.args[0] for c in mock_save.call_args_list] == ["a1", "a2", "a3"]
+
+
 def test_process_all_articles_feed_not_found(mock_playwright):
     """Test process_all_articles raises when feed element is not found"""
     playwright, browser, context, page = mock_playwright
@@ -1466,7 +3107,7 @@ def test_send_notification_with_custom_api_key():
 
 
 def test_process_article_content_with_pdf_and_docx(mock_playwright):
-    """Test process_article_content with both PDF and DOCX attachments"""
+    """Test process_article_content discovers PDF and DOCX links in one pass and digests both"""
     playwright, browser, context, page = mock_playwright
 
     article = Mock()
@@ -1481,18 +3122,21 @@ def test_process_article_content_with_pdf_and_docx(mock_playwright):
         "a.meta-info": None,
     }[selector]
 
-    # Mock PDF and DOCX links
-    pdf_link = Mock()
-    docx_link = Mock()
+    pdf_link = _link("http://example.com/doc.pdf")
+    docx_link = _link("http://example.com/doc.docx")
+    other_link = _link("http://example.com/page")
     article.query_selector_all.side_effect = lambda selector: {
-        "a[href*='.pdf']": [pdf_link],
-        "a[href*='.docx']": [docx_link],
+        "a[href]": [pdf_link, other_link, docx_link],
     }.get(selector, [])
 
+    pdf_attachment = Attachment(filename="doc.pdf", url="http://example.com/doc.pdf", filetype="pdf", text="PDF text")
+    docx_attachment = Attachment(filename="doc.docx", url="http://example.com/doc.docx", filetype="docx",
+                                 text="DOCX text")
+
     with patch('get_social_schools_news.send_notification') as mock_notify, \
          patch('get_social_schools_news.generate_digest') as mock_digest, \
-         patch('get_social_schools_news.process_pdf_links') as mock_pdf, \
-         patch('get_social_schools_news.process_docx_links') as mock_docx:
+         patch('get_social_schools_news.process_attachment_links',
+               return_value=[pdf_attachment, docx_attachment]) as mock_process:
 
         mock_digest.return_value = Digest(
             translated_title="Translated Title",
@@ -1500,29 +3144,15 @@ def test_process_article_content_with_pdf_and_docx(mock_playwright):
             action_items=["15 Aug - action"],
             key_dates=[],
         )
-        mock_pdf.return_value = [Attachment(
-            filename="doc.pdf", url="http://example.com/doc.pdf",
-            filetype="pdf", text="PDF text",
-        )]
-        mock_docx.return_value = [Attachment(
-            filename="doc.docx", url="http://example.com/doc.docx",
-            filetype="docx", text="DOCX text",
-        )]
 
         process_article_content(playwright, browser, context, article)
 
-        # Should process both PDF and DOCX
-        mock_pdf.assert_called_once_with(playwright, browser, context,
-                                         [pdf_link])
-        mock_docx.assert_called_once_with(playwright, browser, context,
-                                          [docx_link])
-        mock_digest.assert_called_once_with(
-            "Test Title", "Test Body",
-            [
-                Attachment(filename="doc.pdf", url="http://example.com/doc.pdf", filetype="pdf", text="PDF text"),
-                Attachment(filename="doc.docx", url="http://example.com/doc.docx", filetype="docx", text="DOCX text"),
-            ]
-        )
+        article.query_selector_all.assert_called_once_with("a[href]")
+        mock_process.assert_called_once_with(playwright, browser, context, [
+            AttachmentLink(url="http://example.com/doc.pdf", filename="doc.pdf"),
+            AttachmentLink(url="http://example.com/doc.docx", filename="doc.docx"),
+        ])
+        mock_digest.assert_called_once_with("Test Title", "Test Body", [pdf_attachment, docx_attachment])
         mock_notify.assert_called_once_with(
             title="Translated Title",
             body="Action Items:\n\u25b8 15 Aug - action\n\n"
@@ -1586,6 +3216,91 @@ def test_check_copilot_available_success():
         _check_copilot_available()  # should not raise
 
 
+def test_check_copilot_available_runs_once_per_process():
+    mock_result = Mock()
+    mock_result.returncode = 0
+    with patch('subprocess.run', return_value=mock_result) as mock_run:
+        _check_copilot_available()
+        _check_copilot_available()
+    mock_run.assert_called_once()
+
+
+def test_copilot_calls_share_a_persistent_node_compile_cache(mock_config):
+    mock_result = Mock()
+    mock_result.returncode = 0
+    mock_result.stdout = "ok"
+    with patch.dict(os.environ, {}, clear=False), patch('subprocess.run', return_value=mock_result) as mock_run:
+        os.environ.pop("NODE_COMPILE_CACHE", None)
+        _check_copilot_available()
+        _run_copilot("prompt")
+        os.environ["NODE_COMPILE_CACHE"] = "/custom/cache"
+        _run_copilot("prompt")
+    envs = [call.kwargs["env"] for call in mock_run.call_args_list]
+    assert envs[0]["NODE_COMPILE_CACHE"] == envs[1]["NODE_COMPILE_CACHE"]
+    assert envs[0]["NODE_COMPILE_CACHE"].endswith(os.path.join("social-schools-news", "node-compile-cache"))
+    assert envs[2]["NODE_COMPILE_CACHE"] == "/custom/cache"
+
+
+_STUB_COPILOT = """#!{python}
+import hashlib, json, sys
+sys.stdin.reconfigure(encoding="utf-8")
+argv_prompt = sys.argv[sys.argv.index("-p") + 1]
+stdin_prompt = sys.stdin.read()
+received = stdin_prompt or argv_prompt
+print(json.dumps({{
+    "translated_title": "Stub",
+    "tldr": f"{{len(argv_prompt)}} {{len(stdin_prompt)}} {{hashlib.sha256(received.encode()).hexdigest()}}",
+    "action_items": [],
+    "key_dates": [],
+    "argv": sys.argv[1:3],
+}}))
+"""
+
+
+@pytest.fixture
+def stub_copilot(tmp_path):
+    """A fake `copilot` on PATH that reports how it received the prompt"""
+    script = tmp_path / "copilot"
+    script.write_text(_STUB_COPILOT.format(python=sys.executable))
+    script.chmod(0o755)
+    with patch.dict(os.environ, {"PATH": f"{tmp_path}{os.pathsep}{os.environ['PATH']}"}):
+        yield script
+
+
+def test_run_copilot_refuses_prompts_too_long_for_argv(mock_config):
+    """The CLI reads its -p prompt from argv only, so an oversized prompt fails clearly before any call"""
+    prompt = "Beste ouders, de ouderbijdrage is \u20ac 45. " * 3000
+    with patch('subprocess.run') as mock_run:
+        with pytest.raises(RuntimeError, match="too long for the Copilot CLI"):
+            _run_copilot(prompt)
+    mock_run.assert_not_called()
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="the stub CLI is a shebang script")
+def test_run_copilot_keeps_small_prompts_on_the_command_line(stub_copilot):
+    reply = json.loads(_run_copilot("Korte vraag"))
+    assert reply["tldr"].split()[:2] == [str(len("Korte vraag")), "0"]
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="the stub CLI is a shebang script")
+def test_generate_digest_fits_huge_attachment_into_the_copilot_argv(mock_config, stub_copilot):
+    """The default LLM_CONTEXT_TOKENS cut keeps a Digest prompt within what the CLI accepts"""
+    attachment = Attachment(filename="gids.pdf", url="http://x/gids.pdf", filetype="pdf",
+                            text="Schoolgids hoofdstuk. " * 150_000)
+    digest = generate_digest("Schoolgids", "Zie bijlage.", [attachment])
+    assert digest.translated_title == "Stub"
+    assert 0 < int(digest.tldr.split()[0]) <= _COPILOT_ARGV_PROMPT_LIMIT
+
+
+def test_run_copilot_uses_llm_timeout(mock_config):
+    import subprocess
+    mock_config.LLM_TIMEOUT = 7
+    with patch('subprocess.run', side_effect=subprocess.TimeoutExpired(cmd="copilot", timeout=7)) as mock_run:
+        with pytest.raises(RuntimeError, match="within 7s"):
+            _run_copilot("prompt")
+    assert mock_run.call_args.kwargs["timeout"] == 7
+
+
 def test_check_copilot_available_not_found():
     """Test startup check raises RuntimeError when copilot is not in PATH"""
     with patch('subprocess.run', side_effect=FileNotFoundError):